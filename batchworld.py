@@ -0,0 +1,177 @@
+# batchworld.py
+#
+# Many Wumpus Worlds stepped in lockstep, for evaluating policies over
+# thousands of games at once.
+#
+# This keeps the positions of Link, the Wumpus, the pits and the gold
+# for K worlds in NumPy arrays and implements the rules in world.py
+# (updateLink, updateWumpus, looting and isEnded) as array operations
+# over all K worlds at once. It needs NumPy, which the rest of the
+# code does not.
+#
+# Positions are stored as [..., 0] for x and [..., 1] for y, and
+# directions as the values of utils.Directions, with 0 for "no move".
+# A world stops changing once its game has ended.
+
+import numpy as np
+import config
+from utils import Directions, State
+
+NORTH = Directions.NORTH.value
+SOUTH = Directions.SOUTH.value
+EAST = Directions.EAST.value
+WEST = Directions.WEST.value
+
+# How each direction (indexed by its value) changes x and y.
+DX = np.array([0, 0, 0, 1, -1])
+DY = np.array([0, 1, -1, 0, 0])
+
+# The result of World.sideMove, indexed by direction value, for a move
+# to the left and to the right of the intended direction.
+LEFT = np.array([0, WEST, EAST, NORTH, SOUTH])
+RIGHT = np.array([0, EAST, WEST, SOUTH, NORTH])
+
+class BatchWorld():
+
+    def __init__(self, count, seed=None):
+        """Create count random worlds, as World does for one."""
+        self.rng = np.random.default_rng(seed)
+        self.maxX = config.worldLength - 1
+        self.maxY = config.worldBreadth - 1
+        cells = (self.maxX + 1) * (self.maxY + 1)
+        wumpus = config.numberOfWumpus
+        gold = config.numberOfGold
+        pits = config.numberOfPits
+        needed = wumpus + 1 + gold + pits
+        if needed > cells:
+            raise ValueError("Not enough cells for all the objects in the world")
+
+        # Pick distinct cells in each world: the first needed entries
+        # of a random permutation of the cells.
+        chosen = np.argsort(self.rng.random((count, cells)), axis=1)[:, :needed]
+        positions = np.stack([chosen % (self.maxX + 1), chosen // (self.maxX + 1)], axis=-1)
+        self.setup(positions[:, :wumpus],
+                   positions[:, wumpus],
+                   positions[:, wumpus + 1:wumpus + 1 + gold],
+                   positions[:, wumpus + 1 + gold:])
+
+    @classmethod
+    def fromWorlds(cls, worlds, seed=None):
+        """Create a batch holding the current state of a list of World
+        objects, which must all have the same numbers of objects."""
+        batch = cls.__new__(cls)
+        batch.rng = np.random.default_rng(seed)
+        batch.maxX = worlds[0].maxX
+        batch.maxY = worlds[0].maxY
+        def poses(locs):
+            return [[p.x, p.y] for p in locs]
+        batch.setup(np.array([poses(w.wLoc) for w in worlds]).reshape(len(worlds), -1, 2),
+                    np.array([[w.lLoc.x, w.lLoc.y] for w in worlds]),
+                    np.array([poses(w.gLoc) for w in worlds]).reshape(len(worlds), -1, 2),
+                    np.array([poses(w.pLoc) for w in worlds]).reshape(len(worlds), -1, 2))
+        return batch
+
+    def setup(self, wLoc, lLoc, gLoc, pLoc):
+        self.wLoc = np.array(wLoc, dtype=np.int32)
+        self.lLoc = np.array(lLoc, dtype=np.int32)
+        self.gLoc = np.array(gLoc, dtype=np.int32)
+        self.pLoc = np.array(pLoc, dtype=np.int32)
+        self.count = len(self.lLoc)
+        # Which gold is still there to be looted.
+        self.goldLeft = np.ones(self.gLoc.shape[:2], dtype=bool)
+        self.status = np.full(self.count, State.PLAY.value, dtype=np.int8)
+        self.looted = np.zeros(self.count, dtype=bool)
+
+    # Which worlds are still being played.
+    def playing(self):
+        return self.status == State.PLAY.value
+
+    # Has the game come to an end in each world? Updates status in the
+    # same way as World.isEnded: Link dies by meeting a Wumpus or
+    # falling in a pit, and wins once all the gold is gone (which takes
+    # precedence if both happen on the same step).
+    def isEnded(self):
+        playing = self.playing()
+        link = self.lLoc[:, None, :]
+        metWumpus = np.all(self.wLoc == link, axis=2).any(axis=1)
+        inPit = np.all(self.pLoc == link, axis=2).any(axis=1)
+        won = ~self.goldLeft.any(axis=1)
+        self.status[playing & (metWumpus | inPit)] = State.LOST.value
+        self.status[playing & won] = State.WON.value
+        return self.status != State.PLAY.value
+
+    # Implement the move chosen for Link in each world. directions is
+    # an array of direction values, one per world.
+    def updateLink(self, directions):
+        playing = self.playing()
+        self.looted[:] = False
+        directions = self.probabilisticMotion(np.asarray(directions))
+        directions = np.where(playing, directions, 0)
+        self.lLoc[:, 0] = np.clip(self.lLoc[:, 0] + DX[directions], 0, self.maxX)
+        self.lLoc[:, 1] = np.clip(self.lLoc[:, 1] + DY[directions], 0, self.maxY)
+
+        # Loot any gold that Link is now on. Gold are in different
+        # places, so at most one is looted per world.
+        onGold = np.all(self.gLoc == self.lLoc[:, None, :], axis=2) & self.goldLeft
+        onGold &= playing[:, None]
+        self.looted = onGold.any(axis=1)
+        self.goldLeft &= ~onGold
+
+    # As World.probabilisticMotion, for every world at once.
+    def probabilisticMotion(self, directions):
+        if not config.nonDeterministic:
+            return directions
+        slip = self.rng.random(self.count) >= config.directionProbability
+        left = self.rng.random(self.count) > 0.5
+        side = np.where(left, LEFT[directions], RIGHT[directions])
+        return np.where(slip & (directions != 0), side, directions)
+
+    # Move the Wumpus in every world, as World.updateWumpus does: a
+    # Wumpus closer than senseDistance to Link heads towards them, and
+    # the others move at random.
+    def updateWumpus(self):
+        if not config.dynamic:
+            return
+        playing = self.playing()[:, None]
+        wx = self.wLoc[:, :, 0]
+        wy = self.wLoc[:, :, 1]
+        lx = self.lLoc[:, 0][:, None]
+        ly = self.lLoc[:, 1][:, None]
+        separation = np.sqrt((wx - lx) ** 2 + (wy - ly) ** 2)
+        chasing = separation < config.senseDistance
+
+        # Heading towards Link (World.moveToLink): along y if x is
+        # already the same, along x if y is, otherwise either, at
+        # random.
+        sameX = wx == lx
+        sameY = wy == ly
+        dice = self.rng.random(wx.shape)
+        chaseY = sameX | (~sameY & (dice > 0.5))
+        chaseX = ~sameX & (sameY | (dice <= 0.5))
+        towardsX = np.sign(lx - wx)
+        towardsY = np.sign(ly - wy)
+
+        # Moving at random (World.makeRandomMove): pick x or y, and
+        # then change it by -1, 0 or 1, staying inside the world.
+        pickX = self.rng.random(wx.shape) > 0.5
+        change = self.rng.integers(0, 3, wx.shape) - 1
+        randomX = np.clip(wx - change, 0, self.maxX)
+        randomY = np.clip(wy - change, 0, self.maxY)
+
+        newX = np.where(chasing,
+                        np.where(chaseX, wx + towardsX, wx),
+                        np.where(pickX, randomX, wx))
+        newY = np.where(chasing,
+                        np.where(chaseY, wy + towardsY, wy),
+                        np.where(pickX, wy, randomY))
+        self.wLoc[:, :, 0] = np.where(playing, newX, wx)
+        self.wLoc[:, :, 1] = np.where(playing, newY, wy)
+
+    # Run one step of the game loop in game.py in every world that is
+    # still playing: Link moves, then the Wumpus. Returns which worlds
+    # have ended. As in game.py, call isEnded() once before the first
+    # step, in case a game is over before it starts.
+    def step(self, directions):
+        self.updateLink(directions)
+        self.updateWumpus()
+        return self.isEnded()
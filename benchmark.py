@@ -0,0 +1,418 @@
+# benchmark.py
+#
+# Timing harness for the planners in search.py.
+#
+# run this using:
+# python benchmark.py
+#
+# or, to choose the grid sizes and the number of repeats:
+# python benchmark.py -s 100,500,2000 -r 3
+#
+# or, to measure the memory used by game search nodes:
+# python benchmark.py -b nodes
+#
+# or, to time joint planning for many puzzle characters at once:
+# python benchmark.py -b joint -s 32,64 -k 50,100
+#
+# or, to run every planner over a corpus of worlds, save the results
+# as a baseline, and later check a new run against it:
+# python benchmark.py -b search -o baseline.json
+# python benchmark.py -b search -c baseline.json
+
+import getopt
+import json
+import random
+import sys
+import time
+import tracemalloc
+import events
+from cbs import ConflictBasedSearch
+from dstar import DStarLite
+from node import Node
+from search import Search, SearchStats
+from utils import Pose, Directions
+from world import World
+
+# Grid sizes (the length of each side) used when none are given.
+defaultSizes = [50, 100, 250, 500, 1000, 2000]
+
+# The corpus for the search benchmark, when none is given: grid sizes,
+# numbers of gold, and the fraction of cells that are pits.
+searchSizes = [10, 100, 1000]
+searchGold = [1, 5, 10, 20]
+searchDensities = [0.0, 0.05, 0.2]
+
+# The grid sizes and numbers of characters for the joint planning
+# benchmark, when none are given.
+jointSizes = [32, 64, 100]
+jointCharacters = [10, 50, 100]
+
+# The game planners, by their find_path algorithm type. D* Lite (7)
+# isn't planned by find_path, so it is timed through dstarTour.
+gameAlgorithms = {1: "dfs", 2: "bfs", 3: "ucs", 4: "greedy", 5: "tour",
+                  6: "astar", 7: "dstar", 8: "bidir"}
+
+# The puzzle planners, which plan a path between two cells.
+puzzleAlgorithms = {"dfs_path": Search.dfs_path, "astar_path": Search.astar_path,
+                    "jps_path": Search.jps_path, "bidir_path": Search.bidir_path}
+
+# Some game planners search over every (cell, gold collected) state,
+# of which there are cells * 2 ** gold, or over every order of the
+# gold. Cases where that is more than these limits would take hours,
+# so they are skipped and recorded as such.
+stateLimits = {2: 1000000, 3: 1000000, 4: 1000000, 6: 20000000}
+tourGoldLimit = 20
+
+# How much worse than the baseline a measurement has to be to count as
+# a regression, as a fraction of the baseline.
+defaultTolerance = 0.2
+# Times that differ by less than this (in seconds) are noise, however
+# large a fraction of the baseline that is.
+timeFloor = 0.002
+# How many times each case of the search benchmark is timed. The
+# fastest run is kept, since the others only add noise from the rest
+# of the machine.
+timingRuns = 5
+
+# Time planner on a width x width grid, from the bottom left corner
+# to the top right corner and between random pairs of cells. Returns
+# the number of moves planned and the time taken, summed over repeats.
+def timePuzzlePlanner(planner, width, repeats):
+    maxXY = width - 1
+    queries = [((0, 0), (maxXY, maxXY))]
+    rng = random.Random(width)
+    for i in range(repeats - 1):
+        queries.append(((rng.randint(0, maxXY), rng.randint(0, maxXY)),
+                        (rng.randint(0, maxXY), rng.randint(0, maxXY))))
+    moves = 0
+    elapsed = 0.0
+    for start, goal in queries:
+        began = time.perf_counter()
+        plan = planner(start, goal, maxXY, maxXY)
+        elapsed += time.perf_counter() - began
+        moves += len(plan)
+    return moves, elapsed
+
+# Time the puzzle planners across grid sizes. The cost per move of the
+# returned plan should stay flat as the grid grows, since no frontier
+# entry carries a copy of its path.
+def benchPuzzlePlanners(sizes, repeats):
+    planners = [("dfs_path", Search.dfs_path), ("astar_path", Search.astar_path),
+                ("jps_path", Search.jps_path), ("bidir_path", Search.bidir_path)]
+    print(f"{'planner':<12}{'grid':>12}{'moves':>12}{'ms':>12}{'us/move':>10}")
+    for name, planner in planners:
+        for width in sizes:
+            moves, elapsed = timePuzzlePlanner(planner, width, repeats)
+            perMove = 1e6 * elapsed / max(moves, 1)
+            print(f"{name:<12}{str(width) + 'x' + str(width):>12}{moves:>12}"
+                  f"{1000 * elapsed:>12.1f}{perMove:>10.2f}")
+
+# The node representation the game searches used before node.py was
+# made compact: a new Pose and a Node with a __dict__ per child, a copy
+# of the set of gold collected, and a (position, frozenset) state key.
+class LegacyNode:
+    def __init__(self, location, parent=None, action=None, cost=0, gold_collected=None):
+        self.location = location
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.gold_collected = gold_collected if gold_collected is not None else set()
+
+def legacyChild(parent, action):
+    location = Pose(parent.location.x + 1, parent.location.y)
+    child = LegacyNode(location, parent, action, parent.cost + 1, parent.gold_collected.copy())
+    key = ((child.location.x, child.location.y), frozenset(child.gold_collected))
+    return child, key
+
+def compactChild(parent, action):
+    child = Node(parent.cell + 1, parent, action, parent.cost + 1, parent.collected)
+    key = child.collected * 1000000 + child.cell
+    return child, key
+
+# Measure the memory and time it takes to create and keep count
+# children in a chain, as a search does when it keeps its frontier
+# and explored states, for each node representation.
+def measureNodes(makeChild, root, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    began = time.perf_counter()
+    node = root
+    keys = set()
+    for i in range(count):
+        node, key = makeChild(node, Directions.EAST)
+        keys.add(key)
+    elapsed = time.perf_counter() - began
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count, 1e6 * elapsed / count
+
+# Compare the memory and time per expanded node of the legacy and the
+# compact node representations, with a few gold already collected.
+def benchNodes(count, goldCounts):
+    print(f"{'gold':>6}{'legacy B/node':>16}{'compact B/node':>16}{'ratio':>8}"
+          f"{'legacy us':>12}{'compact us':>12}")
+    for golds in goldCounts:
+        start = Pose()
+        legacyRoot = LegacyNode(start, gold_collected=set((i, i) for i in range(golds)))
+        compactRoot = Node(0, collected=(1 << golds) - 1)
+        legacyBytes, legacyTime = measureNodes(legacyChild, legacyRoot, count)
+        compactBytes, compactTime = measureNodes(compactChild, compactRoot, count)
+        print(f"{golds:>6}{legacyBytes:>16.0f}{compactBytes:>16.0f}"
+              f"{legacyBytes / compactBytes:>8.1f}{legacyTime:>12.2f}{compactTime:>12.2f}")
+
+# Time conflict-based search planning for many puzzle characters at
+# once, from and to distinct random cells of a size x size grid. Grids
+# more crowded than one character in 20 cells are skipped, since the
+# search can take minutes there.
+def benchJoint(sizes, characterCounts, repeats):
+    print(f"{'grid':>10}{'chars':>8}{'solved':>8}{'steps':>10}{'expanded':>12}{'ms':>12}")
+    for size in sizes:
+        for characters in characterCounts:
+            if characters * 20 > size * size:
+                continue
+            solved = 0
+            steps = 0
+            stats = SearchStats()
+            for i in range(repeats):
+                rng = random.Random(f"{size}/{characters}/{i}")
+                starts = rng.sample(range(size * size), characters)
+                goals = rng.sample(range(size * size), characters)
+                planner = ConflictBasedSearch(size - 1, size - 1, stats=stats)
+                plan = planner.solve(starts, goals)
+                if plan is not None:
+                    solved += 1
+                    steps += len(plan)
+            print(f"{str(size) + 'x' + str(size):>10}{characters:>8}{solved:>8}{steps:>10}"
+                  f"{stats.expanded:>12}{1000 * stats.elapsed:>12.1f}")
+
+# A world for the search benchmark, made without using config: a
+# size x size grid with Link, goldCount gold and round(density * cells)
+# pits on distinct cells and no Wumpus. The same arguments always give
+# the same world.
+def corpusWorld(size, goldCount, density, index):
+    rng = random.Random(f"{size}/{goldCount}/{density}/{index}")
+    cells = size * size
+    pits = min(round(density * cells), cells - goldCount - 1)
+    chosen = rng.sample(range(cells), 1 + goldCount + pits)
+    def pose(cell):
+        return Pose.fromCell(cell, size)
+    return World.fromPositions(size - 1, size - 1, pose(chosen[0]), [],
+                               [pose(cell) for cell in chosen[1:1 + goldCount]],
+                               [pose(cell) for cell in chosen[1 + goldCount:]], rng)
+
+# Plan for Link with D* Lite as makeIncrementalMove does, heading for
+# the nearest gold that can be reached, one leg at a time.
+def dstarTour(world, stats):
+    width = world.width
+    here = world.lLoc.cell(world.width)
+    remaining = set(g.cell(world.width) for g in world.gLoc)
+    remaining.discard(here)
+    plan = []
+    steps = {Directions.NORTH: width, Directions.SOUTH: -width,
+             Directions.EAST: 1, Directions.WEST: -1}
+    while remaining:
+        hx = here % width
+        hy = here // width
+        for target in sorted(remaining, key=lambda g: (abs(g % width - hx) + abs(g // width - hy), g)):
+            leg = DStarLite(world, here, target, stats).path()
+            if leg:
+                break
+        else:
+            return []
+        for action in leg:
+            here += steps[action]
+            remaining.discard(here)
+        plan.extend(leg)
+    return plan
+
+# Is a game planner going to be able to finish on this case?
+def feasible(algorithmType, size, goldCount):
+    if algorithmType == 5:
+        return goldCount <= tourGoldLimit
+    limit = stateLimits.get(algorithmType)
+    return limit is None or size * size << goldCount <= limit
+
+# Run plan(stats) timingRuns times for the time, and once more under
+# tracemalloc for the peak memory, since tracing slows everything down.
+# Returns the length of the plan, the fastest time taken, the stats of
+# the first run and the peak memory of the last.
+def measure(plan):
+    stats = SearchStats()
+    began = time.perf_counter()
+    result = plan(stats)
+    elapsed = time.perf_counter() - began
+    for run in range(timingRuns - 1):
+        began = time.perf_counter()
+        plan(SearchStats())
+        elapsed = min(elapsed, time.perf_counter() - began)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    plan(SearchStats())
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return len(result or []), elapsed, stats, peak
+
+def gamePlanner(algorithmType, world):
+    def plan(stats):
+        if algorithmType == 7:
+            return dstarTour(world, stats)
+        search = Search(world)
+        search.stats = stats
+        allGold = set(world.gLoc)
+        return search.find_path(algorithmType, world.lLoc, allGold)
+    return plan
+
+def puzzlePlanner(planner, world, goal):
+    def plan(stats):
+        return planner(world.lLoc, goal, world.maxX, world.maxY, stats=stats)
+    return plan
+
+# Run every planner on repeats worlds for each case of the corpus.
+# Returns a dict from the name of each case and planner to its totals
+# over the worlds, or to None if it was skipped.
+def benchSearch(sizes, golds, densities, repeats):
+    results = {}
+    print(f"{'case':<34}{'moves':>8}{'ms':>10}{'expanded':>12}{'frontier':>10}{'peak KiB':>10}")
+    for size in sizes:
+        for goldCount in golds:
+            for density in densities:
+                if 1 + goldCount > size * size:
+                    continue
+                worlds = [corpusWorld(size, goldCount, density, i) for i in range(repeats)]
+                cases = [(f"game:{name}", algorithmType) for algorithmType, name in gameAlgorithms.items()]
+                # The puzzle planners only depend on the grid, so they
+                # only run once per size, on the worlds without pits.
+                if density == 0.0 and goldCount == golds[0]:
+                    cases.extend((f"puzzle:{name}", planner) for name, planner in puzzleAlgorithms.items())
+                for caseName, planner in cases:
+                    name = f"{caseName}:{size}:{goldCount}:{density}"
+                    if caseName.startswith("game") and not feasible(planner, size, goldCount):
+                        results[name] = None
+                        print(f"{name:<34}{'skipped':>8}")
+                        continue
+                    total = {"moves": 0, "time": 0.0, "expanded": 0, "generated": 0,
+                             "peakFrontier": 0, "peakMemory": 0}
+                    for world in worlds:
+                        if caseName.startswith("game"):
+                            plan = gamePlanner(planner, world)
+                        else:
+                            plan = puzzlePlanner(planner, world, world.gLoc[0])
+                        moves, elapsed, stats, peak = measure(plan)
+                        total["moves"] += moves
+                        total["time"] += elapsed
+                        total["expanded"] += stats.expanded
+                        total["generated"] += stats.generated
+                        total["peakFrontier"] = max(total["peakFrontier"], stats.peakFrontier)
+                        total["peakMemory"] = max(total["peakMemory"], peak)
+                    results[name] = total
+                    print(f"{name:<34}{total['moves']:>8}{1000 * total['time']:>10.1f}"
+                          f"{total['expanded']:>12}{total['peakFrontier']:>10}"
+                          f"{total['peakMemory'] / 1024:>10.0f}")
+    return results
+
+# Compare results against a baseline saved by an earlier run. A case
+# regresses if it now plans a different number of moves, or expands or
+# generates more nodes, keeps a bigger frontier or uses more memory
+# than tolerance allows. These come out the same on every run of the
+# same code, so they can fail a check. Times don't, even taking the
+# fastest of several runs, so a case that takes more than tolerance
+# (and timeFloor) longer is only reported as slower. Returns the lists
+# of regressions and of slower cases, as messages.
+def compareResults(results, baseline, tolerance):
+    regressions = []
+    slower = []
+    for name, total in results.items():
+        old = baseline.get(name)
+        if total is None or old is None:
+            continue
+        if total["moves"] != old["moves"]:
+            regressions.append(f"{name}: {total['moves']} moves, was {old['moves']}")
+        for key in ("expanded", "generated", "peakFrontier", "peakMemory"):
+            # Baselines saved before a counter was added don't have it.
+            if key in old and total[key] > old[key] * (1 + tolerance) and total[key] > 0:
+                regressions.append(f"{name}: {key} {total[key]:.6g}, was {old[key]:.6g}")
+        if (total["time"] - old["time"] >= timeFloor and
+                total["time"] > old["time"] * (1 + tolerance)):
+            slower.append(f"{name}: time {total['time']:.6g}, was {old['time']:.6g}")
+    return regressions, slower
+
+def main():
+    sizes = None
+    golds = searchGold
+    characterCounts = jointCharacters
+    densities = searchDensities
+    repeats = 3
+    suite = "puzzle"
+    savePath = None
+    baselinePath = None
+    tolerance = defaultTolerance
+    try:
+        arguments, values = getopt.getopt(sys.argv[1:], "hs:r:b:g:d:k:o:c:t:")
+        for currentArgument, currentValue in arguments:
+            if currentArgument == "-h":
+                print("benchmark.py accepts the following arguments:")
+                print("-s <sizes> : comma separated grid sizes")
+                print("-r <number> : number of queries (or worlds) per grid size")
+                print("-b <name> : which benchmark to run:")
+                print("\tpuzzle - puzzle planners across grid sizes (default)")
+                print("\tnodes - memory and time per game search node")
+                print("\tsearch - every planner over a corpus of worlds")
+                print("\tjoint - conflict-based search for many puzzle characters")
+                print("-g <numbers> : comma separated numbers of gold (search)")
+                print("-d <densities> : comma separated fractions of cells that are pits (search)")
+                print("-k <numbers> : comma separated numbers of characters (joint)")
+                print("-o <file> : save the results as a baseline (search)")
+                print("-c <file> : compare the results with a baseline (search)")
+                print("-t <fraction> : how much worse than the baseline is a regression (search)")
+                return
+            elif currentArgument == "-s":
+                sizes = [int(size) for size in currentValue.split(",")]
+            elif currentArgument == "-r":
+                repeats = int(currentValue)
+            elif currentArgument == "-b":
+                suite = currentValue
+            elif currentArgument == "-g":
+                golds = [int(gold) for gold in currentValue.split(",")]
+            elif currentArgument == "-d":
+                densities = [float(density) for density in currentValue.split(",")]
+            elif currentArgument == "-k":
+                characterCounts = [int(characters) for characters in currentValue.split(",")]
+            elif currentArgument == "-o":
+                savePath = currentValue
+            elif currentArgument == "-c":
+                baselinePath = currentValue
+            elif currentArgument == "-t":
+                tolerance = float(currentValue)
+    except (getopt.GetoptError, ValueError) as err:
+        print(str(err))
+        return
+
+    if suite == "nodes":
+        benchNodes(100000, [1, 5, 20])
+    elif suite == "joint":
+        benchJoint(sizes or jointSizes, characterCounts, repeats)
+    elif suite == "search":
+        # Planners that can't reach all the gold say so, which is
+        # expected here, since pits can wall gold in.
+        events.setConsoleLevel(events.OFF)
+        results = benchSearch(sizes or searchSizes, golds, densities, repeats)
+        if savePath:
+            with open(savePath, "w") as f:
+                json.dump(results, f, indent=1, sort_keys=True)
+        if baselinePath:
+            with open(baselinePath) as f:
+                baseline = json.load(f)
+            regressions, slower = compareResults(results, baseline, tolerance)
+            for case in slower:
+                print("Slower (not a failure): " + case)
+            for regression in regressions:
+                print("Regression: " + regression)
+            print(f"{len(regressions)} regressions against {baselinePath}")
+            if regressions:
+                sys.exit(1)
+    else:
+        benchPuzzlePlanners(sizes or defaultSizes, repeats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+# cbs.py
+#
+# Joint planning for all the characters of the puzzle with
+# Conflict-Based Search (Sharon, Stern, Felner and Sturtevant, 2015).
+#
+# Each step, every character either moves or stays where it is. Two
+# characters conflict if they are in the same cell at the same time,
+# or swap cells in the same step. CBS plans a path for each character
+# on its own, and where two paths conflict it tries both ways out:
+# forbidding one character or the other from being where it was (or
+# making the move it made) at that time, and planning that character
+# again. Trying these choices cheapest first gives the plans with the
+# smallest sum of costs, where the cost of a character is the number
+# of steps until it reaches its goal for good.
+#
+# On open grids there are many paths of the same length, so two
+# things keep the search small. Among paths of the same length, the
+# search for each character prefers those with the fewest conflicts
+# with the other paths. And when a new path is no longer than the old
+# one and has fewer conflicts, it replaces the old one rather than
+# splitting the search in two (the bypass of Boyarski et al., 2015).
+#
+# A node of the search differs from its parent in the path of one
+# character, so rather than looking over every path to find the
+# conflicts of each node, Plans keeps count of where the paths go and
+# when they conflict, and only the changed path is looked at.
+
+import heapq
+from collections import Counter
+from itertools import count
+from utils import Directions
+from search import SearchStats, timed
+
+# The action that moves between two cells, by the difference in their
+# cell IDs, with 0 for staying put.
+def actionBetween(a, b, width):
+    return {width: Directions.NORTH, -width: Directions.SOUTH,
+            1: Directions.EAST, -1: Directions.WEST}.get(b - a, 0)
+
+# The cell a path is in at time t. Characters stay at the end of their
+# paths.
+def at(path, t):
+    return path[t] if t < len(path) else path[-1]
+
+# The (cell, t) visits and (a, b, t) moves a path makes, as counted by
+# Plans.
+def visitsOf(path):
+    return zip(path, count())
+
+def movesOf(path):
+    return ((a, b, t) for a, b, t in zip(path, path[1:], count(1)) if a != b)
+
+# Take the keys of counter out of it, dropping those that reach 0.
+def discard(counter, keys):
+    for key in keys:
+        if counter[key] == 1:
+            del counter[key]
+        else:
+            counter[key] -= 1
+
+# The paths of all the characters, and how they conflict.
+#
+# visits counts the paths in each cell at each time, by (cell, t), up
+# to the end of each path, and moves counts the moves from cell a to
+# cell b arriving at time t, by (a, b, t). clashes counts the pairs of
+# characters that conflict at each time, and total is how many there
+# are in all. A Plans is not changed once it is made: replace() gives
+# a new one, so nodes of the search can share their parent's.
+class Plans:
+    __slots__ = ('paths', 'visits', 'moves', 'clashes', 'total')
+
+    def __init__(self, paths=()):
+        self.paths = []
+        self.visits = Counter()
+        self.moves = Counter()
+        self.clashes = Counter()
+        self.total = 0
+        for path in paths:
+            self.append(path)
+
+    def others(self, agent):
+        """The visits, moves and parked characters of every path but
+        that of agent, where parked gives the time from which each
+        character is stopped at its goal, by goal. None of these is
+        shared, so they can be changed."""
+        path = self.paths[agent]
+        visits = self.visits.copy()
+        discard(visits, visitsOf(path))
+        moves = self.moves.copy()
+        discard(moves, movesOf(path))
+        parked = {other[-1]: len(other) for other in self.paths}
+        del parked[path[-1]]
+        return visits, moves, parked
+
+    def clashesOf(self, path, visits, moves, parked):
+        """The conflicts between path and the others, as a count of
+        pairs of characters by time."""
+        clashes = Counter()
+        previous = None
+        for t, cell in enumerate(path):
+            number = visits.get((cell, t), 0)
+            end = parked.get(cell)
+            if end is not None and end <= t:
+                number += 1
+            if previous is not None and previous != cell:
+                number += moves.get((cell, previous, t), 0)
+            if number:
+                clashes[t] += number
+            previous = cell
+        # Others that pass through the goal once it has stopped there.
+        goal = path[-1]
+        horizon = max([len(other) for other in self.paths] + [0])
+        for t in range(len(path), horizon):
+            number = visits.get((goal, t), 0)
+            if number:
+                clashes[t] += number
+        return clashes
+
+    def append(self, path):
+        parked = {other[-1]: len(other) for other in self.paths}
+        clashes = self.clashesOf(path, self.visits, self.moves, parked)
+        self.clashes.update(clashes)
+        self.total += sum(clashes.values())
+        self.paths.append(path)
+        self.visits.update(visitsOf(path))
+        self.moves.update(movesOf(path))
+
+    def replace(self, agent, path, others):
+        """The plans with the path of agent replaced by path, where
+        others is what others(agent) gave."""
+        visits, moves, parked = others
+        old = self.paths[agent]
+        oldClashes = self.clashesOf(old, visits, moves, parked)
+        result = Plans.__new__(Plans)
+        result.paths = self.paths[:agent] + [path] + self.paths[agent + 1:]
+        newClashes = result.clashesOf(path, visits, moves, parked)
+        clashes = self.clashes.copy()
+        clashes.subtract(oldClashes)
+        clashes.update(newClashes)
+        result.clashes = +clashes
+        result.total = self.total - sum(oldClashes.values()) + sum(newClashes.values())
+        result.visits = visits.copy()
+        result.visits.update(visitsOf(path))
+        result.moves = moves.copy()
+        result.moves.update(movesOf(path))
+        return result
+
+    def cost(self):
+        return sum(len(path) - 1 for path in self.paths)
+
+    def conflicts(self):
+        """The conflicts between the paths, earliest first.
+
+        A conflict is ("vertex", i, j, cell, t) if characters i and j
+        are both in cell at time t, or ("edge", i, j, a, b, t) if i
+        moves from a to b and j from b to a, arriving at time t. Where
+        more than two characters are in a cell, only the first two are
+        given.
+        """
+        for t in sorted(self.clashes):
+            seen = {}
+            moving = {}
+            for i, path in enumerate(self.paths):
+                cell = at(path, t)
+                j = seen.get(cell)
+                if j is None:
+                    seen[cell] = i
+                elif j >= 0:
+                    yield ("vertex", j, i, cell, t)
+                    seen[cell] = -1
+                previous = at(path, t - 1) if t > 0 else cell
+                if previous != cell:
+                    moving[(previous, cell)] = i
+            for (a, b), i in moving.items():
+                j = moving.get((b, a))
+                if j is not None and a < b:
+                    yield ("edge", i, j, a, b, t)
+
+class ConflictBasedSearch:
+    def __init__(self, maxX, maxY, blocked=(), maxNodes=100000, lookahead=8, stats=None):
+        """Plan on a grid of (maxX + 1) by (maxY + 1) cells, where the
+        (x, y) cells in blocked cannot be entered, giving up after
+        expanding maxNodes nodes of the constraint tree. Up to
+        lookahead conflicts are tried when choosing which to split on."""
+        self.maxX = maxX
+        self.maxY = maxY
+        self.width = maxX + 1
+        self.blocked = set(y * self.width + x for x, y in blocked)
+        self.maxNodes = maxNodes
+        self.lookahead = lookahead
+        self.stats = stats if stats is not None else SearchStats()
+
+    def neighbours(self, cell):
+        """The cells a character in cell can be in next, itself first."""
+        width = self.width
+        x = cell % width
+        y = cell // width
+        result = [cell]
+        if y < self.maxY:
+            result.append(cell + width)
+        if y > 0:
+            result.append(cell - width)
+        if x < self.maxX:
+            result.append(cell + 1)
+        if x > 0:
+            result.append(cell - 1)
+        return [n for n in result if n not in self.blocked]
+
+    def findPath(self, start, goal, constraints, occupied, parked):
+        """Space-time A* for one character, from the cell start to the
+        cell goal, as a list of the cell it is in at each time.
+
+        constraints are (vertex, edge, after, late): it may not be in
+        cell at time t for (cell, t) in vertex, nor move from a to b
+        arriving at time t for (a, b, t) in edge, nor be in cell at any
+        time from t on for (cell, t) in after, and it may not stop at
+        its goal for good until after each time t in late. Among the
+        shortest paths it takes one with the fewest conflicts with the
+        other characters, which are occupied[(cell, t)] in cell at time
+        t, and are in cell from time parked[cell] on. Returns None if
+        there is no path.
+        """
+        stats = self.stats
+        width = self.width
+        gx = goal % width
+        gy = goal // width
+        vertex, edge, after, late = constraints
+        banned = {}
+        for cell, t in after:
+            banned[cell] = min(banned.get(cell, t), t)
+        if goal in banned:
+            return None
+        # After the last constraint every time is the same, so states
+        # are told apart by time only up to then.
+        last = max([t for cell, t in vertex] + [t for a, b, t in edge] +
+                   list(banned.values()) + list(late) + [0])
+        # It can only stop at the goal once nothing will move it on.
+        arrive = max([t for cell, t in vertex if cell == goal] + list(late) + [-1]) + 1
+        # Entries are (f, conflicts, -g, tie, cell, node), where a node
+        # is (cell, parent) so the path can be walked back.
+        # The heuristic is the Manhattan distance, or the time left
+        # before it can stop at the goal if that is longer.
+        tie = count()
+        h = max(abs(start % width - gx) + abs(start // width - gy), arrive)
+        pq = [(h, 0, 0, next(tie), start, (start, None))]
+        closed = set()
+        # No shortest path needs to be in the same state twice, which
+        # bounds how long one can be.
+        limit = last + 1 + (self.maxX + 1) * (self.maxY + 1)
+        while pq:
+            if len(pq) > stats.peakFrontier:
+                stats.peakFrontier = len(pq)
+            f, conflicts, negG, _, cell, node = heapq.heappop(pq)
+            g = -negG
+            key = (cell, min(g, last + 1))
+            if key in closed:
+                stats.duplicates += 1
+                continue
+            closed.add(key)
+            stats.expanded += 1
+            if cell == goal and g >= arrive:
+                stats.closed(len(closed))
+                path = []
+                while node is not None:
+                    path.append(node[0])
+                    node = node[1]
+                path.reverse()
+                return path
+            ng = g + 1
+            if ng > limit:
+                continue
+            for n in self.neighbours(cell):
+                if (n, ng) in vertex or (cell, n, ng) in edge or banned.get(n, ng + 1) <= ng:
+                    continue
+                if (n, min(ng, last + 1)) in closed:
+                    stats.duplicates += 1
+                    continue
+                c = conflicts + occupied.get((n, ng), 0)
+                if n in parked and ng >= parked[n]:
+                    c += 1
+                stats.generated += 1
+                h = max(abs(n % width - gx) + abs(n // width - gy), arrive - ng)
+                heapq.heappush(pq, (ng + h, c, -ng, next(tie), n, (n, node)))
+        stats.closed(len(closed))
+        return None
+
+    def rectangle(self, conflict, starts, goals, paths):
+        """Barriers for a vertex conflict between two characters that
+        cross the same rectangle on shortest paths, or None.
+
+        Put the grid the way round where both characters head up and
+        to the right, and say character a starts to the left of b and
+        above it, the same number of steps from the conflict. Between
+        the inner corner of their starts and the inner corner of their
+        goals is a rectangle, which a crosses from left to right and b
+        from bottom to top. If a reaches the right edge of the
+        rectangle and b the top edge with no detours or waits, their
+        paths cross, and at the same time, so one or the other must
+        not. Resolving the conflict with these barriers, rather than
+        one cell at a time, saves trying every place they could cross.
+        """
+        kind, i, j, cell, t = conflict
+        width = self.width
+        s1, s2, g1, g2 = [(c % width, c // width) for c in (starts[i], starts[j], goals[i], goals[j])]
+        if ((g1[0] - s1[0]) * (g2[0] - s2[0]) < 0 or (g1[1] - s1[1]) * (g2[1] - s2[1]) < 0):
+            return None
+        fx = -1 if g1[0] < s1[0] or g2[0] < s2[0] else 1
+        fy = -1 if g1[1] < s1[1] or g2[1] < s2[1] else 1
+        s1, s2, g1, g2 = [(fx * x, fy * y) for x, y in (s1, s2, g1, g2)]
+        if s1[0] + s1[1] != s2[0] + s2[1]:
+            return None
+        if s1[0] > s2[0]:
+            i, j, s1, s2, g1, g2 = j, i, s2, s1, g2, g1
+        corner = (s2[0], s1[1])
+        far = (min(g1[0], g2[0]), min(g1[1], g2[1]))
+        if far[0] < corner[0] or far[1] < corner[1]:
+            return None
+        def cellAt(x, y):
+            return fy * y * width + fx * x
+        right = set((cellAt(far[0], y), far[0] - s1[0] + y - s1[1]) for y in range(corner[1], far[1] + 1))
+        top = set((cellAt(x, far[1]), x - s2[0] + far[1] - s2[1]) for x in range(corner[0], far[0] + 1))
+        for agent, barrier in ((i, right), (j, top)):
+            path = paths[agent]
+            if not any(t < len(path) and path[t] == c for c, t in barrier):
+                return None
+        return (i, right), (j, top)
+
+    def split(self, starts, goals, constraints, plans, conflict):
+        """Plan each side of conflict. Returns the plans with the path
+        that bypasses it, if one does, or None and the children, each
+        (extra cost, constraints, plans)."""
+        paths = plans.paths
+        # The constraints to add in each child: for which character,
+        # and the vertex, edge, after and late constraints (as in
+        # findPath).
+        if conflict[0] == "vertex":
+            kind, i, j, cell, t = conflict
+            if cell == goals[j] and t >= len(paths[j]) - 1:
+                i, j = j, i
+            if cell == goals[i] and t >= len(paths[i]) - 1:
+                # i has stopped at its goal, so either it stops there
+                # later, or j stays out of it from then on.
+                splits = [(i, (), (), (), [t]), (j, (), (), [(cell, t)], ())]
+            else:
+                barriers = self.rectangle(conflict, starts, goals, paths)
+                if barriers is not None:
+                    splits = [(agent, barrier, (), (), ()) for agent, barrier in barriers]
+                else:
+                    splits = [(i, [(cell, t)], (), (), ()), (j, [(cell, t)], (), (), ())]
+        else:
+            kind, i, j, a, b, t = conflict
+            splits = [(i, (), [(a, b, t)], (), ()), (j, (), [(b, a, t)], (), ())]
+        children = []
+        for agent, *added in splits:
+            agentConstraints = tuple(old.union(new) for old, new in zip(constraints[agent], added))
+            others = plans.others(agent)
+            occupied, moves, parked = others
+            path = self.findPath(starts[agent], goals[agent], agentConstraints, occupied, parked)
+            if path is None:
+                continue
+            child = plans.replace(agent, path, others)
+            if len(path) <= len(paths[agent]) and child.total < plans.total:
+                # Just as cheap and fewer conflicts: keep the new path
+                # in this node rather than splitting it.
+                return child, []
+            newConstraints = list(constraints)
+            newConstraints[agent] = agentConstraints
+            children.append((len(path) - len(paths[agent]), newConstraints, child))
+        return None, children
+
+    def resolve(self, starts, goals, constraints, plans):
+        """Resolve one of the conflicts in plans, which must have some.
+        Returns the plans to carry on with if a conflict could be
+        bypassed, or None and the children to split into."""
+        # Splitting on a conflict where a child costs no more than its
+        # parent doesn't raise the cost of the search, so look ahead
+        # for one where both children cost more, and split on the one
+        # with fewest children that don't (Boyarski et al., 2015).
+        best = None
+        for n, conflict in enumerate(plans.conflicts()):
+            if n == self.lookahead:
+                break
+            bypass, children = self.split(starts, goals, constraints, plans, conflict)
+            if bypass is not None:
+                return bypass, []
+            free = sum(1 for extra, childConstraints, child in children if extra == 0)
+            if best is None or free < best[0]:
+                best = (free, children)
+            if free == 0:
+                break
+        return None, best[1]
+
+    @timed
+    def solve(self, starts, goals):
+        """Plan for characters from the cells in starts to the cells in
+        goals, which must each be different. Returns a list of steps,
+        each a list of the action of each character (0 to stay put),
+        or None if no plan was found."""
+        if len(set(starts)) < len(starts) or len(set(goals)) < len(goals):
+            return None
+        noConstraints = (frozenset(), frozenset(), frozenset(), frozenset())
+        plans = Plans()
+        parked = {}
+        for i in range(len(starts)):
+            path = self.findPath(starts[i], goals[i], noConstraints, plans.visits, parked)
+            if path is None:
+                return None
+            plans.append(path)
+            parked[path[-1]] = len(path)
+        # The constraint tree, best first: each node is (sum of costs,
+        # conflicts, tie, constraints of each character, plans).
+        tie = count()
+        tree = [(plans.cost(), plans.total, next(tie), [noConstraints] * len(starts), plans)]
+        expanded = 0
+        while tree and expanded < self.maxNodes:
+            cost, total, _, constraints, plans = heapq.heappop(tree)
+            expanded += 1
+            while plans.clashes:
+                bypass, children = self.resolve(starts, goals, constraints, plans)
+                if bypass is None:
+                    for extra, childConstraints, child in children:
+                        heapq.heappush(tree, (cost + extra, child.total, next(tie),
+                                              childConstraints, child))
+                    break
+                plans = bypass
+            if not plans.clashes:
+                paths = plans.paths
+                horizon = max(len(path) for path in paths)
+                return [[actionBetween(at(path, t), at(path, t + 1), self.width) for path in paths]
+                        for t in range(horizon - 1)]
+        return None
@@ -21,6 +21,13 @@ numberOfGold = 2
 # Do we show graphics or not?
 headless = False
 
+# How long (in seconds) to pause between steps when we show graphics.
+stepDelay = 1
+
+# The game is lost if Link hasn't won after this many steps, so that a
+# Link who gets stuck can't hold up a run of many games.
+maxSteps = 10000
+
 # Control dynamism
 #
 # If dynamic is True, then the Wumpus will move.
@@ -49,6 +56,10 @@ directionProbability = 0.8
 # How far away can the Wumpus sense Link.
 senseDistance = 5
 
+# How many puzzle plans to remember, per algorithm, so that the same
+# query isn't planned twice.
+planCacheSize = 4096
+
 # Control images
 #
 # If useImage is True, then we use images for Link, Wumpus and
@@ -0,0 +1,179 @@
+# dstar.py
+#
+# Incremental path planning for Link with D* Lite (Koenig and
+# Likhachev, 2002).
+#
+# D* Lite searches backwards from the goal, so when Link moves only
+# the start changes and the search tree stays valid. When cells
+# become dangerous or safe again (because a Wumpus entered or left
+# them) only the affected part of the tree is repaired, rather than
+# planning again from scratch.
+#
+# Cells next to a Wumpus or a pit are safe to enter but risky, since
+# a Wumpus may move into Link next turn, so entering them costs more
+# than a plain move, and plans go around them when they can.
+
+import heapq
+from utils import Directions
+from world import DANGER
+from search import SearchStats, timed
+
+INF = float("inf")
+# What entering a smelly or windy cell costs, on top of the move.
+RISK = 10
+
+class DStarLite:
+    def __init__(self, world, start, goal, stats=None):
+        """Plan on world from the cell start to the cell goal."""
+        self.world = world
+        self.stats = stats if stats is not None else SearchStats()
+        self.width = world.width
+        self.start = start
+        self.goal = goal
+        # Where the start was when the keys in the queue were computed,
+        # and the amount by which keys have to be corrected since.
+        self.last = start
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        # The queue is a heap with lazy deletion: queued maps each
+        # cell in the queue to its current key, and heap entries with
+        # any other key are stale.
+        self.queue = []
+        self.queued = {}
+        self.push(goal, self.calculateKey(goal))
+        self.computeShortestPath()
+
+    def heuristic(self, a, b):
+        width = self.width
+        return abs(a % width - b % width) + abs(a // width - b // width)
+
+    def calculateKey(self, cell):
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (best + self.heuristic(self.start, cell) + self.km, best)
+
+    def push(self, cell, key):
+        self.stats.generated += 1
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key[0], key[1], cell))
+
+    def topKey(self):
+        queue = self.queue
+        while queue and self.queued.get(queue[0][2]) != (queue[0][0], queue[0][1]):
+            heapq.heappop(queue)
+            self.stats.duplicates += 1
+        if queue:
+            return (queue[0][0], queue[0][1])
+        return (INF, INF)
+
+    def neighbours(self, cell):
+        """The cells next to cell, with the action that reaches each."""
+        world = self.world
+        x = cell % self.width
+        y = cell // self.width
+        result = []
+        if y < world.maxY:
+            result.append((cell + self.width, Directions.NORTH))
+        if y > 0:
+            result.append((cell - self.width, Directions.SOUTH))
+        if x < world.maxX:
+            result.append((cell + 1, Directions.EAST))
+        if x > 0:
+            result.append((cell - 1, Directions.WEST))
+        return result
+
+    def cost(self, a, b):
+        """Cost of moving from cell a to the neighbouring cell b."""
+        world = self.world
+        if world.grid[a] & DANGER or world.grid[b] & DANGER:
+            return INF
+        if world.stench[b] or world.breeze[b]:
+            return 1 + RISK
+        return 1
+
+    def updateVertex(self, cell):
+        if cell != self.goal:
+            self.rhs[cell] = min(self.cost(cell, n) + self.g.get(n, INF)
+                                 for n, action in self.neighbours(cell))
+        self.queued.pop(cell, None)
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            self.push(cell, self.calculateKey(cell))
+
+    @timed
+    def computeShortestPath(self):
+        g = self.g
+        rhs = self.rhs
+        start = self.start
+        while (self.topKey() < self.calculateKey(start) or
+               rhs.get(start, INF) != g.get(start, INF)):
+            if len(self.queued) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(self.queued)
+            k1, k2, cell = heapq.heappop(self.queue)
+            del self.queued[cell]
+            self.stats.expanded += 1
+            newKey = self.calculateKey(cell)
+            if (k1, k2) < newKey:
+                self.push(cell, newKey)
+            elif g.get(cell, INF) > rhs.get(cell, INF):
+                g[cell] = rhs[cell]
+                for n, action in self.neighbours(cell):
+                    self.updateVertex(n)
+            else:
+                g[cell] = INF
+                self.updateVertex(cell)
+                for n, action in self.neighbours(cell):
+                    self.updateVertex(n)
+        self.stats.closed(len(g))
+
+    def update(self, start, changed):
+        """Move the start to the cell start, and repair the plan around
+        the cells in changed, whose danger may have changed."""
+        if start != self.start:
+            self.start = start
+            self.km += self.heuristic(self.last, start)
+            self.last = start
+        # A change of danger in a cell changes the risk of the cells
+        # next to it, and so the cost of moving into them from the
+        # cells next to those.
+        affected = set(changed)
+        for ring in range(2):
+            for cell in list(affected):
+                affected.update(n for n, action in self.neighbours(cell))
+        for cell in affected:
+            self.updateVertex(cell)
+        self.computeShortestPath()
+
+    def nextMove(self):
+        """The first move of the current shortest path, or None if the
+        goal cannot be reached safely."""
+        if self.g.get(self.start, INF) == INF:
+            return None
+        best = INF
+        move = None
+        for n, action in self.neighbours(self.start):
+            value = self.cost(self.start, n) + self.g.get(n, INF)
+            if value < best:
+                best = value
+                move = action
+        return move
+
+    def path(self):
+        """The whole of the current shortest path, as a list of moves."""
+        plan = []
+        cell = self.start
+        steps = {Directions.NORTH: self.width, Directions.SOUTH: -self.width,
+                 Directions.EAST: 1, Directions.WEST: -1}
+        while (cell != self.goal and self.g.get(cell, INF) != INF and
+               len(plan) < len(self.world.grid)):
+            best = INF
+            move = None
+            for n, action in self.neighbours(cell):
+                value = self.cost(cell, n) + self.g.get(n, INF)
+                if value < best:
+                    best = value
+                    move = action
+            if move is None:
+                return []
+            plan.append(move)
+            cell += steps[move]
+        return plan
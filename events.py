@@ -0,0 +1,112 @@
+# events.py
+#
+# Levelled events, used in place of printing messages.
+#
+# Code with something to report calls debug(), info() or warning()
+# with the name of the event, a message and its arguments, as in:
+#
+#   events.debug("link.move", "Next move: {}", next_move)
+#
+# The message is only formatted (with str.format) if a sink wants it,
+# and an event below the level of every sink returns straight away.
+# Where even working out the arguments costs something, check the
+# level first:
+#
+#   if events.level <= events.DEBUG:
+#       events.debug("search.gold", "Collected gold at {}", self.cellPosition(cell))
+#
+# Sinks subscribe to receive the events at or above their own level.
+# There are sinks that print to the console, that write to a file and
+# that count the events by name. By default the console shows INFO
+# events and above.
+
+from collections import Counter
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+# Above every level, for when no sink wants anything.
+OFF = 100
+
+levelNames = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+# The subscribed sinks, and the lowest level any of them wants.
+sinks = []
+level = OFF
+
+def subscribe(sink):
+    sinks.append(sink)
+    updateLevel()
+    return sink
+
+def unsubscribe(sink):
+    if sink in sinks:
+        sinks.remove(sink)
+    updateLevel()
+
+# Work out level again, after a sink is added or removed or its level
+# changes.
+def updateLevel():
+    global level
+    level = min((sink.level for sink in sinks), default=OFF)
+
+def emit(eventLevel, name, message, *args):
+    if eventLevel < level:
+        return
+    for sink in sinks:
+        if eventLevel >= sink.level:
+            sink.handle(eventLevel, name, message, args)
+
+def debug(name, message, *args):
+    if DEBUG >= level:
+        emit(DEBUG, name, message, *args)
+
+def info(name, message, *args):
+    if INFO >= level:
+        emit(INFO, name, message, *args)
+
+def warning(name, message, *args):
+    if WARNING >= level:
+        emit(WARNING, name, message, *args)
+
+def formatMessage(message, args):
+    return message.format(*args) if args else message
+
+# Print the message of each event, as the code used to.
+class ConsoleSink():
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def handle(self, eventLevel, name, message, args):
+        print(formatMessage(message, args))
+
+# Write each event, with its level and name, as a line of a file.
+class FileSink():
+    def __init__(self, path, level=DEBUG):
+        self.level = level
+        self.path = path
+        self.file = open(path, "a", buffering=1)
+
+    def handle(self, eventLevel, name, message, args):
+        self.file.write(f"{levelNames.get(eventLevel, eventLevel)}\t{name}\t"
+                        f"{formatMessage(message, args)}\n")
+
+    def close(self):
+        self.file.close()
+
+# Count the events by name. Messages are never formatted.
+class CounterSink():
+    def __init__(self, level=DEBUG):
+        self.level = level
+        self.counts = Counter()
+
+    def handle(self, eventLevel, name, message, args):
+        self.counts[name] += 1
+
+# The console sink everything starts with. Change its level with
+# setConsoleLevel(), or unsubscribe it for no output at all.
+console = subscribe(ConsoleSink())
+
+def setConsoleLevel(newLevel):
+    console.level = newLevel
+    updateLevel()
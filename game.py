@@ -10,21 +10,69 @@
 # Written by: Simon Parsons
 # Last Modified: 17/12/24
 
-from world import World
+from world import World, gameRngs
 from link  import Link
-from dungeon import Dungeon
-import random
 import config
+import events
 import utils
 import time
 
 # We explicitly define the main function to allow this to both be run
 # from the command line on its own, or invoked (from wumpus.py)
-def main(algorithmType):
+#
+# If seed is given, the world uses random number generators seeded
+# with it (see gameRngs), so the game can be replayed on its own. If
+# gameWorld is given (say, loaded from a corpus), the game is played
+# in it rather than in a new world.
+def main(algorithmType, seed=None, gameWorld=None):
     # How we set the game up. Create a world, then connect player and
     # display to it.
-    gameWorld = World()
+    if gameWorld is None:
+        if seed is not None:
+            placementRng, rng = gameRngs(seed)
+            gameWorld = World(rng, placementRng)
+        else:
+            gameWorld = World()
     player = Link(gameWorld, algorithmType)
+    startingGold = len(gameWorld.gLoc)
+
+    if config.headless:
+        steps = runHeadless(gameWorld, player)
+    else:
+        steps = runWithDisplay(gameWorld, player)
+
+    # Display message at end
+    if gameWorld.status == utils.State.WON:
+        events.info("game.won", "You won!")
+    else:
+        events.info("game.lost", "You lost!")
+
+    # What happened, for the results of a run
+    return {"outcome": gameWorld.status.name,
+            "steps": steps,
+            "gold": startingGold - len(gameWorld.gLoc),
+            "planningTime": player.planningTime,
+            "nodesExpanded": player.stats.expanded}
+
+# Run the game with nothing drawn and no pauses, as fast as it will
+# go. This is what we use for evaluation over many runs.
+def runHeadless(gameWorld, player):
+    steps = 0
+    while not(gameWorld.isEnded()):
+        if steps == config.maxSteps:
+            events.warning("game.timeout", "Out of time!")
+            gameWorld.status = utils.State.LOST
+            break
+        gameWorld.updateLink(player.makeMove())
+        gameWorld.updateWumpus()
+        steps += 1
+    return steps
+
+# Run the game in a window, pausing between steps so we can watch.
+def runWithDisplay(gameWorld, player):
+    # The graphics are only imported when we need them, so that
+    # headless runs don't need a display.
+    from dungeon import Dungeon
     display = Dungeon(gameWorld)
 
     # Uncomment this for a printout of world state at the start
@@ -32,25 +80,26 @@ def main(algorithmType):
 
     # Show initial state
     display.update()
-    time.sleep(1)
+    time.sleep(config.stepDelay)
     # Now run...
+    steps = 0
     while not(gameWorld.isEnded()):
+        if steps == config.maxSteps:
+            events.warning("game.timeout", "Out of time!")
+            gameWorld.status = utils.State.LOST
+            break
         gameWorld.updateLink(player.makeMove())
         gameWorld.updateWumpus()
+        steps += 1
         # Uncomment this for a printout of world state every step
         # utils.printGameState(gameWorld)
         display.update()
-        time.sleep(1)
-
-    # Display message at end
-    if gameWorld.status == utils.State.WON:
-        print("You won!")
-    else:
-        print("You lost!")
+        time.sleep(config.stepDelay)
 
     # Close the display --- neded if we are going to have multiple runs.
     display.close()
+    return steps
 
 # Since we explicitly named the main function
 if __name__ == "__main__":
-    main()
+    main(1)
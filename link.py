@@ -5,92 +5,138 @@
 # Optimized by: Mario Chiriac - March 2025
 
 import random
+import time
 import utils
 import config
-from utils import Pose, Directions
-from search import Search
+import events
+from search import Search, SearchStats
+from dstar import DStarLite
+from world import GOLD
 
 class Link:
     def __init__(self, dungeon, algorithmType):
         self.gameWorld = dungeon
         self.algorithmType = algorithmType
         self.search = Search(self.gameWorld)
-        self.allGold = set((gold.x, gold.y) for gold in self.gameWorld.getGoldLocation())
+        self.allGold = set(self.gameWorld.getGoldLocation())
         self.path = []
         self.path_index = 0
+        # Time spent planning, in seconds, over the whole game.
+        self.planningTime = 0.0
+        # The work done making the last plan, and in total.
+        self.lastStats = SearchStats()
+        self.stats = SearchStats()
+        # Used by the incremental planner (algorithm 7).
+        self.planner = None
+        self.wumpusCells = set()
 
     def makeMove(self):
         """Execute Link's next move, replanning if necessary."""
+        if self.algorithmType == 7:
+            return self.makeIncrementalMove()
         if not self.path or self.path_index >= len(self.path):
-            print("Path empty or completed. Planning new path...")
+            events.debug("link.plan", "Path empty or completed. Planning new path...")
             start = self.gameWorld.getLinkLocation()
+            self.search.stats = SearchStats()
+            began = time.perf_counter()
             self.path = self.search.find_path(self.algorithmType, start, self.allGold)
+            self.planningTime += time.perf_counter() - began
+            self.recordStats(self.search.stats)
             self.path_index = 0
             if not self.path:
-                print("No path found!")
+                events.warning("link.nopath", "No path found!")
                 return None
 
         current_location = self.gameWorld.getLinkLocation()
         next_move = self.path[self.path_index]
-        print(f"Next move: {next_move}")
+        events.debug("link.move", "Next move: {}", next_move)
 
         # Simulate next location
-        next_loc = Pose()
-        next_loc.x = current_location.x
-        next_loc.y = current_location.y
-        if next_move == Directions.NORTH:
-            next_loc.y = min(current_location.y + 1, self.gameWorld.maxY)
-        elif next_move == Directions.SOUTH:
-            next_loc.y = max(current_location.y - 1, 0)
-        elif next_move == Directions.EAST:
-            next_loc.x = min(current_location.x + 1, self.gameWorld.maxX)
-        elif next_move == Directions.WEST:
-            next_loc.x = max(current_location.x - 1, 0)
+        next_loc = current_location.step(next_move, self.gameWorld.maxX, self.gameWorld.maxY)
 
         # Dynamic hazard avoidance
         if config.dynamic and (self.gameWorld.isSmelly(next_loc) or
                                self.gameWorld.isWindy(next_loc) or
-                               (next_loc.x == current_location.x and next_loc.y == current_location.y)):
-            print(f"{next_move} is risky or blocked! Finding safe move...")
+                               next_loc == current_location):
+            events.debug("link.risky", "{} is risky or blocked! Finding safe move...", next_move)
             safe_move = self.findSafeMove(current_location)
             if safe_move:
                 self.path[self.path_index] = safe_move
                 self.path_index += 1
                 return safe_move
             else:
-                print("No safe moves, proceeding anyway!")
+                events.info("link.unsafe", "No safe moves, proceeding anyway!")
                 self.path_index += 1
                 return next_move
 
         self.path_index += 1
         return next_move
 
+    def makeIncrementalMove(self):
+        """Move along a D* Lite path to the nearest gold.
+
+        The planner keeps its search tree between moves. Each move,
+        it is told where Link is now and which cells a Wumpus has
+        entered or left, and repairs only what those cells affect.
+        """
+        world = self.gameWorld
+        here = world.lLoc.cell(world.width)
+        wumpusCells = set(w.cell(world.width) for w in world.wLoc)
+        stats = SearchStats()
+        began = time.perf_counter()
+        if self.planner is None or not world.grid[self.planner.goal] & GOLD:
+            gold = world.getGoldLocation()
+            if not gold:
+                return None
+            target = min(gold, key=lambda g: abs(g.x - world.lLoc.x) + abs(g.y - world.lLoc.y))
+            events.debug("link.plan", "Planning incremental path to gold at [ {} , {} ]", target.x, target.y)
+            self.planner = DStarLite(world, here, target.cell(world.width), stats)
+        else:
+            self.planner.stats = stats
+            self.planner.update(here, wumpusCells ^ self.wumpusCells)
+        self.planningTime += time.perf_counter() - began
+        self.recordStats(stats)
+        self.wumpusCells = wumpusCells
+
+        next_move = self.planner.nextMove()
+        if next_move is None:
+            events.info("link.nopath", "No safe path to the gold! Finding safe move...")
+            return self.findSafeMove(world.lLoc)
+        events.debug("link.move", "Next move: {}", next_move)
+
+        # The plan only goes through cells next to a Wumpus or a pit
+        # when there is no other way, so steer round them as makeMove
+        # does, and let the planner pick up from wherever Link ends up.
+        next_loc = world.lLoc.step(next_move, world.maxX, world.maxY)
+        if config.dynamic and (world.isSmelly(next_loc) or world.isWindy(next_loc)):
+            events.debug("link.risky", "{} is risky! Finding safe move...", next_move)
+            safe_move = self.findSafeMove(world.lLoc)
+            if safe_move:
+                return safe_move
+            events.info("link.unsafe", "No safe moves, proceeding anyway!")
+        return next_move
+
+    def recordStats(self, stats):
+        """Keep the stats of the plan just made, and add them to the total."""
+        self.lastStats = stats
+        self.stats.add(stats)
+
     def findSafeMove(self, current_location):
         """Find a safe move, prioritizing gold proximity."""
         possible_moves = self.search.getActions(current_location)
         if not possible_moves:
             return None
 
-        wumpus_positions = set((w.x, w.y) for w in self.gameWorld.wLoc)
+        wumpus_positions = set(self.gameWorld.wLoc)
         safe_moves = []
 
         last_move = self.path[self.path_index - 1] if self.path_index > 0 else None
 
         for action in possible_moves:
-            new_loc = Pose()
-            new_loc.x = current_location.x
-            new_loc.y = current_location.y
-            if action == Directions.NORTH:
-                new_loc.y += 1
-            elif action == Directions.SOUTH:
-                new_loc.y -= 1
-            elif action == Directions.EAST:
-                new_loc.x += 1
-            elif action == Directions.WEST:
-                new_loc.x -= 1
-
-            new_pos = (new_loc.x, new_loc.y)
-            if (new_pos not in wumpus_positions and
+            # getActions only gives moves that stay in the world.
+            new_loc = current_location.step(action, self.gameWorld.maxX, self.gameWorld.maxY)
+
+            if (new_loc not in wumpus_positions and
                 not any(abs(new_loc.x - wx) + abs(new_loc.y - wy) == 1 for wx, wy in wumpus_positions)):
                 if self.gameWorld.isGlitter(new_loc):
                     return action
@@ -107,4 +153,4 @@ class Link:
         return None
 
     def has_gold(self, location):
-        return any(location.x == g.x and location.y == g.y for g in self.gameWorld.getGoldLocation())
\ No newline at end of file
+        return location in self.gameWorld.getGoldLocation()
\ No newline at end of file
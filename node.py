@@ -1,20 +1,28 @@
 # node.py
+#
+# Search nodes for the game planners in search.py.
+#
+# A node records the cell it is in, as a single index y * width + x,
+# and the gold collected on the way there, as a bitmask with one bit
+# per gold. __slots__ keeps each node to a handful of words, and no
+# Pose, tuple or set is allocated per node; Pose.cell() and
+# Pose.fromCell() convert to and from the cell when one is needed.
 
-import utils
-        
 class Node:
-    def __init__(self, location, parent=None, action=None, cost=0, gold_collected=None):
-        self.location = location  # Pose (x, y)
+    __slots__ = ('cell', 'parent', 'action', 'cost', 'collected')
+
+    def __init__(self, cell, parent=None, action=None, cost=0, collected=0):
+        self.cell = cell          # Cell index
         self.parent = parent      # Parent node (for path recovery)
         self.action = action      # Action taken (NORTH, SOUTH, EAST, WEST)
         self.cost = cost          # Depth in search tree
-        self.gold_collected = gold_collected if gold_collected is not None else set()
+        self.collected = collected  # Bitmask of gold collected
 
-    def isGoal(self, gold):
-        return (self.location.x, self.location.y) == (gold.x, gold.y)
+    def isGoal(self, cell):
+        return self.cell == cell
 
     def __eq__(self, other):
-        return self.location.x == other.location.x and self.location.y == other.location.y
+        return self.cell == other.cell and self.collected == other.collected
 
     def __hash__(self):
-        return hash((self.location.x, self.location.y))
+        return self.cell ^ (self.collected << 32)
@@ -0,0 +1,42 @@
+# plancache.py
+#
+# A bounded cache of plans, used by PuzzleWorld.buildPlan so that the
+# same query is only planned once, however many times it comes up.
+
+from collections import OrderedDict
+import config
+
+class PlanCache():
+
+    def __init__(self, maxSize=None):
+        # How many plans to keep before dropping the least recently
+        # used one.
+        self.maxSize = config.planCacheSize if maxSize is None else maxSize
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.plans)
+
+    # Return the plan stored for key, or None if there isn't one. Plans
+    # are stored as tuples so that callers can't change them.
+    def get(self, key):
+        plan = self.plans.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.plans.move_to_end(key)
+        return plan
+
+    def put(self, key, plan):
+        self.plans[key] = tuple(plan)
+        self.plans.move_to_end(key)
+        if len(self.plans) > self.maxSize:
+            self.plans.popitem(last=False)
+
+    def clear(self):
+        self.plans.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,215 @@
+# profiling.py
+#
+# Profiles a run of the game or the puzzle with cProfile and
+# tracemalloc, and reports where the time and the memory went by
+# subsystem: search, world update, percepts, rendering and world
+# generation.
+#
+# This is what wumpus.py --profile uses. Time is attributed using the
+# own time of each function. Functions that don't belong to a
+# subsystem (the standard library, say) pass their time on to the
+# functions that call them, in proportion to the time spent in each
+# caller. Memory is attributed to the innermost frame of each
+# allocation that belongs to a subsystem. It is measured at the end of
+# each episode, while the world and Link are still around, and the
+# largest of these is reported.
+
+import ast
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+import events
+
+subsystems = ["search", "world update", "percepts", "rendering", "world generation"]
+
+# Which subsystem the functions in each file belong to, by function
+# name, with "*" for the rest of the functions in the file. Functions
+# in files not listed here, or mapped to None, belong to the
+# subsystem of their callers.
+subsystemRules = {
+    "search.py": {"*": "search"},
+    "dstar.py": {"*": "search"},
+    "node.py": {"*": "search"},
+    "plancache.py": {"*": "search"},
+    "cbs.py": {"*": "search"},
+    "link.py": {"*": "search"},
+    "world.py": {"__init__": "world generation", "buildGrid": "world generation",
+                 "newRng": "world generation",
+                 "spread": "percepts", "isSmelly": "percepts", "isWindy": "percepts",
+                 "isGlitter": "percepts", "linkSmelly": "percepts", "linkWindy": "percepts",
+                 "linkGlitter": "percepts", "isAdjacent": "percepts", "isDangerous": "percepts",
+                 "*": "world update"},
+    "puzzleWorld.py": {"__init__": "world generation", "buildPlan": "search",
+                       "buildJointPlan": "search", "findPlan": "search",
+                       "*": "world update"},
+    "utils.py": {"pickUniquePoses": "world generation", "*": None},
+    "zobrist.py": {"*": None},
+    "dungeon.py": {"*": "rendering"},
+    "graphics.py": {"*": "rendering"},
+}
+
+# Files of the standard library that only rendering uses.
+renderingModules = ("tkinter",)
+
+# Events marking the end of an episode.
+episodeEnds = ("game.won", "game.lost", "puzzle.won", "puzzle.lost")
+
+def subsystemOf(filename, function):
+    """The subsystem a function belongs to, or None."""
+    rules = subsystemRules.get(os.path.basename(filename))
+    if rules is None:
+        if any(module in filename for module in renderingModules):
+            return "rendering"
+        return None
+    return rules.get(function, rules["*"])
+
+# The line ranges of the functions in a file, for working out which
+# function a traced allocation was made in. Cached per file.
+functionRanges = {}
+
+def functionAt(filename, lineno):
+    if filename not in functionRanges:
+        ranges = []
+        try:
+            with open(filename) as f:
+                tree = ast.parse(f.read())
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    ranges.append((node.lineno, node.end_lineno, node.name))
+        except (OSError, SyntaxError, ValueError):
+            pass
+        # Innermost functions first, so nested functions win.
+        ranges.sort(key=lambda r: r[1] - r[0])
+        functionRanges[filename] = ranges
+    for first, last, name in functionRanges[filename]:
+        if first <= lineno <= last:
+            return name
+    return "*"
+
+# Takes a memory snapshot at the end of an episode, whenever more is
+# traced than at the end of any episode before.
+class SnapshotSink():
+    def __init__(self):
+        self.level = events.INFO
+        self.largest = 0
+        self.snapshot = None
+
+    def handle(self, eventLevel, name, message, args):
+        if name in episodeEnds:
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self.largest:
+                self.largest = current
+                self.snapshot = tracemalloc.take_snapshot()
+
+class Profiler():
+    def __init__(self, frames=25):
+        self.frames = frames
+        self.profile = cProfile.Profile()
+        self.sink = SnapshotSink()
+        self.peak = 0
+
+    def start(self):
+        events.subscribe(self.sink)
+        tracemalloc.start(self.frames)
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if self.sink.snapshot is None:
+            self.sink.snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        events.unsubscribe(self.sink)
+
+    def timeBySubsystem(self):
+        """Seconds of own time spent in each subsystem."""
+        stats = pstats.Stats(self.profile).stats
+        shares = {}
+
+        # How the time of func divides between subsystems, as a dict of
+        # fractions that add up to 1, and whether that is final. It
+        # isn't when a caller was skipped because it is part of a
+        # cycle of calls still being worked out, in which case it
+        # isn't remembered, and is empty if all the callers were
+        # skipped.
+        def share(func, active):
+            if func in shares:
+                return shares[func], True
+            filename, lineno, name = func
+            subsystem = subsystemOf(filename, name)
+            if subsystem is not None:
+                shares[func] = {subsystem: 1.0}
+                return shares[func], True
+            callers = stats.get(func, (0, 0, 0, 0, {}))[4]
+            result = {}
+            final = True
+            active.add(func)
+            for caller, entry in callers.items():
+                if caller == func or caller not in stats:
+                    continue
+                if caller in active:
+                    final = False
+                    continue
+                weight = entry[3] or 1e-9
+                parts, callerFinal = share(caller, active)
+                final = final and callerFinal
+                for part, fraction in parts.items():
+                    result[part] = result.get(part, 0.0) + weight * fraction
+            active.discard(func)
+            total = sum(result.values())
+            if total:
+                result = {part: value / total for part, value in result.items()}
+            elif final or not active:
+                # Nothing calls it that belongs to a subsystem.
+                result = {"other": 1.0}
+            if final or not active:
+                shares[func] = result
+            return result, final
+
+        times = dict.fromkeys(subsystems + ["other"], 0.0)
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            for part, fraction in share(func, set())[0].items():
+                times[part] += tt * fraction
+        return times
+
+    def memoryBySubsystem(self):
+        """Bytes of memory held by each subsystem at the end of the
+        episode with the most memory traced."""
+        memory = dict.fromkeys(subsystems + ["other"], 0)
+        for trace in self.sink.snapshot.traces:
+            part = "other"
+            for frame in reversed(trace.traceback):
+                subsystem = subsystemOf(frame.filename, functionAt(frame.filename, frame.lineno))
+                if subsystem is not None:
+                    part = subsystem
+                    break
+            memory[part] += trace.size
+        return memory
+
+    def report(self, title, top=20):
+        """The text of the report."""
+        out = io.StringIO()
+        times = self.timeBySubsystem()
+        memory = self.memoryBySubsystem()
+        totalTime = sum(times.values()) or 1.0
+        totalMemory = sum(memory.values()) or 1
+        out.write(title + "\n\n")
+        out.write(f"{'subsystem':<20}{'time (s)':>10}{'time %':>8}{'memory (KiB)':>14}{'memory %':>10}\n")
+        for part in subsystems + ["other"]:
+            out.write(f"{part:<20}{times[part]:>10.3f}{100 * times[part] / totalTime:>8.1f}"
+                      f"{memory[part] / 1024:>14.1f}{100 * memory[part] / totalMemory:>10.1f}\n")
+        out.write(f"{'total':<20}{sum(times.values()):>10.3f}{100.0:>8.1f}"
+                  f"{sum(memory.values()) / 1024:>14.1f}{100.0:>10.1f}\n\n")
+        out.write(f"Peak traced memory: {self.peak / 1024:.1f} KiB\n\n")
+        out.write(f"Top {top} functions by own time:\n")
+        pstats.Stats(self.profile, stream=out).sort_stats("tottime").print_stats(top)
+        return out.getvalue()
+
+    def save(self, path, title):
+        """Write the report to path, and the raw profile, which pstats
+        can read, to path + ".prof"."""
+        with open(path, "w") as f:
+            f.write(self.report(title))
+        self.profile.dump_stats(path + ".prof")
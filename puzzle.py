@@ -4,51 +4,92 @@
 # Last Modified: 17/12/24
 
 from puzzleWorld import PuzzleWorld
-from dungeon import Dungeon
 import random
 import config
+import events
 import utils
 import time
 
-def main(algorithm_type=1):
-    found_chars = [0, 0, 0]
-    puzzle = PuzzleWorld()
-    endState = PuzzleWorld()
+# Names of the puzzle algorithms, by the number used to select them.
+algorithmNames = {1: 'Depth First Search', 2: 'A* Search', 3: 'Jump Point Search',
+                  4: 'Bidirectional A* Search', 5: 'Conflict-Based Search',
+                  6: 'Manhattan Path (closed form, no search)'}
+
+# Algorithms that plan for every character at once, rather than for
+# one character after another.
+jointAlgorithms = (5,)
+
+# If seed is given, both worlds draw from a random number generator
+# seeded with it, so the puzzle can be replayed on its own. If worlds
+# is given (say, loaded from a corpus), it is the start and end state
+# to use rather than new ones.
+def main(algorithm_type=1, seed=None, worlds=None):
+    if worlds is None:
+        rng = random.Random(seed) if seed is not None else None
+        puzzle = PuzzleWorld(rng)
+        endState = PuzzleWorld(puzzle.rng)
+    else:
+        puzzle, endState = worlds
+    found_chars = [0] * (len(puzzle.wLoc) + 1)
+    joint = algorithm_type in jointAlgorithms
     if not config.headless:
+        # Only import the graphics when we need them, so that headless
+        # runs don't need a display.
+        from dungeon import Dungeon
         display = Dungeon(puzzle)
         show = Dungeon(endState)
 
     if not config.headless:
         display.update()
         show.update()
-        time.sleep(1)
+        time.sleep(config.stepDelay)
 
-    print(f"Puzzle will be completed with {'A* Search' if algorithm_type == 2 else 'Depth First Search'} algorithm.")
-    puzzle.buildPlan(0, endState, algorithm_type)
+    events.info("puzzle.start", "Puzzle will be completed with {} algorithm.",
+                algorithmNames.get(algorithm_type, 'Depth First Search'))
+    if joint:
+        puzzle.buildJointPlan(endState)
+    else:
+        puzzle.buildPlan(0, endState, algorithm_type)
 
+    steps = 0
     while not puzzle.isSolved(endState):
+        if steps == config.maxSteps:
+            events.warning("puzzle.timeout", "Out of time!")
+            puzzle.status = utils.State.LOST
+            break
+        steps += 1
         if utils.sameLink(puzzle, endState) and found_chars[0] == 0:
-            print("Link aligned")
+            events.info("puzzle.aligned", "Link aligned")
             found_chars[0] = 1
-            puzzle.buildPlan(1, endState, algorithm_type)
+            if not joint:
+                puzzle.buildPlan(1, endState, algorithm_type)
         for i in range(len(puzzle.wLoc)):
             if utils.sameLocation(puzzle.wLoc[i], endState.wLoc[i]) and found_chars[i + 1] == 0:
-                print(f"Wumpus {i} aligned")
+                events.info("puzzle.aligned", "Wumpus {} aligned", i)
                 found_chars[i + 1] = 1
-                if i + 1 < len(puzzle.wLoc):
+                if i + 1 < len(puzzle.wLoc) and not joint:
                     puzzle.buildPlan(i + 2, endState, algorithm_type)
         puzzle.makeAMove(endState)
         if not config.headless:
             display.update()
-            time.sleep(1)
+            time.sleep(config.stepDelay)
 
     if puzzle.status == utils.State.WON:
-        print("You succeeded!")
+        events.info("puzzle.won", "You succeeded!")
     else:
-        print("You failed!")
+        events.info("puzzle.lost", "You failed!")
 
     if not config.headless:
         display.close()
 
+    # What happened, for the results of a run
+    return {"outcome": puzzle.status.name,
+            "steps": steps,
+            "gold": 0,
+            "planningTime": puzzle.planningTime,
+            "nodesExpanded": puzzle.stats.expanded,
+            "cacheHits": puzzle.cacheHits,
+            "cacheMisses": puzzle.cacheMisses}
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
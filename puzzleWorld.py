@@ -3,94 +3,218 @@
 # Written by: Simon Parsons
 # Last Modified: 17/12/24
 
+import bisect
 import random
 import config
+import events
 import utils
-from search import Search
-from world import World
+import time
+import zobrist
+from cbs import ConflictBasedSearch
+from search import Search, SearchStats
+from plancache import PlanCache
+from world import World, newRng
 from utils import Pose, Directions, State
 
+# Plans found so far, with one cache per algorithm, keyed as planKey
+# says. These are shared by all puzzles, so repeated runs don't plan
+# the same thing twice.
+planCaches = {}
+
+# The algorithms that always find a shortest path: A* (2), JPS (3),
+# bidirectional A* (4) and the closed form (6).
+shortestAlgorithms = {2, 3, 4, 6}
+
+# The key a plan from start to goal is cached under. Nothing is in the
+# way in the puzzle, so every shortest path stays inside the box with
+# start and goal at its corners, and the same moves get from any start
+# to the goal the same distance away. A shortest plan is keyed by that
+# offset alone, which comes up again far more often than the same
+# start and goal do. DFS wanders, and its plans depend on where the
+# edges of the world are, so they are keyed by where they start and
+# end and the size of the world.
+def planKey(start, goal, maxX, maxY, algorithm_type):
+    if algorithm_type in shortestAlgorithms:
+        return (goal.x - start.x, goal.y - start.y)
+    return (start, goal, maxX, maxY)
+
 class PuzzleWorld(World):
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else newRng()
         self.maxX = config.worldLength - 1
         self.maxY = config.worldBreadth - 1
-        self.wLoc = []
-        self.locationList = []
-        for i in range(config.numberOfWumpus):
-            newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-            self.wLoc.append(newLoc)
-            self.locationList.append(newLoc)
-        newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-        self.lLoc = newLoc
-        self.locationList.append(newLoc)
+        # The Wumpus and then Link, in different cells.
+        self.locationList = utils.pickUniquePoses(self.maxX, self.maxY,
+                                                  config.numberOfWumpus + 1, self.rng)
+        self.wLoc = self.locationList[:-1]
+        self.lLoc = self.locationList[-1]
         self.pLoc = []
         self.gLoc = []
+        self.setUp()
+
+    def setUp(self):
         self.status = State.PLAY
         self.moves = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
         self.plan = []
+        # The work done making the last plan and in total, the time
+        # spent planning for this puzzle, and how often its plans were
+        # found in the plan cache.
+        self.lastStats = SearchStats()
+        self.stats = SearchStats()
+        self.planningTime = 0.0
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.updateSignature()
+
+    # Work out the signature of where the characters are: the cell of
+    # Link and the cells of the Wumpus in sorted order, as (link,
+    # (wumpus, ...)). Two puzzles of the same size have the same
+    # signature exactly when their characters are in the same places,
+    # whichever Wumpus is where, so utils.sameAs and friends compare
+    # signatures, and they can be used as dictionary keys. takeStep
+    # keeps the signature up to date; call this after moving the
+    # characters any other way.
+    #
+    # Alongside it we keep the Zobrist hash of the same positions (see
+    # zobrist.py), which takeStep updates by XOR.
+    def updateSignature(self):
+        width = self.maxX + 1
+        self.wumpusCells = [w.cell(width) for w in self.wLoc]
+        self.signature = (self.lLoc.cell(width), tuple(sorted(self.wumpusCells)))
+        self.zobrist = zobrist.key(zobrist.LINK, self.signature[0])
+        wumpus = self.signature[1]
+        for i, cell in enumerate(wumpus):
+            # The count-th Wumpus in this cell, counting from 1.
+            count = i - bisect.bisect_left(wumpus, cell) + 1
+            self.zobrist ^= zobrist.key(zobrist.WUMPUS, cell, count)
 
     def buildPlan(self, for_char, goal, algorithm_type):
-        """Build a plan using DFS (1) or A* (2) from Search class."""
+        """Build a plan using DFS (1), A* (2), JPS (3), bidirectional
+        A* (4) or the closed-form Manhattan path (6) from Search
+        class."""
+        # A move has an action for Link and then each Wumpus, with 0
+        # for the characters that stay put.
+        def format_move(action):
+            move = [0] * (len(self.wLoc) + 1)
+            move[for_char] = action
+            return move
         if for_char == 0:
-            start = (self.lLoc.x, self.lLoc.y)
-            goal_loc = (goal.lLoc.x, goal.lLoc.y)
-            format_move = lambda action: [action, 0, 0]  # Link move
+            start = self.lLoc
+            goal_loc = goal.lLoc
         else:
-            start = (self.wLoc[for_char - 1].x, self.wLoc[for_char - 1].y)
-            goal_loc = (goal.wLoc[for_char - 1].x, goal.wLoc[for_char - 1].y)
-            format_move = lambda action: [0, action, 0] if for_char == 1 else [0, 0, action]  # Wumpus move
+            start = self.wLoc[for_char - 1]
+            goal_loc = goal.wLoc[for_char - 1]
 
-        if algorithm_type == 1:
-            plan = Search.dfs_path(start, goal_loc, self.maxX, self.maxY)
-        elif algorithm_type == 2:
-            plan = Search.astar_path(start, goal_loc, self.maxX, self.maxY)
+        cache = planCaches.setdefault(algorithm_type, PlanCache())
+        key = planKey(start, goal_loc, self.maxX, self.maxY, algorithm_type)
+        stats = SearchStats()
+        began = time.perf_counter()
+        plan = cache.get(key)
+        if plan is None:
+            self.cacheMisses += 1
+            plan = self.findPlan(start, goal_loc, algorithm_type, stats)
+            if plan is not None:
+                cache.put(key, plan)
         else:
-            plan = Search.dfs_path(start, goal_loc, self.maxX, self.maxY)  # Default to DFS
+            self.cacheHits += 1
+        self.planningTime += time.perf_counter() - began
+        self.lastStats = stats
+        self.stats.add(stats)
 
         if plan:
             self.plan = list(map(format_move, plan))
         else:
-            print(f"No solution found for character {for_char}")
+            events.warning("puzzle.noplan", "No solution found for character {}", for_char)
             self.plan = []
 
+    def buildJointPlan(self, goal):
+        """Build a plan for Link and all the Wumpus at once, using
+        conflict-based search, in which characters move together but
+        never share a cell or swap cells. Each move has an action for
+        every character, and between them the characters take as few
+        steps as they can."""
+        width = self.maxX + 1
+        starts = [self.lLoc.cell(width)] + self.wumpusCells
+        goals = [goal.lLoc.cell(width)] + [w.cell(width) for w in goal.wLoc]
+        stats = SearchStats()
+        began = time.perf_counter()
+        planner = ConflictBasedSearch(self.maxX, self.maxY, self.pLoc, stats=stats)
+        plan = planner.solve(starts, goals)
+        self.planningTime += time.perf_counter() - began
+        self.lastStats = stats
+        self.stats.add(stats)
+
+        if plan is not None:
+            self.plan = plan
+        else:
+            events.warning("puzzle.noplan", "No joint solution found")
+            self.plan = []
+
+    def findPlan(self, start, goal_loc, algorithm_type, stats):
+        """Plan a path for one character from start to goal_loc,
+        recording the work done in stats."""
+        # There is nothing in the way in the puzzle, so a shortest path
+        # can just be written down rather than searched for. That is
+        # its own algorithm, so that the others always run the planner
+        # they are named after.
+        if algorithm_type == 6:
+            return Search.manhattan_path(start, goal_loc)
+        elif algorithm_type == 1:
+            return Search.dfs_path(start, goal_loc, self.maxX, self.maxY, stats=stats)
+        elif algorithm_type == 2:
+            return Search.astar_path(start, goal_loc, self.maxX, self.maxY, stats=stats)
+        elif algorithm_type == 3:
+            return Search.jps_path(start, goal_loc, self.maxX, self.maxY, stats=stats)
+        elif algorithm_type == 4:
+            return Search.bidir_path(start, goal_loc, self.maxX, self.maxY, stats=stats)
+        else:
+            return Search.dfs_path(start, goal_loc, self.maxX, self.maxY, stats=stats)  # Default to DFS
+
     def isSolved(self, goal):
-        if utils.sameLink(self, goal) and utils.sameWumpus(self, goal):
+        if self.signature == goal.signature:
             self.status = State.WON
-            print("Puzzle Over! Wumpus and Link match.")
+            events.info("puzzle.solved", "Puzzle Over! Wumpus and Link match.")
             return True
         return False
 
     def makeAMove(self, goal):
         if self.plan:
             move = self.plan.pop(0)  # Changed to pop(0) for FIFO
-            print(move)
+            events.debug("puzzle.step", "{}", move)
             self.takeStep(move)
         else:
-            print("Nothing to do!")
+            events.debug("puzzle.idle", "Nothing to do!")
 
+    # Carry out move, which has an action (or 0) for Link and then
+    # each Wumpus. Everyone with an action moves in the same step.
     def takeStep(self, move):
         if move[0] != 0:
-            print("Moving Link")
-            direction = move[0]
-            if direction == Directions.NORTH and self.lLoc.y < self.maxY:
-                self.lLoc.y += 1
-            elif direction == Directions.SOUTH and self.lLoc.y > 0:
-                self.lLoc.y -= 1
-            elif direction == Directions.EAST and self.lLoc.x < self.maxX:
-                self.lLoc.x += 1
-            elif direction == Directions.WEST and self.lLoc.x > 0:
-                self.lLoc.x -= 1
-        else:
-            for i in range(1, len(self.wLoc) + 1):
-                if move[i] != 0:
-                    print(f"Moving Wumpus {i-1}")
-                    direction = move[i]
-                    j = i - 1
-                    if direction == Directions.NORTH and self.wLoc[j].y < self.maxY:
-                        self.wLoc[j].y += 1
-                    elif direction == Directions.SOUTH and self.wLoc[j].y > 0:
-                        self.wLoc[j].y -= 1
-                    elif direction == Directions.EAST and self.wLoc[j].x < self.maxX:
-                        self.wLoc[j].x += 1
-                    elif direction == Directions.WEST and self.wLoc[j].x > 0:
-                        self.wLoc[j].x -= 1
\ No newline at end of file
+            events.debug("puzzle.move", "Moving Link")
+            self.lLoc = self.lLoc.step(move[0], self.maxX, self.maxY)
+            cell = self.lLoc.cell(self.maxX + 1)
+            if cell != self.signature[0]:
+                self.zobrist ^= (zobrist.key(zobrist.LINK, self.signature[0]) ^
+                                 zobrist.key(zobrist.LINK, cell))
+                self.signature = (cell, self.signature[1])
+        for i in range(1, len(self.wLoc) + 1):
+            if move[i] != 0:
+                events.debug("puzzle.move", "Moving Wumpus {}", i - 1)
+                j = i - 1
+                self.wLoc[j] = self.wLoc[j].step(move[i], self.maxX, self.maxY)
+                self.moveWumpusCell(j)
+
+    # Update the signature after Wumpus j has moved (or tried to).
+    def moveWumpusCell(self, j):
+        cell = self.wLoc[j].cell(self.maxX + 1)
+        old = self.wumpusCells[j]
+        if cell != old:
+            self.wumpusCells[j] = cell
+            wumpus = list(self.signature[1])
+            # Wumpus are keyed by how many are in their cell, so the one
+            # that leaves takes the key of the last one in, and the one
+            # that arrives the next.
+            self.zobrist ^= zobrist.key(zobrist.WUMPUS, old, wumpus.count(old))
+            del wumpus[bisect.bisect_left(wumpus, old)]
+            bisect.insort(wumpus, cell)
+            self.zobrist ^= zobrist.key(zobrist.WUMPUS, cell, wumpus.count(cell))
+            self.signature = (self.signature[0], tuple(wumpus))
@@ -0,0 +1,117 @@
+# results.py
+#
+# Records what happened in each episode of a run, and summarises the
+# run at the end.
+#
+# Records are written to the log file as each episode finishes, and
+# the summary is kept as histograms rather than lists of values, so
+# the memory used doesn't grow with the number of episodes.
+
+import csv
+import json
+import math
+
+# The fields of an episode record, in the order used for CSV files.
+fields = ["index", "seed", "type", "algorithm", "outcome", "steps", "gold",
+          "planningTime", "nodesExpanded", "cacheHits", "cacheMisses"]
+
+# Write episode records to a file: CSV if the name ends in .csv, and
+# JSON Lines (one JSON object per line) otherwise.
+class ResultsLog():
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = None
+        if path.endswith(".csv"):
+            self.writer = csv.DictWriter(self.file, fieldnames=fields)
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.writer is not None:
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.close()
+
+# Counts of values in buckets, from which the mean and percentiles can
+# be read off. With a precision, buckets grow geometrically, so any
+# percentile is accurate to within that relative error; without one,
+# each distinct value gets its own bucket (fine for step counts, which
+# are bounded by config.maxSteps).
+class Histogram():
+
+    def __init__(self, precision=None):
+        self.logBase = math.log1p(precision) if precision else None
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+
+    def add(self, value):
+        self.total += 1
+        self.sum += value
+        if self.logBase is None:
+            bucket = value
+        elif value <= 0:
+            bucket = None
+        else:
+            bucket = math.floor(math.log(value) / self.logBase)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    # The value below which p percent of the values fall.
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.total))
+        seen = self.counts.get(None, 0)
+        if seen >= rank:
+            return 0
+        for bucket in sorted(b for b in self.counts if b is not None):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                if self.logBase is None:
+                    return bucket
+                # The middle of the bucket
+                return math.exp((bucket + 0.5) * self.logBase)
+        return 0
+
+# Statistics over all the episodes of a run.
+class Summary():
+
+    def __init__(self):
+        self.episodes = 0
+        self.wins = 0
+        self.steps = Histogram()
+        self.planning = Histogram(0.01)
+        # Plan cache lookups, which only puzzle records have. These
+        # come back with the records, so they are counted wherever the
+        # episodes ran.
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+    def add(self, record):
+        self.episodes += 1
+        if record["outcome"] == "WON":
+            self.wins += 1
+        self.steps.add(record["steps"])
+        self.planning.add(record["planningTime"])
+        self.cacheHits += record.get("cacheHits", 0)
+        self.cacheMisses += record.get("cacheMisses", 0)
+
+    def report(self):
+        if not self.episodes:
+            return
+        print(f"Episodes: {self.episodes}, won {self.wins} "
+              f"({100 * self.wins / self.episodes:.1f}%)")
+        print(f"Steps: mean {self.steps.mean():.1f}, p50 {self.steps.percentile(50)}, "
+              f"p90 {self.steps.percentile(90)}, p99 {self.steps.percentile(99)}")
+        print(f"Planning time (ms): mean {1000 * self.planning.mean():.3f}, "
+              f"p50 {1000 * self.planning.percentile(50):.3f}, "
+              f"p90 {1000 * self.planning.percentile(90):.3f}, "
+              f"p99 {1000 * self.planning.percentile(99):.3f}")
+        if self.cacheHits or self.cacheMisses:
+            print(f"Plan cache: {self.cacheHits} hits, {self.cacheMisses} misses")
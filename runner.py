@@ -0,0 +1,107 @@
+# runner.py
+#
+# Runs many episodes of the game or the puzzle, one after another or
+# spread over a pool of worker processes.
+#
+# Each episode gets its own random number generator, seeded from
+# config.myId and the index of the episode, so the outcome of an
+# episode doesn't depend on the ones before it, and is the same however
+# many workers there are and whichever of them runs it.
+
+import multiprocessing
+import random
+import config
+import events
+import game
+import puzzle
+import scenario
+from world import episodeSeed, gameRngs
+
+# The corpus files opened so far in this process, by path.
+corpora = {}
+
+def openCorpus(path):
+    if path not in corpora:
+        corpora[path] = scenario.Corpus(path)
+    return corpora[path]
+
+# Run a single episode. task is (wType, algorithmType, index,
+# corpusPath), and the result is the record of the episode returned by
+# game.main or puzzle.main, with the details of the task added. If
+# corpusPath isn't None, the episode starts from scenario index of
+# that corpus, and everything random after that is drawn just as it
+# would be had the episode placed everything itself, so the record is
+# the same either way.
+def runEpisode(task):
+    wType, algorithmType, index, corpusPath = task
+    seed = episodeSeed(index)
+    start = None
+    if corpusPath is not None:
+        corpus = openCorpus(corpusPath)
+        if corpus.kind == scenario.GAME:
+            start = corpus.load(index, gameRngs(seed)[1])
+        else:
+            # The puzzle draws nothing once it is placed.
+            start = corpus.load(index, random.Random(seed))
+    if wType == "game":
+        events.info("runner.episode", "Running game with algorithm {}", algorithmType)
+        outcome = game.main(algorithmType, seed, start)
+    else:
+        events.info("runner.episode", "Running puzzle with algorithm {}", algorithmType)
+        outcome = puzzle.main(algorithmType, seed, start)
+    record = {"index": index, "seed": seed, "type": wType, "algorithm": algorithmType}
+    record.update(outcome)
+    if workerCounters:
+        record["eventCounts"] = [dict(counter.counts) for counter in workerCounters]
+        for counter in workerCounters:
+            counter.counts.clear()
+    return record
+
+# What a worker process needs to handle events as this process does:
+# the console level, the path and level of each file being traced to,
+# and the levels of the sinks counting events.
+def eventSettings():
+    return (events.console.level,
+            [(sink.path, sink.level) for sink in events.sinks if isinstance(sink, events.FileSink)],
+            [sink.level for sink in events.sinks if isinstance(sink, events.CounterSink)])
+
+# The sinks counting events in this worker process, if it is one.
+workerCounters = []
+
+# Worker processes can't open windows, so they always run headless.
+# They set up their events from eventSettings() in the main process,
+# with sinks of their own rather than any they inherit: each traces to
+# the same files (opened for appending, a line at a time, so lines
+# from different processes don't mix), and sends its counts back with
+# the record of each episode.
+def initWorker(consoleLevel, traces, counterLevels):
+    config.headless = True
+    for sink in list(events.sinks):
+        if sink is not events.console:
+            events.unsubscribe(sink)
+    events.setConsoleLevel(consoleLevel)
+    for path, level in traces:
+        events.subscribe(events.FileSink(path, level))
+    workerCounters[:] = [events.subscribe(events.CounterSink(level)) for level in counterLevels]
+
+# Run count episodes, numbered from first, using workers processes if
+# workers > 1. Yields the records from runEpisode in episode order, as
+# they are ready, so that a long run never holds all of them at once.
+def runEpisodes(wType, algorithmType, count, workers=1, first=0, corpusPath=None):
+    tasks = ((wType, algorithmType, index, corpusPath) for index in range(first, first + count))
+    if workers <= 1:
+        for task in tasks:
+            yield runEpisode(task)
+        return
+    # Hand out episodes in chunks so that workers don't spend their
+    # time waiting on the pool, but not so large that the last few
+    # workers are left idle.
+    chunk = max(1, min(64, count // (workers * 8)))
+    # The counts from each worker are added to this process's counters,
+    # in the same order as eventSettings() lists them.
+    counters = [sink for sink in events.sinks if isinstance(sink, events.CounterSink)]
+    with multiprocessing.Pool(workers, initializer=initWorker, initargs=eventSettings()) as pool:
+        for record in pool.imap(runEpisode, tasks, chunk):
+            for counter, counts in zip(counters, record.pop("eventCounts", ())):
+                counter.counts.update(counts)
+            yield record
@@ -0,0 +1,216 @@
+# scenario.py
+#
+# Saves worlds to, and loads them from, a compact binary format, so
+# that runs can be repeated on exactly the same worlds without
+# generating them again.
+#
+# A file holds a corpus of scenarios, all with the same dimensions and
+# numbers of objects. A scenario is a World for the game, or the start
+# and end PuzzleWorld for the puzzle, and is stored as the cell index
+# (y * width + x) of each object, packed into 2 bytes each if the grid
+# has at most 65536 cells and 4 otherwise. Since every scenario is the
+# same size, scenario i is found by its offset, and a Corpus reads it
+# from a memory map of the file, so a corpus of millions of scenarios
+# is never loaded all at once.
+#
+# To write a corpus of the worlds that runs with wumpus.py would use:
+# python scenario.py -g -n 1000000 -o games.wwc
+# python scenario.py -p -n 1000 -o puzzles.wwc
+#
+# and to run on them:
+# python wumpus.py -g 6 -d -n 1000 --corpus games.wwc
+
+import getopt
+import mmap
+import random
+import struct
+import sys
+import config
+from puzzleWorld import PuzzleWorld
+from utils import Pose
+from world import World, episodeSeed, gameRngs
+
+MAGIC = b"WWSC"
+VERSION = 1
+
+# What a scenario holds.
+GAME = 0
+PUZZLE = 1
+
+# magic, version, kind, bytes per cell, width, height, number of
+# Wumpus, gold and pits, number of scenarios.
+header = struct.Struct("<4sBBBxHHHHHxxQ")
+
+def cellFormat(width, height):
+    return "H" if width * height <= 1 << 16 else "I"
+
+def poseAt(cell, width):
+    return Pose.fromCell(cell, width)
+
+# The cells of a world's objects: Link, then the Wumpus, the gold and
+# the pits.
+def worldCells(world):
+    width = world.maxX + 1
+    return ([world.lLoc.cell(width)] +
+            [p.cell(width) for p in world.wLoc + world.gLoc + world.pLoc])
+
+# Write scenarios to a corpus file, one at a time.
+class CorpusWriter():
+
+    def __init__(self, path, kind, width, height, wumpus, gold=0, pits=0):
+        if kind == PUZZLE and (gold or pits):
+            raise ValueError("Puzzles have no gold or pits")
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.counts = (wumpus, gold, pits)
+        objects = 1 + wumpus + gold + pits
+        if kind == PUZZLE:
+            objects *= 2
+        self.cellSize = struct.calcsize(cellFormat(width, height))
+        self.record = struct.Struct("<" + cellFormat(width, height) * objects)
+        self.count = 0
+        self.file = open(path, "wb")
+        self.writeHeader()
+
+    def writeHeader(self):
+        self.file.write(header.pack(MAGIC, VERSION, self.kind, self.cellSize,
+                                    self.width, self.height, *self.counts, self.count))
+
+    # Add a scenario: a World for the game, or the start and end
+    # PuzzleWorld for the puzzle.
+    def write(self, *worlds):
+        cells = []
+        for world in worlds:
+            if (world.maxX + 1, world.maxY + 1) != (self.width, self.height):
+                raise ValueError("World is not the same size as the corpus")
+            if (len(world.wLoc), len(world.gLoc), len(world.pLoc)) != self.counts:
+                raise ValueError("World does not have the same objects as the corpus")
+            cells.extend(worldCells(world))
+        self.file.write(self.record.pack(*cells))
+        self.count += 1
+
+    # Go back and fill in the number of scenarios.
+    def close(self):
+        self.file.seek(0)
+        self.writeHeader()
+        self.file.close()
+
+# Read the scenarios in a corpus file, by index.
+class Corpus():
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.kind, cellSize, self.width, self.height,
+         wumpus, gold, pits, self.count) = header.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a scenario corpus")
+        self.counts = (wumpus, gold, pits)
+        objects = 1 + wumpus + gold + pits
+        if self.kind == PUZZLE:
+            objects *= 2
+        self.record = struct.Struct("<" + ("H" if cellSize == 2 else "I") * objects)
+        if len(self.data) < header.size + self.count * self.record.size:
+            raise ValueError(f"{path} is shorter than its header says")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.load(index)
+
+    # The cells in scenario index, as worldCells gives them.
+    def cells(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f"Scenario {index} is not in the corpus")
+        return self.record.unpack_from(self.data, header.size + index * self.record.size)
+
+    # Scenario index: a World for the game, or a tuple of the start and
+    # end PuzzleWorld for the puzzle. The worlds use rng for anything
+    # random from then on.
+    def load(self, index, rng=None):
+        cells = self.cells(index)
+        wumpus, gold, pits = self.counts
+        maxX = self.width - 1
+        maxY = self.height - 1
+        poses = [poseAt(cell, self.width) for cell in cells]
+        if self.kind == GAME:
+            return World.fromPositions(maxX, maxY, poses[0], poses[1:1 + wumpus],
+                                       poses[1 + wumpus:1 + wumpus + gold],
+                                       poses[1 + wumpus + gold:], rng)
+        start = PuzzleWorld.fromPositions(maxX, maxY, poses[0], poses[1:1 + wumpus], rng=rng)
+        end = PuzzleWorld.fromPositions(maxX, maxY, poses[1 + wumpus], poses[2 + wumpus:],
+                                        rng=start.rng)
+        return start, end
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+# Save a single scenario to path, as a corpus of one.
+def save(path, *worlds):
+    world = worlds[0]
+    kind = PUZZLE if isinstance(world, PuzzleWorld) else GAME
+    writer = CorpusWriter(path, kind, world.maxX + 1, world.maxY + 1,
+                          len(world.wLoc), len(world.gLoc), len(world.pLoc))
+    writer.write(*worlds)
+    writer.close()
+
+# Load the scenario saved by save.
+def load(path, rng=None):
+    corpus = Corpus(path)
+    scenario = corpus.load(0, rng)
+    corpus.close()
+    return scenario
+
+# Write a corpus of the scenarios that the first count episodes of a
+# run start with, given the current config, so that scenario i is the
+# start of episode i.
+def writeCorpus(path, kind, count):
+    writer = CorpusWriter(path, kind, config.worldLength, config.worldBreadth,
+                          config.numberOfWumpus,
+                          config.numberOfGold if kind == GAME else 0,
+                          config.numberOfPits if kind == GAME else 0)
+    for index in range(count):
+        if kind == GAME:
+            placementRng, rng = gameRngs(episodeSeed(index))
+            writer.write(World(rng, placementRng))
+        else:
+            start = PuzzleWorld(random.Random(episodeSeed(index)))
+            writer.write(start, PuzzleWorld(start.rng))
+    writer.close()
+
+def main():
+    kind = GAME
+    count = 1
+    path = None
+    try:
+        arguments, values = getopt.getopt(sys.argv[1:], "hgpn:o:")
+        for currentArgument, currentValue in arguments:
+            if currentArgument == "-h":
+                print("scenario.py accepts the following arguments:")
+                print("-g : write game worlds (default)")
+                print("-p : write puzzle start and end states")
+                print("-n <number> : how many scenarios to write")
+                print("-o <file> : the corpus file to write")
+                return
+            elif currentArgument == "-g":
+                kind = GAME
+            elif currentArgument == "-p":
+                kind = PUZZLE
+            elif currentArgument == "-n":
+                count = int(currentValue)
+            elif currentArgument == "-o":
+                path = currentValue
+    except (getopt.GetoptError, ValueError) as err:
+        print(str(err))
+        return
+
+    if path is None:
+        print("No corpus file given (use -o <file>)")
+        return
+    writeCorpus(path, kind, count)
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,464 @@
 # search.py
+import functools
 import heapq
-from utils import Pose, Directions
+import time
+from collections import deque
+from itertools import count
+import events
+from utils import Directions, Pose
 from node import Node  # Assuming Node is defined in node.py
+from world import DANGER
+
+# The puzzle planners work on integer cell IDs, where the cell (x, y)
+# is y * width + x. Rather than carrying a copy of the path in every
+# frontier entry, they record in a bytearray the code of the action
+# that first reached each cell, and walk back from the goal once it
+# is found. Codes are the values of Directions, with 0 meaning "not
+# reached yet" and START marking the start cell.
+START = 5
+ACTIONS = [None, Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+# Counts of the work done by planners. Every planner takes an optional
+# stats object and adds to it, so one object can total up the work of
+# several searches.
+class SearchStats():
+    def __init__(self):
+        self.generated = 0      # Nodes put on the frontier
+        self.expanded = 0       # Nodes taken off the frontier and expanded
+        self.duplicates = 0     # Nodes dropped because their state was already reached
+        self.peakFrontier = 0   # Most nodes on the frontier at once
+        self.peakClosed = 0     # Most states in the closed set at once
+        self.elapsed = 0.0      # Time spent planning, in seconds
+        # Set while a planner is timing itself, so that planners it
+        # calls with the same stats don't count that time twice.
+        self.timing = False
+
+    def closed(self, size):
+        """Note that the closed set has reached size states."""
+        if size > self.peakClosed:
+            self.peakClosed = size
+
+    def add(self, other):
+        """Add in the work recorded by other."""
+        self.generated += other.generated
+        self.expanded += other.expanded
+        self.duplicates += other.duplicates
+        self.peakFrontier = max(self.peakFrontier, other.peakFrontier)
+        self.peakClosed = max(self.peakClosed, other.peakClosed)
+        self.elapsed += other.elapsed
+
+    def __repr__(self):
+        return (f"SearchStats(generated={self.generated}, expanded={self.expanded}, "
+                f"duplicates={self.duplicates}, peakFrontier={self.peakFrontier}, "
+                f"peakClosed={self.peakClosed}, elapsed={self.elapsed:.6f})")
+
+# Wraps a planner so that the time it takes is added to stats.elapsed.
+# The stats are self.stats for planners that are methods (the game
+# planners and D* Lite), and the stats argument for the static ones,
+# which is keyword-only so that it is always found here (one is made
+# if it isn't given).
+def timed(planner):
+    @functools.wraps(planner)
+    def timedPlanner(*args, **kwargs):
+        if args and hasattr(args[0], "stats"):
+            stats = args[0].stats
+        else:
+            stats = kwargs.get("stats")
+            if stats is None:
+                stats = kwargs["stats"] = SearchStats()
+        if stats.timing:
+            return planner(*args, **kwargs)
+        stats.timing = True
+        began = time.perf_counter()
+        try:
+            return planner(*args, **kwargs)
+        finally:
+            stats.elapsed += time.perf_counter() - began
+            stats.timing = False
+    return timedPlanner
 
 class Search:
     # Static methods for puzzle version (simple pathfinding)
     @staticmethod
-    def dfs_path(start, goal, maxX, maxY):
+    def reconstructPath(came, cell, width):
+        """Walk back from cell to the start using the action codes in came."""
+        # How much each action changes the cell ID.
+        step = [0, width, -width, 1, -1]
+        path = []
+        code = came[cell]
+        while code != START:
+            path.append(ACTIONS[code])
+            cell -= step[code]
+            code = came[cell]
+        path.reverse()
+        return path
+
+    @staticmethod
+    @timed
+    def dfs_path(start, goal, maxX, maxY, *, stats=None):
         """DFS for puzzle: Find path from start to goal on a grid."""
-        stack = [(start, [])]  # (position (x, y), path)
-        visited = set()
+        stats = stats if stats is not None else SearchStats()
+        width = maxX + 1
+        startCell = start[1] * width + start[0]
+        goalCell = goal[1] * width + goal[0]
+        came = bytearray(width * (maxY + 1))
+        # Each stack entry packs the cell ID and the action that
+        # reached it into a single int, cell << 3 | code.
+        stack = [startCell << 3 | START]
+        closed = 0
         while stack:
-            (x, y), path = stack.pop()
-            if (x, y) == goal:
-                return path
-            if (x, y) not in visited:
-                visited.add((x, y))
-                for dx, dy, action in [(0, 1, Directions.NORTH), (0, -1, Directions.SOUTH),
-                                       (1, 0, Directions.EAST), (-1, 0, Directions.WEST)]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx <= maxX and 0 <= ny <= maxY:
-                        stack.append(((nx, ny), path + [action]))
+            if len(stack) > stats.peakFrontier:
+                stats.peakFrontier = len(stack)
+            entry = stack.pop()
+            cell = entry >> 3
+            if came[cell]:
+                stats.duplicates += 1
+                continue
+            came[cell] = entry & 7
+            closed += 1
+            if cell == goalCell:
+                stats.closed(closed)
+                return Search.reconstructPath(came, cell, width)
+            stats.expanded += 1
+            x = cell % width
+            y = cell // width
+            # Pushed in the order N, S, E, W, so explored W first.
+            pushed = len(stack)
+            if y < maxY and not came[cell + width]:
+                stack.append((cell + width) << 3 | 1)
+            if y > 0 and not came[cell - width]:
+                stack.append((cell - width) << 3 | 2)
+            if x < maxX and not came[cell + 1]:
+                stack.append((cell + 1) << 3 | 3)
+            if x > 0 and not came[cell - 1]:
+                stack.append((cell - 1) << 3 | 4)
+            stats.generated += len(stack) - pushed
+        stats.closed(closed)
         return None
 
     @staticmethod
-    def astar_path(start, goal, maxX, maxY):
+    @timed
+    def astar_path(start, goal, maxX, maxY, *, stats=None):
         """A* for puzzle: Find optimal path from start to goal."""
-        def heuristic(a, b):
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
+        stats = stats if stats is not None else SearchStats()
+        width = maxX + 1
+        gx, gy = goal
+        startCell = start[1] * width + start[0]
+        goalCell = gy * width + gx
+        came = bytearray(width * (maxY + 1))
+        closed = bytearray(width * (maxY + 1))
+        came[startCell] = START
+        best = {startCell: 0}
+        # (f, -g, cell): among equal f, prefer the deeper node, which
+        # heads straight for the goal rather than fanning out.
+        pq = [(abs(start[0] - gx) + abs(start[1] - gy), 0, startCell)]
+        closedCount = 0
+        while pq:
+            if len(pq) > stats.peakFrontier:
+                stats.peakFrontier = len(pq)
+            f, negG, cell = heapq.heappop(pq)
+            if cell == goalCell:
+                stats.closed(closedCount)
+                return Search.reconstructPath(came, cell, width)
+            if closed[cell]:
+                stats.duplicates += 1
+                continue
+            closed[cell] = 1
+            closedCount += 1
+            stats.expanded += 1
+            ng = 1 - negG
+            x = cell % width
+            y = cell // width
+            for code, nx, ny in ((1, x, y + 1), (2, x, y - 1), (3, x + 1, y), (4, x - 1, y)):
+                if 0 <= nx <= maxX and 0 <= ny <= maxY:
+                    n = ny * width + nx
+                    if closed[n] or best.get(n, ng + 1) <= ng:
+                        stats.duplicates += 1
+                        continue
+                    best[n] = ng
+                    came[n] = code
+                    stats.generated += 1
+                    heapq.heappush(pq, (ng + abs(nx - gx) + abs(ny - gy), -ng, n))
+        stats.closed(closedCount)
+        return None
+
+    @staticmethod
+    @timed
+    def jps_path(start, goal, maxX, maxY, blocked=(), *, stats=None):
+        """Jump Point Search for puzzle: Find optimal path from start to goal.
+
+        This is the 4-connected variant. Paths are canonically taken
+        as vertical moves first, and a horizontal run only turns
+        vertical where a blocked cell forces it to, so A* only needs to
+        expand the cells where paths can turn (jump points). blocked is
+        a collection of (x, y) cells that cannot be entered; the
+        puzzle has none, in which case each horizontal scan is O(1).
+        """
+        stats = stats if stats is not None else SearchStats()
+        gx, gy = goal
+        blocked = set(blocked)
+        # Rows with something blocked in them. Scans along rows without
+        # blocked cells either side cannot find a forced neighbour.
+        busyRows = set(y for x, y in blocked)
 
-        pq = [(0 + heuristic(start, goal), 0, start, [])]  # (f, g, position, path)
-        visited = {}
+        def free(x, y):
+            return 0 <= x <= maxX and 0 <= y <= maxY and (x, y) not in blocked
+
+        def jumpHorizontal(x, y, dx):
+            if y not in busyRows and y - 1 not in busyRows and y + 1 not in busyRows:
+                if y == gy and (gx - x) * dx > 0:
+                    return (gx, gy)
+                return None
+            while True:
+                x += dx
+                if not free(x, y):
+                    return None
+                if (x, y) == goal:
+                    return (x, y)
+                # A forced neighbour: the cell above or below is free
+                # but the one behind it is not.
+                for dy in (1, -1):
+                    if free(x, y + dy) and not free(x - dx, y + dy):
+                        return (x, y)
+
+        def jumpVertical(x, y, dy):
+            while True:
+                y += dy
+                if not free(x, y):
+                    return None
+                if (x, y) == goal:
+                    return (x, y)
+                if jumpHorizontal(x, y, 1) or jumpHorizontal(x, y, -1):
+                    return (x, y)
+
+        def successors(x, y, dx, dy):
+            """Jump points reachable from (x, y), entered moving (dx, dy)."""
+            if dx == 0 and dy == 0:
+                directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+            elif dx == 0:
+                directions = [(0, dy), (1, 0), (-1, 0)]
+            else:
+                directions = [(dx, 0)]
+                for fy in (1, -1):
+                    if free(x, y + fy) and not free(x - dx, y + fy):
+                        directions.append((0, fy))
+            result = []
+            for ndx, ndy in directions:
+                if ndy == 0:
+                    point = jumpHorizontal(x, y, ndx)
+                else:
+                    point = jumpVertical(x, y, ndy)
+                if point:
+                    result.append(point)
+            return result
+
+        came = {start: None}
+        best = {start: 0}
+        closed = set()
+        pq = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
         while pq:
-            f, g, (x, y), path = heapq.heappop(pq)
-            if (x, y) == goal:
+            if len(pq) > stats.peakFrontier:
+                stats.peakFrontier = len(pq)
+            f, negG, point = heapq.heappop(pq)
+            if point == goal:
+                stats.closed(len(closed))
+                # Expand the straight runs between jump points.
+                path = []
+                while came[point] is not None:
+                    (x, y), (px, py) = point, came[point]
+                    if x > px:
+                        path.extend([Directions.EAST] * (x - px))
+                    elif x < px:
+                        path.extend([Directions.WEST] * (px - x))
+                    elif y > py:
+                        path.extend([Directions.NORTH] * (y - py))
+                    else:
+                        path.extend([Directions.SOUTH] * (py - y))
+                    point = came[point]
+                path.reverse()
                 return path
-            if (x, y) in visited and visited[(x, y)] <= g:
+            if point in closed:
+                stats.duplicates += 1
                 continue
-            visited[(x, y)] = g
-            for dx, dy, action in [(0, 1, Directions.NORTH), (0, -1, Directions.SOUTH),
-                                   (1, 0, Directions.EAST), (-1, 0, Directions.WEST)]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx <= maxX and 0 <= ny <= maxY:
-                    ng = g + 1
-                    nf = ng + heuristic((nx, ny), goal)
-                    heapq.heappush(pq, (nf, ng, (nx, ny), path + [action]))
+            closed.add(point)
+            stats.expanded += 1
+            x, y = point
+            parent = came[point]
+            if parent is None:
+                dx = dy = 0
+            else:
+                dx = (x > parent[0]) - (x < parent[0])
+                dy = (y > parent[1]) - (y < parent[1])
+            for nx, ny in successors(x, y, dx, dy):
+                ng = -negG + abs(nx - x) + abs(ny - y)
+                if (nx, ny) in closed or best.get((nx, ny), ng + 1) <= ng:
+                    stats.duplicates += 1
+                    continue
+                best[(nx, ny)] = ng
+                came[(nx, ny)] = point
+                stats.generated += 1
+                heapq.heappush(pq, (ng + abs(nx - gx) + abs(ny - gy), -ng, (nx, ny)))
+        stats.closed(len(closed))
         return None
 
+    @staticmethod
+    @timed
+    def bidirectional(startCell, goalCell, maxX, maxY, grid=None, *, stats=None):
+        """Bidirectional A* between two cells of a grid.
+
+        Searches forwards from the start towards the goal and backwards
+        from the goal towards the start, each an A* with the Manhattan
+        distance to the far end as its heuristic, always growing the
+        side whose best f is lower, or the smaller side if they are
+        equal. best is the length of the shortest path through a cell
+        that both sides have reached. Since the heuristic is
+        consistent, neither side can find a shorter path once its best
+        f is at least best, so the search stops then. If grid is given,
+        cells with DANGER set in it cannot be entered. Returns the list
+        of actions, or None if the goal cannot be reached.
+        """
+        stats = stats if stats is not None else SearchStats()
+        width = maxX + 1
+        size = width * (maxY + 1)
+        if startCell == goalCell:
+            return []
+        # The forwards search records the action that reached each cell,
+        # as in reconstructPath. The backwards search records the action
+        # that leads from each cell towards the goal.
+        cameF = bytearray(size)
+        cameB = bytearray(size)
+        closedF = bytearray(size)
+        closedB = bytearray(size)
+        cameF[startCell] = START
+        cameB[goalCell] = START
+        gF = {startCell: 0}
+        gB = {goalCell: 0}
+        sx, sy = startCell % width, startCell // width
+        gx, gy = goalCell % width, goalCell // width
+        # (f, -g, cell), as in astar_path.
+        h = abs(sx - gx) + abs(sy - gy)
+        pqF = [(h, 0, startCell)]
+        pqB = [(h, 0, goalCell)]
+        # For each action code, the step it makes and the opposite code.
+        step = [0, width, -width, 1, -1]
+        opposite = [0, 2, 1, 4, 3]
+        best = None
+        meet = None
+        closedCount = 0
+        while pqF and pqB:
+            if len(pqF) + len(pqB) > stats.peakFrontier:
+                stats.peakFrontier = len(pqF) + len(pqB)
+            if best is not None and max(pqF[0][0], pqB[0][0]) >= best:
+                break
+            forwards = (pqF[0][0], len(pqF)) <= (pqB[0][0], len(pqB))
+            if forwards:
+                pq, came, closed, g, otherG, tx, ty = pqF, cameF, closedF, gF, gB, gx, gy
+            else:
+                pq, came, closed, g, otherG, tx, ty = pqB, cameB, closedB, gB, gF, sx, sy
+            f, negG, cell = heapq.heappop(pq)
+            if closed[cell]:
+                stats.duplicates += 1
+                continue
+            closed[cell] = 1
+            closedCount += 1
+            stats.expanded += 1
+            ng = 1 - negG
+            x = cell % width
+            y = cell // width
+            for code, ok, nx, ny in ((1, y < maxY, x, y + 1), (2, y > 0, x, y - 1),
+                                     (3, x < maxX, x + 1, y), (4, x > 0, x - 1, y)):
+                if not ok:
+                    continue
+                n = ny * width + nx
+                if closed[n] or g.get(n, ng + 1) <= ng:
+                    stats.duplicates += 1
+                    continue
+                if grid is not None and grid[n] & DANGER:
+                    continue
+                g[n] = ng
+                came[n] = code if forwards else opposite[code]
+                stats.generated += 1
+                heapq.heappush(pq, (ng + abs(nx - tx) + abs(ny - ty), -ng, n))
+                if n in otherG and (best is None or ng + otherG[n] < best):
+                    best = ng + otherG[n]
+                    meet = n
+        stats.closed(closedCount)
+        if meet is None:
+            return None
+        path = Search.reconstructPath(cameF, meet, width)
+        cell = meet
+        while cell != goalCell:
+            path.append(ACTIONS[cameB[cell]])
+            cell += step[cameB[cell]]
+        return path
+
+    @staticmethod
+    @timed
+    def bidir_path(start, goal, maxX, maxY, *, stats=None):
+        """Bidirectional A* for puzzle: Find optimal path from start to goal."""
+        width = maxX + 1
+        return Search.bidirectional(start[1] * width + start[0], goal[1] * width + goal[0],
+                                    maxX, maxY, stats=stats)
+
+    @staticmethod
+    def manhattan_path(start, goal):
+        """Closed form for puzzle: the moves from start to goal when
+        nothing is in the way, vertical moves first."""
+        dx = goal[0] - start[0]
+        dy = goal[1] - start[1]
+        path = [Directions.NORTH] * dy if dy > 0 else [Directions.SOUTH] * -dy
+        path.extend([Directions.EAST] * dx if dx > 0 else [Directions.WEST] * -dx)
+        return path
+
     # Instance methods for game version (gold collection and hazards)
     def __init__(self, gameWorld):
         self.gameWorld = gameWorld
+        # The work done by all the searches made with this object.
+        self.stats = SearchStats()
         self.moves = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+        # How much each action changes the cell index.
+        width = gameWorld.width
+        self.steps = {Directions.NORTH: width, Directions.SOUTH: -width,
+                      Directions.EAST: 1, Directions.WEST: -1}
 
     def getActions(self, location):
         """Get valid actions from a location, avoiding hazards."""
+        world = self.gameWorld
+        grid = world.grid
+        width = world.width
+        cell = location.cell(width)
+        actions = []
+        if location.y < world.maxY and not grid[cell + width] & DANGER:
+            actions.append(Directions.NORTH)
+        if location.y > 0 and not grid[cell - width] & DANGER:
+            actions.append(Directions.SOUTH)
+        if location.x < world.maxX and not grid[cell + 1] & DANGER:
+            actions.append(Directions.EAST)
+        if location.x > 0 and not grid[cell - 1] & DANGER:
+            actions.append(Directions.WEST)
+        return actions
+
+    def getCellActions(self, cell):
+        """Get valid actions from a cell index, avoiding hazards."""
+        world = self.gameWorld
+        grid = world.grid
+        width = world.width
+        x = cell % width
+        y = cell // width
         actions = []
-        if (location.y < self.gameWorld.maxY and
-            not self.gameWorld.isDangerous(location.x, location.y + 1)):
+        if y < world.maxY and not grid[cell + width] & DANGER:
             actions.append(Directions.NORTH)
-        if location.y > 0 and not self.gameWorld.isDangerous(location.x, location.y - 1):
+        if y > 0 and not grid[cell - width] & DANGER:
             actions.append(Directions.SOUTH)
-        if (location.x < self.gameWorld.maxX and
-            not self.gameWorld.isDangerous(location.x + 1, location.y)):
+        if x < world.maxX and not grid[cell + 1] & DANGER:
             actions.append(Directions.EAST)
-        if location.x > 0 and not self.gameWorld.isDangerous(location.x - 1, location.y):
+        if x > 0 and not grid[cell - 1] & DANGER:
             actions.append(Directions.WEST)
         return actions
 
     def createChildNode(self, parent, action):
         """Create a child node based on an action."""
-        new_depth = parent.cost + 1
-        new_location = Pose()
-        new_location.x = parent.location.x
-        new_location.y = parent.location.y
-        if action == Directions.EAST:
-            new_location.x += 1
-        elif action == Directions.WEST:
-            new_location.x -= 1
-        elif action == Directions.NORTH:
-            new_location.y += 1
-        elif action == Directions.SOUTH:
-            new_location.y -= 1
-        return Node(new_location, parent, action, new_depth, gold_collected=parent.gold_collected.copy())
+        return Node(parent.cell + self.steps[action], parent, action, parent.cost + 1, parent.collected)
 
     def recoverPlan(self, node):
         """Recover the path from a goal node."""
@@ -93,123 +470,558 @@ class Search:
         plan.reverse()
         return plan
 
+    def goldBits(self, allGold):
+        """Map the cell of each gold to its bit in a collected bitmask."""
+        width = self.gameWorld.width
+        return {y * width + x: 1 << i for i, (x, y) in enumerate(sorted(allGold))}
+
+    def cellPosition(self, cell):
+        """The Pose of a cell index."""
+        return Pose.fromCell(cell, self.gameWorld.width)
+
+    @timed
     def dfs_game(self, start, allGold):
         """DFS for game: Find path to collect all gold."""
-        node = Node(start, gold_collected=set())
+        goldBit = self.goldBits(allGold)
+        full = (1 << len(goldBit)) - 1
+        node = Node(start.cell(self.gameWorld.width))
         stack = [node]
         explored = set()
         while stack:
+            if len(stack) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(stack)
             node = stack.pop()
-            current_pos = (node.location.x, node.location.y)
-            if current_pos in explored:
+            cell = node.cell
+            if cell in explored:
+                self.stats.duplicates += 1
                 continue
-            explored.add(current_pos)
-            if current_pos in allGold and current_pos not in node.gold_collected:
-                node.gold_collected.add(current_pos)
-                print(f"Gold found at {current_pos}")
-            if node.gold_collected == allGold:
+            explored.add(cell)
+            self.stats.expanded += 1
+            bit = goldBit.get(cell, 0)
+            if bit and not node.collected & bit:
+                node.collected |= bit
+                if events.level <= events.DEBUG:
+                    events.debug("search.gold", "Gold found at {}", self.cellPosition(cell))
+            if node.collected == full:
+                self.stats.closed(len(explored))
                 return self.recoverPlan(node)
-            for action in self.getActions(node.location):
+            for action in self.getCellActions(cell):
                 child = self.createChildNode(node, action)
-                if (child.location.x, child.location.y) not in explored:
+                if child.cell not in explored:
+                    self.stats.generated += 1
                     stack.append(child)
-        print("Failed to find all gold")
+        self.stats.closed(len(explored))
+        events.warning("search.failed", "Failed to find all gold")
         return []
 
+    @timed
     def bfs_game(self, start, allGold):
         """BFS for game: Find shortest path to collect all gold."""
-        start_node = Node(start, gold_collected=set())
-        queue = [start_node]
-        visited = {}  # (position, frozenset(gold_collected))
+        goldBit = self.goldBits(allGold)
+        full = (1 << len(goldBit)) - 1
+        size = self.gameWorld.width * self.gameWorld.height
+        start_node = Node(start.cell(self.gameWorld.width))
+        queue = deque([start_node])
+        visited = set()  # collected * size + cell
         while queue:
-            node = queue.pop(0)
-            current_pos = (node.location.x, node.location.y)
-            new_collected = node.gold_collected.copy()
-            if current_pos in allGold and current_pos not in new_collected:
-                new_collected.add(current_pos)
-                print(f"Collected gold at {current_pos}")
-            if new_collected == allGold:
-                node.gold_collected = new_collected
+            if len(queue) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(queue)
+            node = queue.popleft()
+            cell = node.cell
+            bit = goldBit.get(cell, 0)
+            if bit and not node.collected & bit:
+                node.collected |= bit
+                if events.level <= events.DEBUG:
+                    events.debug("search.gold", "Collected gold at {}", self.cellPosition(cell))
+            if node.collected == full:
+                self.stats.closed(len(visited))
                 return self.recoverPlan(node)
-            state_key = (current_pos, frozenset(new_collected))
+            state_key = node.collected * size + cell
             if state_key in visited:
+                self.stats.duplicates += 1
                 continue
-            visited[state_key] = True
-            for action in self.getActions(node.location):
+            visited.add(state_key)
+            self.stats.expanded += 1
+            for action in self.getCellActions(cell):
                 child = self.createChildNode(node, action)
-                child.gold_collected = new_collected.copy()
-                child_state = ((child.location.x, child.location.y), frozenset(child.gold_collected))
-                if child_state not in visited:
+                if node.collected * size + child.cell not in visited:
+                    self.stats.generated += 1
                     queue.append(child)
-        print("Failed to find all gold")
+        self.stats.closed(len(visited))
+        events.warning("search.failed", "Failed to find all gold")
         return []
 
+    @timed
     def ucs_game(self, start, allGold):
         """UCS for game: Find optimal cost path to collect all gold."""
-        start_node = Node(start, gold_collected=set())
-        pq = [(0, id(start_node), start_node)]  # (cost, tiebreaker, node)
+        goldBit = self.goldBits(allGold)
+        full = (1 << len(goldBit)) - 1
+        size = self.gameWorld.width * self.gameWorld.height
+        tiebreak = count()
+        start_node = Node(start.cell(self.gameWorld.width))
+        pq = [(0, next(tiebreak), start_node)]  # (cost, tiebreaker, node)
         explored = {}
         while pq:
+            if len(pq) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(pq)
             cost, _, node = heapq.heappop(pq)
-            current_pos = (node.location.x, node.location.y)
-            collected = node.gold_collected
-            state_key = (current_pos, frozenset(collected))
+            cell = node.cell
+            state_key = node.collected * size + cell
             if state_key in explored and explored[state_key] <= cost:
+                self.stats.duplicates += 1
                 continue
             explored[state_key] = cost
-            if current_pos in allGold and current_pos not in collected:
-                collected = collected.copy()
-                collected.add(current_pos)
-                print(f"Collected gold at {current_pos}")
-            if collected == allGold:
-                node.gold_collected = collected
+            self.stats.expanded += 1
+            bit = goldBit.get(cell, 0)
+            if bit and not node.collected & bit:
+                node.collected |= bit
+                if events.level <= events.DEBUG:
+                    events.debug("search.gold", "Collected gold at {}", self.cellPosition(cell))
+            if node.collected == full:
+                self.stats.closed(len(explored))
                 return self.recoverPlan(node)
-            for action in self.getActions(node.location):
+            child_cost = cost + 1
+            for action in self.getCellActions(cell):
                 child = self.createChildNode(node, action)
-                child.gold_collected = collected.copy()
-                child_cost = cost + 1
-                child_state = ((child.location.x, child.location.y), frozenset(child.gold_collected))
+                child_state = child.collected * size + child.cell
                 if child_state not in explored or explored[child_state] > child_cost:
-                    heapq.heappush(pq, (child_cost, id(child), child))
-        print("Failed to find all gold")
+                    self.stats.generated += 1
+                    heapq.heappush(pq, (child_cost, next(tiebreak), child))
+        self.stats.closed(len(explored))
+        events.warning("search.failed", "Failed to find all gold")
         return []
 
+    @timed
     def greedy_game(self, start, allGold):
         """Greedy Search for game: Minimize distance to remaining gold."""
+        goldBit = self.goldBits(allGold)
+        full = (1 << len(goldBit)) - 1
+        width = self.gameWorld.width
+        size = width * self.gameWorld.height
+        gold = [(cell % width, cell // width, bit) for cell, bit in goldBit.items()]
+
         def heuristic(node):
-            remaining = allGold - node.gold_collected
-            if not remaining:
+            if node.collected == full:
                 return 0
-            hx, hy = node.location.x, node.location.y
-            return min(abs(gx - hx) + abs(gy - hy) for gx, gy in remaining)
+            hx = node.cell % width
+            hy = node.cell // width
+            return min(abs(gx - hx) + abs(gy - hy) for gx, gy, bit in gold
+                       if not node.collected & bit)
 
-        start_node = Node(start, gold_collected=set())
-        pq = [(heuristic(start_node), id(start_node), start_node)]
+        tiebreak = count()
+        start_node = Node(start.cell(width))
+        pq = [(heuristic(start_node), next(tiebreak), start_node)]
         explored = {}
         while pq:
+            if len(pq) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(pq)
             h, _, node = heapq.heappop(pq)
-            current_pos = (node.location.x, node.location.y)
-            collected = node.gold_collected.copy()
-            if current_pos in allGold and current_pos not in collected:
-                collected.add(current_pos)
-                print(f"Collected gold at {current_pos}")
-            if collected == allGold:
-                node.gold_collected = collected
+            cell = node.cell
+            bit = goldBit.get(cell, 0)
+            if bit and not node.collected & bit:
+                node.collected |= bit
+                if events.level <= events.DEBUG:
+                    events.debug("search.gold", "Collected gold at {}", self.cellPosition(cell))
+            if node.collected == full:
+                self.stats.closed(len(explored))
                 return self.recoverPlan(node)
-            state_key = (current_pos, frozenset(collected))
+            state_key = node.collected * size + cell
             if state_key in explored and explored[state_key] <= h:
+                self.stats.duplicates += 1
                 continue
             explored[state_key] = h
-            for action in self.getActions(node.location):
+            self.stats.expanded += 1
+            for action in self.getCellActions(cell):
                 child = self.createChildNode(node, action)
-                child.gold_collected = collected.copy()
                 child_h = heuristic(child)
-                child_state = ((child.location.x, child.location.y), frozenset(child.gold_collected))
+                child_state = child.collected * size + child.cell
                 if child_state not in explored or explored[child_state] > child_h:
-                    heapq.heappush(pq, (child_h, id(child), child))
-        print("Failed to find all gold")
+                    self.stats.generated += 1
+                    heapq.heappush(pq, (child_h, next(tiebreak), child))
+        self.stats.closed(len(explored))
+        events.warning("search.failed", "Failed to find all gold")
         return []
 
+    @timed
+    def bfs_from(self, source, targets):
+        """BFS over the hazard-free grid from the cell source.
+
+        Returns the action codes that reached each cell, for use with
+        reconstructPath, and a dict from each reachable cell in targets
+        to its distance from source. Stops once every target is found.
+        """
+        world = self.gameWorld
+        grid = world.grid
+        width = world.width
+        maxX = world.maxX
+        maxY = world.maxY
+        came = bytearray(width * world.height)
+        came[source] = START
+        distances = {}
+        remaining = len(targets)
+        if source in targets:
+            distances[source] = 0
+            remaining -= 1
+        frontier = [source]
+        reached = 1
+        depth = 0
+        while frontier and remaining:
+            depth += 1
+            nextFrontier = []
+            if len(frontier) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(frontier)
+            self.stats.expanded += len(frontier)
+            for cell in frontier:
+                x = cell % width
+                y = cell // width
+                for code, ok, n in ((1, y < maxY, cell + width), (2, y > 0, cell - width),
+                                    (3, x < maxX, cell + 1), (4, x > 0, cell - 1)):
+                    if ok and not came[n] and not grid[n] & DANGER:
+                        came[n] = code
+                        self.stats.generated += 1
+                        nextFrontier.append(n)
+                        if n in targets:
+                            distances[n] = depth
+                            remaining -= 1
+            frontier = nextFrontier
+            reached += len(frontier)
+        self.stats.closed(reached)
+        return came, distances
+
+    @staticmethod
+    def shortTour(dist, k):
+        """A good, though not always the best, order to visit the gold
+        in, and its length. dist is as in tour_game.
+
+        Starts from each gold in turn, goes on to the nearest gold not
+        yet visited each time, and then improves the order with 2-opt
+        (reversing part of it) and Or-opt (moving up to three gold in a
+        row elsewhere) until neither helps.
+        """
+        # between[p][q] is the distance between points p and q, with
+        # point 0 for Link and point j + 1 for gold j. Routes are lists
+        # of points that start at Link.
+        between = [[0] * (k + 1) for p in range(k + 1)]
+        for p in range(k + 1):
+            for j in range(k):
+                between[p][j + 1] = between[j + 1][p] = dist[p][j]
+        best = None
+        for first in range(1, k + 1):
+            route = [0, first]
+            left = set(range(1, k + 1))
+            left.discard(first)
+            while left:
+                row = between[route[-1]]
+                route.append(min(left, key=row.__getitem__))
+                left.discard(route[-1])
+            improved = True
+            while improved:
+                improved = False
+                for a in range(1, k):
+                    for b in range(a + 1, k + 1):
+                        before = between[route[a - 1]]
+                        change = before[route[b]] - before[route[a]]
+                        if b < k:
+                            after = route[b + 1]
+                            change += between[route[a]][after] - between[route[b]][after]
+                        if change < 0:
+                            route[a:b + 1] = route[a:b + 1][::-1]
+                            improved = True
+                for size in (1, 2, 3):
+                    for a in range(1, k - size + 2):
+                        # Take out route[a:end + 1], saving gain, and
+                        # find the cheapest place to put it back.
+                        end = a + size - 1
+                        head = route[a]
+                        tail = route[end]
+                        previous = route[a - 1]
+                        gain = between[previous][head]
+                        if end < k:
+                            gain += between[tail][route[end + 1]] - between[previous][route[end + 1]]
+                        move = None
+                        for c in range(k + 1):
+                            if a - 1 <= c <= end:
+                                continue
+                            here = between[route[c]]
+                            if c < k:
+                                there = between[route[c + 1]]
+                                edge = here[route[c + 1]]
+                                options = ((here[head] + there[tail] - edge, False),
+                                           (here[tail] + there[head] - edge, True))
+                            else:
+                                options = ((here[head], False), (here[tail], True))
+                            for cost, flip in options:
+                                if cost < gain and (move is None or cost < move[0]):
+                                    move = (cost, c, flip)
+                        if move is not None:
+                            cost, c, flip = move
+                            segment = route[a:end + 1]
+                            if flip:
+                                segment.reverse()
+                            del route[a:end + 1]
+                            if c > end:
+                                c -= size
+                            route[c + 1:c + 1] = segment
+                            improved = True
+            length = sum(between[p][q] for p, q in zip(route, route[1:]))
+            if best is None or length < best[1]:
+                best = ([p - 1 for p in route[1:]], length)
+        return best
+
+    @staticmethod
+    def treeLength(dist, points):
+        """Length of a minimum spanning tree over the gold in points,
+        by Prim's algorithm. dist is as in tour_game."""
+        if len(points) < 2:
+            return 0
+        nearest = dict.fromkeys(points[1:], 0)
+        row = dist[points[0] + 1]
+        for j in nearest:
+            nearest[j] = row[j]
+        total = 0
+        while nearest:
+            j = min(nearest, key=nearest.get)
+            total += nearest.pop(j)
+            row = dist[j + 1]
+            for o in nearest:
+                if row[o] < nearest[o]:
+                    nearest[o] = row[o]
+        return total
+
+    @timed
+    def tour_game(self, start, allGold):
+        """Held-Karp for game: Find the shortest path through all gold.
+
+        Runs one BFS from Link and one from each gold to get the
+        distances between them, finds the best order to visit the
+        gold with dynamic programming over bitmasks of visited gold,
+        and then joins up the paths between consecutive gold.
+
+        The table is filled one number of visited gold at a time, and
+        only for the sets of gold from which some partial tour could
+        still beat a good tour found up front (see shortTour): what is
+        left has to cost at least the distance to the nearest gold not
+        yet visited plus a spanning tree over those gold. That usually
+        leaves a few hundred to a few tens of thousands of the 2^k
+        sets, so 20 gold plan in a few tenths of a second (most of it
+        the BFS on large grids), but the worst case is still
+        exponential.
+        """
+        width = self.gameWorld.width
+        gold = [y * width + x for x, y in sorted(allGold)]
+        k = len(gold)
+        if k == 0:
+            return []
+        targets = set(gold)
+        # Point 0 is Link, point i + 1 is gold[i], and dist[p][j] is
+        # the distance from point p to gold[j].
+        points = [start.cell(width)] + gold
+        cames = []
+        dist = []
+        for p in points:
+            came, distances = self.bfs_from(p, targets)
+            if len(distances) < k:
+                events.warning("search.failed", "Failed to find all gold")
+                return []
+            cames.append(came)
+            dist.append([distances[g] for g in gold])
+
+        # layers[n] maps each set of n + 1 gold, as a bitmask, to a
+        # list whose j-th entry is the length of the shortest path that
+        # starts at Link, visits exactly that gold and ends at gold j.
+        INF = float("inf")
+        full = (1 << k) - 1
+        bits = [1 << j for j in range(k)]
+        order, bound = Search.shortTour(dist, k)
+        layer = {}
+        for j in range(k):
+            costs = [INF] * k
+            costs[j] = dist[0][j]
+            layer[bits[j]] = costs
+        layers = [layer]
+        for n in range(1, k):
+            following = {}
+            for mask, costs in layer.items():
+                outside = [j for j in range(k) if not mask & bits[j]]
+                # The cost of getting to the nearest gold left from each
+                # gold in mask; the spanning tree is only worth working
+                # out if one of those is under the bound.
+                reach = [costs[i] + min([dist[i + 1][j] for j in outside])
+                         if costs[i] != INF else INF for i in range(k)]
+                if min(reach) >= bound:
+                    continue
+                limit = bound - Search.treeLength(dist, outside)
+                for i in range(k):
+                    if reach[i] >= limit:
+                        continue
+                    cost = costs[i]
+                    row = dist[i + 1]
+                    for j in outside:
+                        nextMask = mask | bits[j]
+                        nextCosts = following.get(nextMask)
+                        if nextCosts is None:
+                            nextCosts = following[nextMask] = [INF] * k
+                        if cost + row[j] < nextCosts[j]:
+                            nextCosts[j] = cost + row[j]
+            layer = following
+            layers.append(layer)
+
+        # If a tour that beats shortTour's got through, recover the
+        # order of the gold by walking back through the layers, at
+        # each step to a gold that the cost came from. Otherwise none
+        # does, and shortTour's order is the best there is.
+        if full in layer:
+            costs = layer[full]
+            last = min(range(k), key=costs.__getitem__)
+            cost = costs[last]
+            order = [last]
+            mask = full
+            for n in range(k - 2, -1, -1):
+                mask ^= bits[last]
+                costs = layers[n][mask]
+                for i in range(k):
+                    if costs[i] + dist[i + 1][last] == cost:
+                        break
+                cost = costs[i]
+                last = i
+                order.append(last)
+            order.reverse()
+        plan = []
+        here = 0
+        for j in order:
+            plan.extend(Search.reconstructPath(cames[here], gold[j], width))
+            here = j + 1
+        return plan
+
+    @timed
+    def astar_game(self, start, allGold):
+        """A* for game: Find optimal path to collect all gold.
+
+        The heuristic is the distance to the nearest remaining gold
+        plus the length of a minimum spanning tree over the remaining
+        gold, both using Manhattan distance. Any path that collects
+        the rest of the gold has to reach one of them and then visit
+        all the others, so this never overestimates.
+        """
+        world = self.gameWorld
+        grid = world.grid
+        width = world.width
+        maxX = world.maxX
+        maxY = world.maxY
+        size = width * world.height
+        gold = sorted(allGold)
+        goldBit = {y * width + x: 1 << i for i, (x, y) in enumerate(gold)}
+        full = (1 << len(gold)) - 1
+
+        # MST lengths, memoized by the bitmask of gold they span.
+        mstCache = {0: 0}
+        def mst(remaining):
+            if remaining not in mstCache:
+                points = [gold[i] for i in range(len(gold)) if remaining >> i & 1]
+                # Prim's algorithm on the complete graph of points.
+                tx, ty = points.pop()
+                nearest = [abs(x - tx) + abs(y - ty) for x, y in points]
+                total = 0
+                while points:
+                    i = min(range(len(points)), key=nearest.__getitem__)
+                    total += nearest.pop(i)
+                    tx, ty = points.pop(i)
+                    for j, (x, y) in enumerate(points):
+                        d = abs(x - tx) + abs(y - ty)
+                        if d < nearest[j]:
+                            nearest[j] = d
+                mstCache[remaining] = total
+            return mstCache[remaining]
+
+        def heuristic(x, y, collected):
+            remaining = full & ~collected
+            if not remaining:
+                return 0
+            toNearest = min(abs(gx - x) + abs(gy - y)
+                            for i, (gx, gy) in enumerate(gold) if remaining >> i & 1)
+            return toNearest + mst(remaining)
+
+        # A state is the cell and the bitmask of gold collected, packed
+        # into one int as collected * size + cell.
+        startCell = start.cell(width)
+        startState = goldBit.get(startCell, 0) * size + startCell
+        best = {startState: 0}
+        # parent[state] packs the previous state and the action code
+        # that led from it as previous << 3 | code.
+        parent = {}
+        pq = [(heuristic(start.x, start.y, startState // size), 0, startState)]
+        while pq:
+            if len(pq) > self.stats.peakFrontier:
+                self.stats.peakFrontier = len(pq)
+            f, negG, state = heapq.heappop(pq)
+            g = -negG
+            if g > best[state]:
+                self.stats.duplicates += 1
+                continue
+            self.stats.expanded += 1
+            collected, cell = divmod(state, size)
+            if collected == full:
+                self.stats.closed(len(best))
+                plan = []
+                while state != startState:
+                    entry = parent[state]
+                    plan.append(ACTIONS[entry & 7])
+                    state = entry >> 3
+                plan.reverse()
+                return plan
+            x = cell % width
+            y = cell // width
+            ng = g + 1
+            for code, ok, n, nx, ny in ((1, y < maxY, cell + width, x, y + 1),
+                                        (2, y > 0, cell - width, x, y - 1),
+                                        (3, x < maxX, cell + 1, x + 1, y),
+                                        (4, x > 0, cell - 1, x - 1, y)):
+                if not ok or grid[n] & DANGER:
+                    continue
+                nCollected = collected | goldBit.get(n, 0)
+                nState = nCollected * size + n
+                if ng < best.get(nState, ng + 1):
+                    best[nState] = ng
+                    parent[nState] = state << 3 | code
+                    self.stats.generated += 1
+                    heapq.heappush(pq, (ng + heuristic(nx, ny, nCollected), -ng, nState))
+                else:
+                    self.stats.duplicates += 1
+        self.stats.closed(len(best))
+        events.warning("search.failed", "Failed to find all gold")
+        return []
+
+    @timed
+    def bidir_game(self, start, allGold):
+        """Bidirectional legs for game: Collect gold nearest first.
+
+        Heads for the remaining gold that is nearest by Manhattan
+        distance, finding each leg with a bidirectional A* over the
+        hazard-free grid. Gold passed over on the way is collected.
+        """
+        world = self.gameWorld
+        width = world.width
+        remaining = set(y * width + x for x, y in allGold)
+        here = start.cell(width)
+        remaining.discard(here)
+        plan = []
+        while remaining:
+            hx = here % width
+            hy = here // width
+            for target in sorted(remaining, key=lambda g: (abs(g % width - hx) + abs(g // width - hy), g)):
+                leg = Search.bidirectional(here, target, world.maxX, world.maxY, world.grid,
+                                           stats=self.stats)
+                if leg is not None:
+                    break
+            else:
+                events.warning("search.failed", "Failed to find all gold")
+                return []
+            for action in leg:
+                here += self.steps[action]
+                remaining.discard(here)
+            plan.extend(leg)
+        return plan
+
     def find_path(self, algorithm_type, start, allGold):
         """Select and execute the specified game search algorithm."""
         if algorithm_type == 1:
@@ -220,5 +1032,11 @@ class Search:
             return self.ucs_game(start, allGold)
         elif algorithm_type == 4:
             return self.greedy_game(start, allGold)
+        elif algorithm_type == 5:
+            return self.tour_game(start, allGold)
+        elif algorithm_type == 6:
+            return self.astar_game(start, allGold)
+        elif algorithm_type == 8:
+            return self.bidir_game(start, allGold)
         else:
             return self.dfs_game(start, allGold)  # Default to DFS
\ No newline at end of file
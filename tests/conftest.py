@@ -0,0 +1,75 @@
+# conftest.py
+#
+# The modules live at the top of the repository, so make them
+# importable from the tests however pytest is run.
+#
+# Also helpers that several test files share, which they import with
+# "from conftest import ...".
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import Pose
+from world import World, DANGER
+
+# A world with Link, the gold, the pits and the Wumpus in random
+# different cells, drawn from rng.
+def randomWorld(rng, maxX, maxY, goldCount, pitCount, wumpusCount=0):
+    cells = [Pose(x, y) for x in range(maxX + 1) for y in range(maxY + 1)]
+    chosen = rng.sample(cells, 1 + goldCount + pitCount + wumpusCount)
+    gold = chosen[1:1 + goldCount]
+    pits = chosen[1 + goldCount:1 + goldCount + pitCount]
+    wumpus = chosen[1 + goldCount + pitCount:]
+    return World.fromPositions(maxX, maxY, chosen[0], wumpus, gold, pits, rng)
+
+# The cells of world that would kill Link, as poses.
+def dangerCells(world):
+    return set(Pose.fromCell(cell, world.width)
+               for cell in range(len(world.grid)) if world.grid[cell] & DANGER)
+
+# Reference shortest path lengths: plain BFS over the grid, from the
+# (x, y) cell start, avoiding the cells in blocked. None if the goal
+# can't be reached.
+def bfsLength(start, goal, maxX, maxY, blocked=()):
+    blocked = set(blocked)
+    depth = {tuple(start): 0}
+    frontier = [tuple(start)]
+    while frontier:
+        nextFrontier = []
+        for x, y in frontier:
+            if (x, y) == tuple(goal):
+                return depth[(x, y)]
+            for n in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if (0 <= n[0] <= maxX and 0 <= n[1] <= maxY and n not in blocked
+                        and n not in depth):
+                    depth[n] = depth[(x, y)] + 1
+                    nextFrontier.append(n)
+        frontier = nextFrontier
+    return None
+
+# Follow plan from start, checking it stays on the grid and out of
+# blocked, and return the poses it passes through after start.
+def walk(plan, start, maxX, maxY, blocked=()):
+    blocked = set(blocked)
+    here = Pose(*start)
+    poses = []
+    for action in plan:
+        there = here.step(action, maxX, maxY)
+        assert there != here, "walked into the edge"
+        assert there not in blocked, "walked into a blocked cell"
+        here = there
+        poses.append(here)
+    return poses
+
+# Where plan ends, from start, checked as walk does.
+def follow(plan, start, maxX, maxY, blocked=()):
+    poses = walk(plan, start, maxX, maxY, blocked)
+    return poses[-1] if poses else Pose(*start)
+
+# Follow plan from Link's cell, checking it never steps into danger
+# or off the grid, and return the gold it passes over.
+def collected(world, plan):
+    poses = [world.lLoc] + walk(plan, world.lLoc, world.maxX, world.maxY, dangerCells(world))
+    return set(poses) & set(world.gLoc)
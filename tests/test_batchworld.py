@@ -0,0 +1,74 @@
+#
+# test_batchworld.py
+#
+# Tests that BatchWorld applies the rules of world.py exactly, by
+# stepping a batch in lockstep with the worlds it was made from.
+# Only the parts of the rules that don't draw random numbers can be
+# compared, since the two use different random number generators.
+
+import random
+import pytest
+import config
+from utils import Directions, Pose
+from world import World
+from conftest import randomWorld
+
+np = pytest.importorskip("numpy")
+from batchworld import BatchWorld
+
+@pytest.fixture
+def rules(monkeypatch):
+    monkeypatch.setattr(config, "nonDeterministic", False)
+    monkeypatch.setattr(config, "dynamic", False)
+
+def checkSame(batch, worlds, ended):
+    for i, world in enumerate(worlds):
+        assert tuple(batch.lLoc[i]) == world.lLoc
+        assert [tuple(w) for w in batch.wLoc[i]] == world.wLoc
+        gold = [tuple(g) for g, left in zip(batch.gLoc[i], batch.goldLeft[i]) if left]
+        assert sorted(gold) == sorted(world.gLoc)
+        assert bool(ended[i]) == bool(world.isEnded())
+        assert batch.status[i] == world.status.value
+
+# Step batch and worlds together, with Link's move in each world from
+# moves, until every game is over or steps run out. As in game.py, a
+# world that has ended isn't updated any more.
+def lockstep(batch, worlds, moves, steps):
+    ended = batch.isEnded()
+    checkSame(batch, worlds, ended)
+    for step in range(steps):
+        directions = [moves(i, world) for i, world in enumerate(worlds)]
+        for world, direction, over in zip(worlds, directions, ended):
+            if not over:
+                world.updateLink(direction)
+                world.updateWumpus()
+        ended = batch.step([direction.value for direction in directions])
+        checkSame(batch, worlds, ended)
+        if ended.all():
+            break
+
+# Numbers of gold, pits and Wumpus: enough hazards that most games are
+# lost, or none, so that they are all won.
+@pytest.mark.parametrize("gold, pits, wumpus", [(3, 3, 2), (2, 1, 1), (1, 0, 0)])
+def test_static_worlds_match(rules, gold, pits, wumpus):
+    rng = random.Random(15)
+    worlds = [randomWorld(rng, 4, 4, gold, pits, wumpus) for i in range(40)]
+    batch = BatchWorld.fromWorlds(worlds)
+    moves = list(Directions)
+    lockstep(batch, worlds, lambda i, world: rng.choice(moves), 200)
+
+def test_wumpus_chase_along_rows_and_columns(rules, monkeypatch):
+    # Link sits in the corner, pushing into the wall, with the Wumpus
+    # in the same row or column, close enough to smell Link, so each
+    # Wumpus heads straight for Link without any random choices.
+    monkeypatch.setattr(config, "dynamic", True)
+    monkeypatch.setattr(config, "senseDistance", 10)
+    rng = random.Random(16)
+    worlds = []
+    for i in range(30):
+        line = [Pose(x, 0) for x in range(2, 8)] + [Pose(0, y) for y in range(2, 8)]
+        chosen = rng.sample(line, 3)
+        worlds.append(World.fromPositions(7, 7, Pose(0, 0), chosen[:2], [chosen[2]], [], rng))
+    batch = BatchWorld.fromWorlds(worlds)
+    lockstep(batch, worlds, lambda i, world: Directions.WEST, 10)
+    assert all(world.status.name == "LOST" for world in worlds)
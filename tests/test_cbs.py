@@ -0,0 +1,157 @@
+# test_cbs.py
+#
+# Tests for conflict-based search (cbs.py) and the joint puzzle plans
+# made with it.
+
+import heapq
+import itertools
+import random
+import pytest
+import config
+import utils
+from cbs import ConflictBasedSearch
+from puzzleWorld import PuzzleWorld
+
+# What a step in each direction does to the cell ID on a grid of the
+# given width, with 0 for staying put.
+def offsets(width):
+    return {0: 0, utils.Directions.NORTH: width, utils.Directions.SOUTH: -width,
+            utils.Directions.EAST: 1, utils.Directions.WEST: -1}
+
+def neighbours(cell, size, blocked):
+    x, y = cell % size, cell // size
+    result = [cell]
+    if y < size - 1:
+        result.append(cell + size)
+    if y > 0:
+        result.append(cell - size)
+    if x < size - 1:
+        result.append(cell + 1)
+    if x > 0:
+        result.append(cell - 1)
+    return [n for n in result if n not in blocked]
+
+# The smallest sum of costs by Dijkstra over joint states, or None.
+# Each character at its goal may declare itself finished, for no
+# cost, and stays put from then on; every step costs one for each
+# character that hasn't finished.
+def optimalCost(size, starts, goals, blocked):
+    n = len(starts)
+    first = (tuple(starts), (False,) * n)
+    dist = {first: 0}
+    pq = [(0, first)]
+    while pq:
+        d, state = heapq.heappop(pq)
+        if dist[state] < d:
+            continue
+        cells, finished = state
+        if all(finished):
+            return d
+        following = []
+        for i in range(n):
+            if not finished[i] and cells[i] == goals[i]:
+                following.append((d, (cells, finished[:i] + (True,) + finished[i + 1:])))
+        cost = d + finished.count(False)
+        choices = [[c] if f else neighbours(c, size, blocked) for c, f in zip(cells, finished)]
+        for new in itertools.product(*choices):
+            if len(set(new)) < n:
+                continue
+            if any(new[i] == cells[j] and new[j] == cells[i] and new[i] != cells[i]
+                   for i in range(n) for j in range(i + 1, n)):
+                continue
+            following.append((cost, (new, finished)))
+        for cost, successor in following:
+            if successor not in dist or dist[successor] > cost:
+                dist[successor] = cost
+                heapq.heappush(pq, (cost, successor))
+    return None
+
+# Play plan from starts, checking that no two characters are ever in
+# the same cell or swap cells, and return where they end up and the
+# sum of the times each last moved.
+def playPlan(plan, starts, size):
+    step = offsets(size)
+    cells = list(starts)
+    for t, move in enumerate(plan):
+        assert len(move) == len(starts)
+        new = [cell + step[action] for cell, action in zip(cells, move)]
+        assert len(set(new)) == len(new), f"vertex conflict at time {t + 1}"
+        for i in range(len(new)):
+            for j in range(i + 1, len(new)):
+                assert not (new[i] == cells[j] and new[j] == cells[i]), f"edge conflict at time {t + 1}"
+        cells = new
+    cost = 0
+    for i in range(len(starts)):
+        cost += max([t + 1 for t, move in enumerate(plan) if move[i] != 0] + [0])
+    return cells, cost
+
+def cases():
+    rng = random.Random(25)
+    found = []
+    while len(found) < 60:
+        size = rng.choice([3, 4])
+        n = rng.choice([2, 3])
+        cells = list(range(size * size))
+        blocked = set(rng.sample(cells, rng.choice([0, 0, 1, 2])))
+        free = [c for c in cells if c not in blocked]
+        starts = rng.sample(free, n)
+        goals = rng.sample(free, n)
+        if optimalCost(size, starts, goals, blocked) is not None:
+            found.append((size, starts, goals, blocked))
+    return found
+
+@pytest.mark.parametrize("size, starts, goals, blocked", cases())
+def test_sum_of_costs_is_optimal(size, starts, goals, blocked):
+    planner = ConflictBasedSearch(size - 1, size - 1, [(b % size, b // size) for b in blocked])
+    plan = planner.solve(starts, goals)
+    assert plan is not None
+    cells, cost = playPlan(plan, starts, size)
+    assert cells == goals
+    assert cost == optimalCost(size, starts, goals, blocked)
+
+def test_swap_in_corridor_is_impossible():
+    # A 2 x 1 grid: the two characters would have to swap.
+    planner = ConflictBasedSearch(1, 0, maxNodes=50)
+    assert planner.solve([0, 1], [1, 0]) is None
+
+def test_many_characters_on_a_large_grid():
+    rng = random.Random(50)
+    size = 32
+    starts = rng.sample(range(size * size), 50)
+    goals = rng.sample(range(size * size), 50)
+    plan = ConflictBasedSearch(size - 1, size - 1).solve(starts, goals)
+    assert plan is not None
+    assert playPlan(plan, starts, size)[0] == goals
+
+@pytest.fixture
+def manyWumpus(monkeypatch):
+    monkeypatch.setattr(config, "worldLength", 8)
+    monkeypatch.setattr(config, "worldBreadth", 8)
+    monkeypatch.setattr(config, "numberOfWumpus", 6)
+
+def test_joint_plan_solves_puzzle(manyWumpus):
+    rng = random.Random(3)
+    puzzle = PuzzleWorld(rng)
+    goal = PuzzleWorld(rng)
+    puzzle.buildJointPlan(goal)
+    assert puzzle.plan
+    assert all(len(move) == 7 for move in puzzle.plan)
+    while puzzle.plan:
+        puzzle.makeAMove(goal)
+        cells = [puzzle.lLoc] + puzzle.wLoc
+        assert len(set(cells)) == len(cells)
+    assert puzzle.lLoc == goal.lLoc
+    assert puzzle.wLoc == goal.wLoc
+    assert puzzle.isSolved(goal)
+
+def test_take_step_moves_every_character(manyWumpus):
+    puzzle = PuzzleWorld(random.Random(4))
+    before = [puzzle.lLoc] + list(puzzle.wLoc)
+    move = [utils.Directions.EAST] * 7
+    puzzle.takeStep(move)
+    after = [puzzle.lLoc] + puzzle.wLoc
+    assert after == [pose.step(utils.Directions.EAST, puzzle.maxX, puzzle.maxY) for pose in before]
+    # The signature is kept up to date with every character that moved.
+    signature, key = puzzle.signature, puzzle.zobrist
+    puzzle.updateSignature()
+    assert (puzzle.signature, puzzle.zobrist) == (signature, key)
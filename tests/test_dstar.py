@@ -0,0 +1,120 @@
+#
+# test_dstar.py
+#
+# Tests for D* Lite (dstar.py): the plan it keeps should always be a
+# cheapest safe path, however the map changes under it.
+
+import heapq
+import random
+import pytest
+from dstar import DStarLite, RISK
+from utils import Pose
+from world import World, DANGER
+from conftest import randomWorld, dangerCells, walk
+
+SIZE = 8
+
+# The cells plan passes through from the cell start, checking that
+# it stays on the grid and out of danger.
+def planCells(world, start, plan):
+    poses = walk(plan, Pose.fromCell(start, world.width), world.maxX, world.maxY,
+                 dangerCells(world))
+    return [pose.cell(world.width) for pose in poses]
+
+# What moving into cell costs: more if it is next to a Wumpus or a
+# pit.
+def enterCost(world, cell):
+    return 1 + RISK if world.stench[cell] or world.breeze[cell] else 1
+
+# Reference costs: plain Dijkstra over the cells of world that are out
+# of danger. None if the goal can't be reached.
+def cheapest(world, start, goal):
+    width = world.width
+    done = set()
+    queue = [(0, start)]
+    while queue:
+        cost, cell = heapq.heappop(queue)
+        if cell == goal:
+            return cost
+        if cell in done:
+            continue
+        done.add(cell)
+        x, y = cell % width, cell // width
+        for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+            n = ny * width + nx
+            if (0 <= nx <= world.maxX and 0 <= ny <= world.maxY and n not in done
+                    and not world.grid[n] & DANGER):
+                heapq.heappush(queue, (cost + enterCost(world, n), n))
+    return None
+
+def checkPlan(planner, world):
+    expected = cheapest(world, planner.start, planner.goal)
+    plan = planner.path()
+    if expected is None:
+        assert planner.nextMove() is None
+        assert plan == []
+    else:
+        cells = planCells(world, planner.start, plan)
+        assert sum(enterCost(world, cell) for cell in cells) == expected
+        assert not cells or cells[-1] == planner.goal
+    return plan
+
+@pytest.mark.parametrize("seed", range(20))
+def test_replans_as_wumpus_come_and_go(seed):
+    rng = random.Random(seed)
+    world = randomWorld(rng, SIZE - 1, SIZE - 1, 1, 8)
+    start = world.lLoc.cell(world.width)
+    goal = world.gLoc[0].cell(world.width)
+    planner = DStarLite(world, start, goal)
+    checkPlan(planner, world)
+    width = world.width
+    wumpus = []
+    for turn in range(12):
+        # Move Link one step along the plan, if there is one, then
+        # add or remove a Wumpus, preferring a cell on the plan.
+        plan = planner.path()
+        here = planner.start
+        if plan:
+            here = planCells(world, here, plan[:1])[0]
+        changed = set()
+        if wumpus and rng.random() < 0.4:
+            cell = wumpus.pop(rng.randrange(len(wumpus)))
+            world.removeWumpus(cell % width, cell // width)
+            changed.add(cell)
+        else:
+            onPlan = planCells(world, here, plan[1:])[:-1] if plan else []
+            free = [c for c in range(len(world.grid))
+                    if not world.grid[c] & DANGER and c not in (here, goal)]
+            cell = rng.choice(onPlan or free)
+            world.addWumpus(cell % width, cell // width)
+            wumpus.append(cell)
+            changed.add(cell)
+        planner.update(here, changed)
+        checkPlan(planner, world)
+        if here == goal:
+            break
+
+def test_blocked_then_reopened():
+    # A wall across the middle of the world with a single gap: putting
+    # a Wumpus in the gap cuts Link off, and taking it out again
+    # restores the original plan.
+    wall = [Pose(x, 4) for x in range(SIZE) if x != 5]
+    world = World.fromPositions(SIZE - 1, SIZE - 1, Pose(0, 0), [], [Pose(0, 7)], wall)
+    width = world.width
+    planner = DStarLite(world, 0, 7 * width)
+    assert len(checkPlan(planner, world)) == 17
+    world.addWumpus(5, 4)
+    planner.update(0, {4 * width + 5})
+    assert checkPlan(planner, world) == []
+    world.removeWumpus(5, 4)
+    planner.update(0, {4 * width + 5})
+    assert len(checkPlan(planner, world)) == 17
+
+def test_goes_round_the_wumpus():
+    # Going straight along the bottom row passes next to the Wumpus,
+    # so the plan goes round over the top, which is longer but safer.
+    world = World.fromPositions(4, 4, Pose(0, 0), [Pose(2, 1)], [Pose(4, 0)])
+    planner = DStarLite(world, 0, 4)
+    plan = checkPlan(planner, world)
+    assert len(plan) == 10
+    assert not any(world.stench[cell] for cell in planCells(world, 0, plan))
@@ -0,0 +1,109 @@
+# test_game_search.py
+#
+# Tests for the game planners in search.py, which plan Link's route
+# to all the gold.
+
+import itertools
+import random
+import pytest
+from search import Search, SearchStats
+from utils import Pose
+from world import World
+from conftest import randomWorld, collected, bfsLength
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_bidir_game_collects_all_reachable_gold(seed):
+    world = randomWorld(random.Random(seed), 7, 7, 3, 4)
+    search = Search(world)
+    plan = search.bidir_game(world.lLoc, set(world.gLoc))
+    reachable = bool(search.bfs_game(world.lLoc, set(world.gLoc))) or not world.gLoc
+    if reachable:
+        assert collected(world, plan) == set(world.gLoc)
+    else:
+        assert plan == []
+
+@pytest.mark.parametrize("seed", range(20))
+def test_tour_game_is_as_short_as_bfs_game(seed):
+    world = randomWorld(random.Random(seed), 6, 6, 1 + seed % 5, 5)
+    search = Search(world)
+    shortest = search.bfs_game(world.lLoc, set(world.gLoc))
+    plan = search.tour_game(world.lLoc, set(world.gLoc))
+    if shortest:
+        assert collected(world, plan) == set(world.gLoc)
+        assert len(plan) == len(shortest)
+    else:
+        assert plan == []
+
+def manhattan(a, b):
+    return abs(a.x - b.x) + abs(a.y - b.y)
+
+# The length of the shortest route from Link through every gold, on a
+# world without pits, trying every order of the gold.
+def bestRouteLength(world, gold):
+    return min(sum(manhattan(a, b) for a, b in zip((world.lLoc,) + order, order))
+               for order in itertools.permutations(gold))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tour_game_finds_the_best_order(seed):
+    world = randomWorld(random.Random(seed), 15, 15, 8, 0)
+    plan = Search(world).tour_game(world.lLoc, set(world.gLoc))
+    assert collected(world, plan) == set(world.gLoc)
+    assert len(plan) == bestRouteLength(world, world.gLoc)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tour_game_with_twenty_gold(seed):
+    world = randomWorld(random.Random(seed), 19, 19, 20, 0)
+    search = Search(world)
+    plan = search.tour_game(world.lLoc, set(world.gLoc))
+    assert collected(world, plan) == set(world.gLoc)
+    # Too many orders to try them all, but the last few gold, given
+    # where the plan is before them, must be in the best order.
+    here = world.lLoc
+    order = []
+    for action in plan:
+        here = here.step(action, world.maxX, world.maxY)
+        if here in world.gLoc and here not in order:
+            order.append(here)
+    before = order[-7]
+    tail = order[-6:]
+    best = min(sum(manhattan(a, b) for a, b in zip((before,) + p, p))
+               for p in itertools.permutations(tail))
+    assert sum(manhattan(a, b) for a, b in zip([before] + tail, tail)) == best
+
+def test_tour_game_fails_when_gold_is_walled_off():
+    # Link starts on one gold, and the other is boxed in by pits.
+    pits = [Pose(3, 4), Pose(4, 3), Pose(4, 5), Pose(5, 4)]
+    world = World.fromPositions(7, 7, Pose(0, 0), [], [Pose(0, 0), Pose(4, 4)], pits)
+    assert Search(world).tour_game(world.lLoc, set(world.gLoc)) == []
+
+# The length of the shortest route from Link through every gold,
+# keeping out of the pits, trying every order of the gold. None if
+# some gold can't be reached.
+def bruteForceLength(world):
+    stops = [world.lLoc] + world.gLoc
+    distance = {}
+    for a in stops:
+        for b in stops:
+            distance[a, b] = bfsLength(a, b, world.maxX, world.maxY, world.pLoc)
+            if distance[a, b] is None:
+                return None
+    return min(sum(distance[a, b] for a, b in zip((world.lLoc,) + order, order))
+               for order in itertools.permutations(world.gLoc))
+
+@pytest.mark.parametrize("seed", range(25))
+def test_astar_game_is_optimal_and_expands_no_more_than_ucs(seed):
+    world = randomWorld(random.Random(seed), 5, 5, 1 + seed % 4, seed % 6)
+    search = Search(world)
+    search.stats = SearchStats()
+    uniform = search.ucs_game(world.lLoc, set(world.gLoc))
+    ucsExpanded = search.stats.expanded
+    search.stats = SearchStats()
+    plan = search.astar_game(world.lLoc, set(world.gLoc))
+    best = bruteForceLength(world)
+    if best is None:
+        assert plan == [] and uniform == []
+    else:
+        assert collected(world, plan) == set(world.gLoc)
+        assert len(plan) == len(uniform) == best
+        assert search.stats.expanded <= ucsExpanded
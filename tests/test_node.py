@@ -0,0 +1,51 @@
+#
+# test_node.py
+#
+# Tests for the search nodes in node.py, and how the game planners
+# build and follow them.
+
+import random
+import pytest
+from node import Node
+from search import Search
+from utils import Directions, Pose
+from world import World
+
+def test_nodes_are_slotted():
+    node = Node(5)
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.pose = Pose(1, 1)
+
+def test_equal_by_cell_and_gold_collected():
+    parent = Node(3)
+    a = Node(7, parent, Directions.NORTH, 4, 0b101)
+    b = Node(7, None, None, 9, 0b101)
+    assert a == b and hash(a) == hash(b)
+    assert a != Node(7, parent, Directions.NORTH, 4, 0b100)
+    assert a != Node(8, parent, Directions.NORTH, 4, 0b101)
+    assert a.isGoal(7) and not a.isGoal(8)
+
+def test_distinct_states_hash_apart():
+    # Cells fit in the low 32 bits and gold above them, so states in a
+    # world of any reasonable size never share a hash.
+    nodes = [Node(cell, collected=collected)
+             for cell in range(0, 1 << 20, 997) for collected in range(64)]
+    assert len(set(hash(node) for node in nodes)) == len(nodes)
+    assert len(set(nodes + [Node(node.cell, collected=node.collected) for node in nodes])) == len(nodes)
+
+def test_children_follow_actions_and_recover_the_plan():
+    world = World.fromPositions(7, 5, Pose(3, 2), [], [Pose(7, 5)])
+    search = Search(world)
+    rng = random.Random(6)
+    node = Node(world.lLoc.cell(world.width))
+    here = world.lLoc
+    plan = []
+    for step in range(30):
+        action = rng.choice(search.getActions(here))
+        node = search.createChildNode(node, action)
+        here = here.step(action, world.maxX, world.maxY)
+        plan.append(action)
+        assert Pose.fromCell(node.cell, world.width) == here
+        assert node.cost == step + 1
+    assert search.recoverPlan(node) == plan
@@ -0,0 +1,70 @@
+#
+# test_profiling.py
+#
+# Tests for how profiling.py shares out time and memory between the
+# subsystems.
+
+import pstats
+import pytest
+import config
+import events
+import profiling
+import runner
+
+def test_subsystem_rules():
+    assert profiling.subsystemOf("/x/search.py", "astar_path") == "search"
+    assert profiling.subsystemOf("/x/world.py", "isSmelly") == "percepts"
+    assert profiling.subsystemOf("/x/world.py", "updateLink") == "world update"
+    assert profiling.subsystemOf("/x/world.py", "buildGrid") == "world generation"
+    assert profiling.subsystemOf("/x/utils.py", "pickUniquePoses") == "world generation"
+    # Helpers pass their time on to their callers.
+    assert profiling.subsystemOf("/x/utils.py", "separation") is None
+    assert profiling.subsystemOf("/usr/lib/python3/heapq.py", "heappush") is None
+    assert profiling.subsystemOf("/usr/lib/python3/tkinter/__init__.py", "update") == "rendering"
+
+def test_function_at_finds_innermost(tmp_path):
+    path = tmp_path / "sample.py"
+    path.write_text("x = 1\n"
+                    "def outer():\n"
+                    "    y = 2\n"
+                    "    def inner():\n"
+                    "        return y\n"
+                    "    return inner\n")
+    assert profiling.functionAt(str(path), 1) == "*"
+    assert profiling.functionAt(str(path), 3) == "outer"
+    assert profiling.functionAt(str(path), 5) == "inner"
+    assert profiling.functionAt(str(tmp_path / "missing.py"), 1) == "*"
+
+@pytest.fixture
+def profiled(monkeypatch):
+    monkeypatch.setattr(config, "headless", True)
+    monkeypatch.setattr(config, "stepDelay", 0)
+    level = events.console.level
+    events.setConsoleLevel(events.WARNING)
+    profiler = profiling.Profiler()
+    profiler.start()
+    list(runner.runEpisodes("game", 6, 3))
+    profiler.stop()
+    events.setConsoleLevel(level)
+    return profiler
+
+def test_all_the_time_is_shared_out(profiled):
+    times = profiled.timeBySubsystem()
+    total = sum(entry[2] for entry in pstats.Stats(profiled.profile).stats.values())
+    assert sum(times.values()) == pytest.approx(total)
+    for part in ("search", "world update", "percepts", "world generation"):
+        assert times[part] > 0
+    assert times["rendering"] == 0
+    assert profiled.sink not in events.sinks
+
+def test_memory_and_report(profiled, tmp_path):
+    memory = profiled.memoryBySubsystem()
+    assert memory["world generation"] > 0
+    assert 0 < sum(memory.values()) <= profiled.peak
+    path = tmp_path / "profile.txt"
+    profiled.save(str(path), "Test profile")
+    report = path.read_text()
+    assert report.startswith("Test profile")
+    for part in profiling.subsystems:
+        assert part in report
+    assert pstats.Stats(str(path) + ".prof").total_calls > 0
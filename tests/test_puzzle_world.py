@@ -0,0 +1,102 @@
+#
+# test_puzzle_world.py
+#
+# Tests for how PuzzleWorld plans for one character at a time, and
+# keeps track of where the characters are.
+
+import random
+from collections import Counter
+from types import SimpleNamespace
+import pytest
+import puzzleWorld
+import utils
+from puzzleWorld import PuzzleWorld
+from utils import Directions, Pose
+
+@pytest.fixture
+def puzzle(monkeypatch):
+    # Start with empty plan caches, so that every plan is found here.
+    monkeypatch.setattr(puzzleWorld, "planCaches", {})
+    rng = random.Random(10)
+    return PuzzleWorld(rng), PuzzleWorld(rng)
+
+@pytest.mark.parametrize("algorithm_type", [2, 3, 4])
+def test_optimal_planners_search(puzzle, algorithm_type):
+    # Each of these runs its own planner, rather than being swapped
+    # for the closed form, so it does some search.
+    start, goal = puzzle
+    start.buildPlan(0, goal, algorithm_type)
+    assert start.lastStats.expanded > 0
+    assert len(start.plan) == abs(start.lLoc.x - goal.lLoc.x) + abs(start.lLoc.y - goal.lLoc.y)
+
+def test_closed_form_does_no_search(puzzle):
+    start, goal = puzzle
+    start.buildPlan(0, goal, 6)
+    assert start.lastStats.expanded == 0
+    assert len(start.plan) == abs(start.lLoc.x - goal.lLoc.x) + abs(start.lLoc.y - goal.lLoc.y)
+    while start.plan:
+        start.makeAMove(goal)
+    assert start.lLoc == goal.lLoc
+
+# Plan for Link from start to goal on a 10 by 10 puzzle with no Wumpus,
+# and return the puzzle, after following the plan.
+def planAndFollow(start, goal, algorithm_type):
+    puzzle = PuzzleWorld.fromPositions(9, 9, start, [])
+    end = PuzzleWorld.fromPositions(9, 9, goal, [])
+    puzzle.buildPlan(0, end, algorithm_type)
+    while puzzle.plan:
+        puzzle.makeAMove(end)
+    assert puzzle.lLoc == goal
+    return puzzle
+
+@pytest.mark.parametrize("algorithm_type", [2, 3, 4, 6])
+def test_shortest_plans_are_shared_by_offset(puzzle, algorithm_type):
+    # The goal is the same distance away from both starts, so the
+    # second plan comes from the cache, and still gets there.
+    assert planAndFollow(Pose(1, 1), Pose(4, 6), algorithm_type).cacheMisses == 1
+    assert planAndFollow(Pose(5, 3), Pose(8, 8), algorithm_type).cacheHits == 1
+    assert planAndFollow(Pose(8, 8), Pose(5, 3), algorithm_type).cacheMisses == 1
+
+def test_dfs_plans_are_not_shared(puzzle):
+    planAndFollow(Pose(1, 1), Pose(4, 6), 1)
+    assert planAndFollow(Pose(5, 3), Pose(8, 8), 1).cacheMisses == 1
+    assert planAndFollow(Pose(1, 1), Pose(4, 6), 1).cacheHits == 1
+
+# Whether two puzzles have their characters in the same places, worked
+# out field by field: Link in the same cell, and as many Wumpus in each
+# cell, whichever Wumpus they are.
+def samePlaces(a, b):
+    return a.lLoc == b.lLoc and Counter(a.wLoc) == Counter(b.wLoc)
+
+# A random move: an action, or 0 to stay put, for each character.
+def randomMove(rng, characters):
+    return [rng.choice([0] + list(Directions)) for i in range(characters)]
+
+def test_signatures_match_field_by_field_comparison():
+    # A small grid, so that the puzzles often end up the same.
+    rng = random.Random(22)
+    cells = [Pose(x, y) for x in range(3) for y in range(3)]
+    puzzles = [PuzzleWorld.fromPositions(2, 2, rng.choice(cells), rng.choices(cells, k=3))
+               for i in range(12)]
+    same = 0
+    for step in range(40):
+        for puzzle in puzzles:
+            puzzle.takeStep(randomMove(rng, 4))
+            # The signature kept up to date move by move is the one
+            # working it out again gives.
+            signature, zobristHash = puzzle.signature, puzzle.zobrist
+            puzzle.updateSignature()
+            assert (puzzle.signature, puzzle.zobrist) == (signature, zobristHash)
+        for a in puzzles:
+            for b in puzzles:
+                expected = samePlaces(a, b)
+                assert (a.signature == b.signature) == expected
+                assert utils.sameAs(a, b) == expected
+                # Without signatures, sameAs compares the fields.
+                plainA = SimpleNamespace(lLoc=a.lLoc, wLoc=list(a.wLoc))
+                plainB = SimpleNamespace(lLoc=b.lLoc, wLoc=list(b.wLoc))
+                assert utils.sameAs(plainA, plainB) == expected
+                if expected:
+                    assert a.zobrist == b.zobrist
+                    same += a is not b
+    assert same > 0
@@ -0,0 +1,85 @@
+#
+# test_results.py
+#
+# Tests for the episode records and run summaries in results.py.
+
+import csv
+import json
+import math
+import random
+import statistics
+import pytest
+from results import Histogram, ResultsLog, Summary, fields
+
+def records(count):
+    rng = random.Random(13)
+    return [{"index": i, "seed": 1000 + i, "type": "puzzle", "algorithm": 2,
+             "outcome": rng.choice(["WON", "LOST"]), "steps": rng.randint(1, 80),
+             "gold": 0, "planningTime": rng.random() / 100, "nodesExpanded": rng.randint(0, 500),
+             "cacheHits": rng.randint(0, 3), "cacheMisses": rng.randint(0, 3)}
+            for i in range(count)]
+
+@pytest.mark.parametrize("precision, values", [
+    (None, [random.Random(1).randint(0, 200) for i in range(1000)]),
+    (None, [7, 3, 3, 9]),
+    (0.01, [random.Random(2).lognormvariate(-6, 1) for i in range(2000)]),
+])
+def test_percentiles_match_statistics(precision, values):
+    histogram = Histogram(precision)
+    for value in values:
+        histogram.add(value)
+    assert histogram.mean() == pytest.approx(statistics.mean(values))
+    ordered = sorted(values)
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    for p in (1, 10, 25, 50, 75, 90, 99):
+        # The histogram gives one of the two values either side of the
+        # cut point, as near as its buckets allow.
+        position = (len(values) - 1) * p / 100
+        lower = ordered[math.floor(position)]
+        upper = ordered[math.ceil(position)]
+        assert lower - 1e-12 <= cuts[p - 1] <= upper + 1e-12
+        slack = precision or 0
+        assert lower * (1 - slack) <= histogram.percentile(p) <= upper * (1 + slack)
+
+def test_empty_and_non_positive_values():
+    histogram = Histogram(0.01)
+    assert histogram.mean() == 0 and histogram.percentile(50) == 0
+    for value in (0, 0, 0, 2.0):
+        histogram.add(value)
+    assert histogram.percentile(50) == 0
+    assert histogram.percentile(100) == pytest.approx(2.0, rel=0.01)
+
+def test_json_lines_round_trip(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    log = ResultsLog(path)
+    for record in records(50):
+        log.write(record)
+    log.close()
+    with open(path) as file:
+        assert [json.loads(line) for line in file] == records(50)
+
+def test_csv_round_trip(tmp_path):
+    path = str(tmp_path / "run.csv")
+    log = ResultsLog(path)
+    for record in records(50):
+        log.write(record)
+    log.close()
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        assert reader.fieldnames == fields
+        rows = list(reader)
+    # CSV has only strings, so compare what each value is written as,
+    # and check the times come back exactly.
+    assert rows == [{key: str(value) for key, value in record.items()} for record in records(50)]
+    assert [float(row["planningTime"]) for row in rows] == [r["planningTime"] for r in records(50)]
+
+def test_summary_counts(capsys):
+    summary = Summary()
+    for record in records(50):
+        summary.add(record)
+    expected = records(50)
+    assert summary.episodes == 50
+    assert summary.wins == sum(r["outcome"] == "WON" for r in expected)
+    assert summary.cacheHits == sum(r["cacheHits"] for r in expected)
+    summary.report()
+    assert f"won {summary.wins} " in capsys.readouterr().out
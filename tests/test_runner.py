@@ -0,0 +1,77 @@
+#
+# test_runner.py
+#
+# Tests that runs spread over worker processes handle events as the
+# main process would, and that each episode plays out the same however
+# it is run.
+
+import random
+import pytest
+import config
+import events
+import runner
+import scenario
+
+@pytest.fixture
+def quietSinks(monkeypatch):
+    # Leave the console and the subscribed sinks as they were found.
+    monkeypatch.setattr(config, "headless", True)
+    monkeypatch.setattr(config, "stepDelay", 0)
+    level = events.console.level
+    sinks = list(events.sinks)
+    yield
+    events.sinks[:] = sinks
+    events.setConsoleLevel(level)
+
+def run(workers, tracePath):
+    counter = events.subscribe(events.CounterSink())
+    trace = events.subscribe(events.FileSink(str(tracePath)))
+    records = list(runner.runEpisodes("puzzle", 2, 6, workers))
+    events.unsubscribe(counter)
+    events.unsubscribe(trace)
+    trace.close()
+    return records, counter.counts, tracePath.read_text().splitlines()
+
+def test_workers_trace_and_count_like_one_process(quietSinks, tmp_path, capfd):
+    events.setConsoleLevel(events.WARNING)
+    records, counts, lines = run(1, tmp_path / "one.log")
+    workerRecords, workerCounts, workerLines = run(2, tmp_path / "two.log")
+    outcomes = [(r["index"], r["outcome"], r["steps"]) for r in records]
+    assert [(r["index"], r["outcome"], r["steps"]) for r in workerRecords] == outcomes
+    assert counts["runner.episode"] == 6
+    assert workerCounts == counts
+    assert sorted(workerLines) == sorted(lines)
+    # The console was quiet in the workers too.
+    assert "Running puzzle" not in capfd.readouterr().out
+
+@pytest.mark.parametrize("wType, algorithm", [("game", 2), ("game", 7), ("puzzle", 2)])
+def test_corpus_episodes_replay_generated_ones(quietSinks, tmp_path, wType, algorithm):
+    # An episode started from its scenario in a corpus should play out
+    # exactly as the episode that generated the scenario did.
+    events.setConsoleLevel(events.WARNING)
+    path = str(tmp_path / "corpus.wwc")
+    scenario.writeCorpus(path, scenario.GAME if wType == "game" else scenario.PUZZLE, 20)
+    generated = list(runner.runEpisodes(wType, algorithm, 20))
+    loaded = list(runner.runEpisodes(wType, algorithm, 20, corpusPath=path))
+    runner.corpora.pop(path).close()
+    # How long planning took, and how much of it the plan caches saved
+    # (which depends on the episodes run before in this process), can
+    # differ.
+    for record in generated + loaded:
+        for key in ("planningTime", "nodesExpanded", "cacheHits", "cacheMisses"):
+            record.pop(key, None)
+    assert loaded == generated
+
+@pytest.mark.parametrize("algorithm", [2, 6, 7])
+def test_an_episode_replays_on_its_own(quietSinks, algorithm):
+    # Running episode 7 by itself, as --episode 7 -n 1 does, gives the
+    # record it had as part of a longer run, whatever the random module
+    # has been doing in between.
+    events.setConsoleLevel(events.WARNING)
+    random.seed(1)
+    run = list(runner.runEpisodes("game", algorithm, 10))
+    random.seed(2)
+    again = list(runner.runEpisodes("game", algorithm, 1, first=7))
+    assert again[0]["index"] == 7
+    del run[7]["planningTime"], again[0]["planningTime"]
+    assert again[0] == run[7]
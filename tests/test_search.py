@@ -0,0 +1,100 @@
+# test_search.py
+#
+# Tests for the planners in search.py.
+
+import random
+import pytest
+from search import Search, SearchStats
+from utils import Pose
+from world import PIT
+from conftest import bfsLength, follow
+
+def test_timed_keeps_name_and_doc():
+    assert Search.dfs_path.__name__ == "dfs_path"
+    assert Search.astar_path.__doc__ is not None
+
+@pytest.mark.parametrize("planner", [Search.dfs_path, Search.astar_path,
+                                     Search.jps_path, Search.bidir_path])
+def test_stats_is_keyword_only(planner):
+    stats = SearchStats()
+    planner(Pose(0, 0), Pose(3, 2), 4, 4, stats=stats)
+    assert stats.elapsed > 0
+    with pytest.raises(TypeError, match="positional"):
+        planner(Pose(0, 0), Pose(3, 2), 4, 4, (), SearchStats())
+
+def test_timed_makes_stats_when_not_given():
+    assert len(Search.astar_path(Pose(0, 0), Pose(3, 2), 4, 4)) == 5
+
+def queries(rng, maxX, maxY, count, blocked=()):
+    free = [(x, y) for x in range(maxX + 1) for y in range(maxY + 1) if (x, y) not in blocked]
+    return [(Pose(*rng.choice(free)), Pose(*rng.choice(free))) for i in range(count)]
+
+@pytest.mark.parametrize("maxX, maxY", [(0, 0), (4, 4), (9, 3), (15, 15)])
+def test_jps_matches_bfs_and_astar_on_open_grids(maxX, maxY):
+    rng = random.Random(maxX * 100 + maxY)
+    for start, goal in queries(rng, maxX, maxY, 30):
+        plan = Search.jps_path(start, goal, maxX, maxY)
+        assert follow(plan, start, maxX, maxY) == goal
+        assert len(plan) == bfsLength(start, goal, maxX, maxY)
+        assert len(plan) == len(Search.astar_path(start, goal, maxX, maxY))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_jps_matches_bfs_with_blocked_cells(seed):
+    rng = random.Random(seed)
+    maxX, maxY = rng.randint(3, 12), rng.randint(3, 12)
+    cells = [(x, y) for x in range(maxX + 1) for y in range(maxY + 1)]
+    blocked = set(rng.sample(cells, len(cells) * rng.choice([5, 15, 30]) // 100))
+    for start, goal in queries(rng, maxX, maxY, 20, blocked):
+        plan = Search.jps_path(start, goal, maxX, maxY, blocked)
+        expected = bfsLength(start, goal, maxX, maxY, blocked)
+        if expected is None:
+            assert plan is None
+        else:
+            assert follow(plan, start, maxX, maxY, blocked) == goal
+            assert len(plan) == expected
+
+def test_jps_detours_round_a_wall():
+    # A wall across the middle row with a gap at the right, so the
+    # scans along the rows next to it can't take the open-row shortcut.
+    blocked = [(x, 2) for x in range(4)]
+    plan = Search.jps_path(Pose(0, 0), Pose(0, 4), 4, 4, blocked)
+    assert follow(plan, (0, 0), 4, 4, blocked) == Pose(0, 4)
+    assert len(plan) == 12
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bidirectional_matches_bfs(seed):
+    rng = random.Random(1000 + seed)
+    maxX, maxY = rng.randint(0, 12), rng.randint(0, 12)
+    width = maxX + 1
+    cells = [(x, y) for x in range(maxX + 1) for y in range(maxY + 1)]
+    blocked = set(rng.sample(cells, len(cells) * rng.choice([0, 10, 30]) // 100))
+    grid = bytearray(width * (maxY + 1))
+    for x, y in blocked:
+        grid[y * width + x] = PIT
+    for start, goal in queries(rng, maxX, maxY, 20, blocked):
+        plan = Search.bidirectional(start.cell(width), goal.cell(width), maxX, maxY, grid)
+        expected = bfsLength(start, goal, maxX, maxY, blocked)
+        if expected is None:
+            assert plan is None
+        else:
+            assert follow(plan, start, maxX, maxY, blocked) == goal
+            assert len(plan) == expected
+
+def test_bidir_path_is_shortest():
+    rng = random.Random(9)
+    for start, goal in queries(rng, 9, 6, 30):
+        plan = Search.bidir_path(start, goal, 9, 6)
+        assert follow(plan, start, 9, 6) == goal
+        assert len(plan) == abs(goal.x - start.x) + abs(goal.y - start.y)
+
+def test_bidir_path_expands_no_more_than_astar():
+    # The puzzle grid has nothing in the way, so the Manhattan distance
+    # is exact, and each side should head straight for the other end
+    # rather than spreading out in rings as a breadth first search does.
+    rng = random.Random(10)
+    for start, goal in queries(rng, 39, 39, 20):
+        astarStats = SearchStats()
+        bidirStats = SearchStats()
+        Search.astar_path(start, goal, 39, 39, stats=astarStats)
+        Search.bidir_path(start, goal, 39, 39, stats=bidirStats)
+        assert bidirStats.expanded <= astarStats.expanded
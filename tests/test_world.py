@@ -0,0 +1,107 @@
+#
+# test_world.py
+#
+# Tests that the occupancy grid and percept layers World keeps up to
+# date as Link and the Wumpus move and the gold is looted always say
+# what working them out again from the lists of locations would.
+
+import random
+from collections import Counter
+import pytest
+import config
+from utils import Directions, Pose
+from world import World, PIT, WUMPUS, GOLD, LINK, DANGER
+
+@pytest.fixture
+def rules(monkeypatch):
+    # Moving Wumpus, and Link sometimes slipping sideways, so that
+    # everything that can change does.
+    monkeypatch.setattr(config, "dynamic", True)
+    monkeypatch.setattr(config, "nonDeterministic", True)
+    monkeypatch.setattr(config, "senseDistance", 3)
+
+# A world with Link, the gold and the pits in different cells, and
+# the Wumpus anywhere but Link's cell, so that some share a cell.
+def crowdedWorld(rng, maxX, maxY):
+    cells = [Pose(x, y) for x in range(maxX + 1) for y in range(maxY + 1)]
+    rng.shuffle(cells)
+    chosen = cells[:1 + 3 + 2]
+    wumpus = [rng.choice(cells[1:]) for i in range(4)]
+    wumpus.append(wumpus[0])
+    return World.fromPositions(maxX, maxY, chosen[0], wumpus, chosen[1:4], chosen[4:], rng)
+
+def checkGrid(world):
+    width = world.width
+    expected = bytearray(width * (world.maxY + 1))
+    for p in world.pLoc:
+        expected[p.cell(width)] |= PIT
+    for w in world.wLoc:
+        expected[w.cell(width)] |= WUMPUS
+    for g in world.gLoc:
+        expected[g.cell(width)] |= GOLD
+    expected[world.lLoc.cell(width)] |= LINK
+    assert world.grid == expected
+    counts = Counter(w.cell(width) for w in world.wLoc)
+    assert list(world.wumpusCount) == [counts[cell] for cell in range(len(expected))]
+    for cell in range(len(expected)):
+        x, y = cell % width, cell // width
+        dangerous = Pose(x, y) in world.wLoc or Pose(x, y) in world.pLoc
+        assert world.isDangerous(x, y) == dangerous
+        assert bool(expected[cell] & DANGER) == dangerous
+    # The hash kept up to date move by move is the one a world built
+    # from scratch in the same state has.
+    rebuilt = World.fromPositions(world.maxX, world.maxY, world.lLoc, world.wLoc,
+                                  world.gLoc, world.pLoc)
+    assert world.zobrist == rebuilt.zobrist
+
+# How many of locations are next to (x, y), and in it too if centre.
+def around(locations, x, y, centre):
+    return sum(abs(l.x - x) + abs(l.y - y) == 1 or (centre and (l.x, l.y) == (x, y))
+               for l in locations)
+
+def checkPercepts(world):
+    width = world.width
+    for cell in range(len(world.grid)):
+        x, y = cell % width, cell // width
+        here = Pose(x, y)
+        assert world.stench[cell] == around(world.wLoc, x, y, True)
+        assert world.breeze[cell] == around(world.pLoc, x, y, True)
+        assert world.glitter[cell] == around(world.gLoc, x, y, False)
+        assert world.isSmelly(here) == (here in world.wLoc or world.isAdjacent(world.wLoc, here))
+        assert world.isWindy(here) == (here in world.pLoc or world.isAdjacent(world.pLoc, here))
+        assert world.isGlitter(here) == world.isAdjacent(world.gLoc, here)
+    # Off the grid, nothing is sensed.
+    for outside in (Pose(-1, 0), Pose(0, world.maxY + 1)):
+        assert not (world.isSmelly(outside) or world.isWindy(outside) or world.isGlitter(outside))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_grid_follows_moves_and_looting(rules, seed):
+    rng = random.Random(seed)
+    world = crowdedWorld(rng, rng.randint(2, 6), rng.randint(2, 6))
+    checkGrid(world)
+    checkPercepts(world)
+    moves = list(Directions)
+    for step in range(60):
+        world.updateLink(rng.choice(moves))
+        checkGrid(world)
+        checkPercepts(world)
+        world.updateWumpus()
+        checkGrid(world)
+        checkPercepts(world)
+        over = (not world.gLoc or world.lLoc in world.wLoc or world.lLoc in world.pLoc)
+        assert bool(world.isEnded()) == over
+
+def test_wumpus_sharing_a_cell():
+    world = World.fromPositions(3, 3, Pose(0, 0), [Pose(2, 2)] * 2, [Pose(3, 3)])
+    world.removeWumpus(2, 2)
+    world.wLoc.pop()
+    checkGrid(world)
+    checkPercepts(world)
+    world.removeWumpus(2, 2)
+    world.wLoc.pop()
+    checkGrid(world)
+    checkPercepts(world)
+    world.addWumpus(1, 0)
+    world.wLoc.append(Pose(1, 0))
+    checkGrid(world)
+    checkPercepts(world)
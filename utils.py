@@ -9,8 +9,8 @@
 
 import random
 import math
-import copy
 from enum import Enum
+from collections import namedtuple
 
 # Representation of directions.
 #
@@ -35,22 +35,57 @@ class State(Enum):
     LOST = 2
 
 # Class to represent the position of elements within the game
-class Pose():
-    x = 0
-    y = 0
+#
+# A Pose is an (x, y) named tuple, so it takes no more memory than the
+# tuple, compares and hashes by value (and equal to the plain tuple),
+# and can go in sets and be used as a dictionary key. Poses can't be
+# changed: to move something, give it a new Pose, as step() does.
+# cell() and fromCell() convert to and from the cell index
+# y * width + x that the grid and the planners use.
+class Pose(namedtuple("Pose", "x y", defaults=(0, 0))):
+    __slots__ = ()
+
+    @classmethod
+    def fromCell(cls, cell, width):
+        return tuple.__new__(cls, (cell % width, cell // width))
+
+    def cell(self, width):
+        return self[1] * width + self[0]
+
+    # The pose one step in direction, staying put at the edges of a
+    # world with the given bounds.
+    def step(self, direction, maxX, maxY):
+        x, y = self
+        if direction == Directions.NORTH:
+            if y < maxY:
+                return tuple.__new__(Pose, (x, y + 1))
+        elif direction == Directions.SOUTH:
+            if y > 0:
+                return tuple.__new__(Pose, (x, y - 1))
+        elif direction == Directions.EAST:
+            if x < maxX:
+                return tuple.__new__(Pose, (x + 1, y))
+        elif direction == Directions.WEST:
+            if x > 0:
+                return tuple.__new__(Pose, (x - 1, y))
+        return self
+
+    # Since a Pose can't change, copies can share it.
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    # Show it as the plain tuple, as messages did before.
+    __repr__ = tuple.__repr__
 
     def print(self):
         print('[', self.x, ',', self.y, ']')
 
 # Check if two game elements are in the same location
 def sameLocation(pose1, pose2):
-    if pose1.x == pose2.x:
-        if pose1.y == pose2.y:
-            return True
-        else:
-            return False
-    else:
-        return False
+    return pose1 == pose2
 
 # Define the order over two locations/poses by distance from
 # origin. Helpful if we need to sort them and only care about having a
@@ -72,41 +107,18 @@ def checkBounds(max, dimension):
 
     return dimension
 
-# Pick a location in the range [0, x] and [0, y]
+# Pick count different locations in the range [0, x] and [0, y], by
+# sampling cell indices without replacement, so that this takes time
+# linear in count however full the grid gets.
 #
-# Used to randomize the initial conditions.
-def pickRandomPose(x, y):
-    p = Pose()
-    p.x = random.randint(0, x)
-    p.y = random.randint(0, y)
-
-    return p
-
-# Pick a unique location, in the range [0, x] and [0, y], given a list
-# of locations that have already been chosen.
-def pickUniquePose(x, y, taken):
-    uniqueChoice = False
-    while(not uniqueChoice):
-        candidatePose = pickRandomPose(x, y)
-        # Don't seem to be able to use 'in' here. I suspect it is
-        # because of the way __contains__ checks for equality.
-        if not containedIn(candidatePose, taken):
-            uniqueChoice = True
-    return candidatePose
-
-# Check if a pose with the same x and y is already in poseList.
-#
-# There should be a way to do this with in/__contains__ by overloading
-# the relevant equality operator for pose, but that is for another
-# time.
-def containedIn(pose, poseList):
-    contained = False
-    for poses in poseList:
-        if sameLocation(pose, poses):
-            contained = True
-            #print(pose, "and", poses, "are (both) at (", pose.x, ",
-            #", pose.y, ") and (", pose.x, ", ", pose.y, ")")
-    return contained
+# Used to randomize the initial conditions. rng is the random number
+# generator to draw from, by default the one in the random module.
+def pickUniquePoses(x, y, count, rng=random):
+    width = x + 1
+    cells = width * (y + 1)
+    if count > cells:
+        raise ValueError(f"Can't place {count} objects in {cells} cells")
+    return [Pose.fromCell(cell, width) for cell in rng.sample(range(cells), count)]
 
 # Print out game state information. Not so useful given
 # the graphical display, but might come in handy.
@@ -127,8 +139,8 @@ def printGameState(world):
         world.getPitsLocation()[i].print()
 
 # Pick a random direction
-def pickRandomDirection():
-    direction = random.randint(0, 3)
+def pickRandomDirection(rng=random):
+    direction = rng.randint(0, 3)
     if direction == 0:
         return Directions.NORTH
     elif direction == 1:
@@ -146,28 +158,36 @@ def pickRandomDirection():
 # Clearly this could be true for two worlds of different sizes, but we
 # will ignore that possibility for now (we should only ever be
 # comparing worlds of the same size).
+#
+# A PuzzleWorld keeps a signature of where everyone is (see
+# PuzzleWorld.updateSignature), and when both states have one we just
+# compare signatures, which doesn't allocate anything.
 def sameAs(state1, state2):
+    signature1 = getattr(state1, "signature", None)
+    signature2 = getattr(state2, "signature", None)
+    if signature1 is not None and signature2 is not None:
+        return signature1 == signature2
     if sameLink(state1, state2) and sameWumpus(state1, state2):
         return True
     else:
         return False
     
 def sameLink(state1, state2):
+    signature1 = getattr(state1, "signature", None)
+    signature2 = getattr(state2, "signature", None)
+    if signature1 is not None and signature2 is not None:
+        return signature1[0] == signature2[0]
     if sameLocation(state1.lLoc, state2.lLoc):
         return True
     else:
         return False
     
 # The wumpus in two states are the same if for every wumpus in state1
-# there is a wumpus with the same location in state 2. We need to sort
-# by location to check this, and we need to create copies because sort
-# has side-effects.
+# there is a wumpus with the same location in state 2. We check this
+# by comparing their locations in sorted order.
 def sameWumpus(state1, state2):
-    state3 = copy.deepcopy(state1)
-    state4 = copy.deepcopy(state2)
-    state3.wLoc.sort(key=ltPose)
-    state4.wLoc.sort(key=ltPose)
-    for i in range(len(state3.wLoc)):
-        if not sameLocation(state3.wLoc[i], state4.wLoc[i]):
-            return False
-    return True
+    signature1 = getattr(state1, "signature", None)
+    signature2 = getattr(state2, "signature", None)
+    if signature1 is not None and signature2 is not None:
+        return signature1[1] == signature2[1]
+    return sorted(state1.wLoc) == sorted(state2.wLoc)
@@ -9,55 +9,193 @@
 
 import random
 import config
+import events
+from array import array
 import utils
+import zobrist
 from utils import Pose
 from utils import Directions
 from utils import State
 
+# Flags for the occupancy grid. Each cell of the grid holds the
+# bitwise or of the flags for the things that are in it.
+PIT    = 1
+WUMPUS = 2
+GOLD   = 4
+LINK   = 8
+
+# The things that kill Link
+DANGER = PIT | WUMPUS
+
+# A random number generator seeded from the random module.
+def newRng():
+    return random.Random(random.getrandbits(64))
+
+# The seed for episode number index of a run. Each episode gets its
+# own random number generator, seeded from config.myId and the index,
+# so that runner.py and the corpora written by scenario.py agree on
+# the worlds that each episode starts with.
+def episodeSeed(index):
+    return config.myId * 1000003 + index
+
+# The random number generators for a game seeded with seed: one that
+# places everything at the start, and one for everything random after
+# that. Keeping them apart means that a world loaded from a corpus,
+# which isn't placed, plays out just as the world generated from the
+# same seed does. Placing draws from random.Random(seed), as it always
+# has, so corpora already written still match.
+def gameRngs(seed):
+    return random.Random(seed), random.Random(seed + (1 << 64))
+
 class World():
 
-    def __init__(self):
+    def __init__(self, rng=None, placementRng=None):
+
+        # The random number generator for everything random in this
+        # world once it is set up: how the Wumpus move and, if Link is
+        # nondeterministic, how Link moves. Where things start is drawn
+        # from placementRng, if given, and otherwise from rng too.
+        # Seeding them replays the same world. If rng isn't given, one
+        # is seeded from the random module, so seeding that still gives
+        # repeatable runs.
+        self.rng = rng if rng is not None else newRng()
+        placementRng = placementRng if placementRng is not None else self.rng
 
         # Import boundaries of the world. because we index from 0,
         # these are one less than the number of rows and columns.
         self.maxX = config.worldLength - 1
         self.maxY = config.worldBreadth - 1
 
-        # Keep a list of locations that have been used.
-        self.locationList = []
+        # Keep a list of locations that have been used. Everything is
+        # placed at once, in different cells, in the order Wumpus,
+        # Link, gold and pits.
+        wumpus = config.numberOfWumpus
+        gold = config.numberOfGold
+        self.locationList = utils.pickUniquePoses(self.maxX, self.maxY,
+                                                  wumpus + 1 + gold + config.numberOfPits,
+                                                  placementRng)
 
         # Wumpus locations within the world
-        self.wLoc = []
-        for i in range(config.numberOfWumpus):
-            newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-            self.wLoc.append(newLoc)
-            self.locationList.append(newLoc)
+        self.wLoc = self.locationList[:wumpus]
 
         # Link location
-        newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-        self.lLoc = newLoc
-        self.locationList.append(newLoc)
+        self.lLoc = self.locationList[wumpus]
 
         # Gold location
-        self.gLoc = []
-        for i in range(config.numberOfGold):
-            newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-            self.gLoc.append(newLoc)
-            self.locationList.append(newLoc)
+        self.gLoc = self.locationList[wumpus + 1:wumpus + 1 + gold]
 
         # Pit locations
-        self.pLoc = []
-        for i in range(config.numberOfPits):
-            newLoc = utils.pickUniquePose(self.maxX, self.maxY, self.locationList)
-            self.pLoc.append(newLoc)
-            self.locationList.append(newLoc)
-
+        self.pLoc = self.locationList[wumpus + 1 + gold:]
+
+        self.setUp()
+
+    # Make a world with everything in the given places, rather than in
+    # random places, as when a saved world is loaded. Everything else
+    # is as __init__ leaves it.
+    @classmethod
+    def fromPositions(cls, maxX, maxY, lLoc, wLoc, gLoc=(), pLoc=(), rng=None):
+        world = cls.__new__(cls)
+        world.rng = rng if rng is not None else newRng()
+        world.maxX = maxX
+        world.maxY = maxY
+        world.lLoc = lLoc
+        world.wLoc = list(wLoc)
+        world.gLoc = list(gLoc)
+        world.pLoc = list(pLoc)
+        world.locationList = world.wLoc + [lLoc] + world.gLoc + world.pLoc
+        world.setUp()
+        return world
+
+    # Set up the state of the game, once everything is in place.
+    def setUp(self):
         # Game state
         self.status = State.PLAY
 
         # Did Link just successfully loot some gold?
         self.looted = False
-        
+
+        # Record where everything is in a grid, so that we don't have
+        # to search the lists of locations to find out what is in a
+        # cell.
+        self.buildGrid()
+
+    # Build the occupancy grid.
+    #
+    # The grid is a flat array with one entry per cell, where the cell
+    # (x, y) is at index y * width + x. Since more than one Wumpus can
+    # be in a cell, we also keep a count of the Wumpus in each cell so
+    # that the flag is only cleared when the last of them leaves.
+    #
+    # Alongside the grid we keep the percepts as layers of counts: for
+    # each cell, how many Wumpus are in or next to it (stench), how
+    # many pits are in or next to it (breeze) and how many gold are
+    # next to it (glitter). These only change around objects that
+    # move or are removed, so they are updated rather than rebuilt.
+    #
+    # We also keep a Zobrist hash of where Link, the Wumpus and the
+    # remaining gold are (see zobrist.py), updated as they move or are
+    # looted, so that repeated states can be spotted in O(1).
+    def buildGrid(self):
+        self.width = self.maxX + 1
+        self.height = self.maxY + 1
+        size = self.width * self.height
+        self.grid = bytearray(size)
+        self.wumpusCount = array('i', [0]) * size
+        self.stench = array('i', [0]) * size
+        self.breeze = array('i', [0]) * size
+        self.glitter = array('i', [0]) * size
+        self.zobrist = 0
+        for p in self.pLoc:
+            self.grid[self.cellIndex(p.x, p.y)] |= PIT
+            self.spread(self.breeze, p.x, p.y, 1, True)
+        for g in self.gLoc:
+            self.grid[self.cellIndex(g.x, g.y)] |= GOLD
+            self.spread(self.glitter, g.x, g.y, 1, False)
+            self.zobrist ^= zobrist.key(zobrist.GOLD, self.cellIndex(g.x, g.y))
+        for w in self.wLoc:
+            self.addWumpus(w.x, w.y)
+        self.grid[self.cellIndex(self.lLoc.x, self.lLoc.y)] |= LINK
+        self.zobrist ^= zobrist.key(zobrist.LINK, self.cellIndex(self.lLoc.x, self.lLoc.y))
+
+    # Index of the cell (x, y) in the grid.
+    def cellIndex(self, x, y):
+        return y * self.width + x
+
+    # Add delta to a percept layer in the cells next to (x, y), and in
+    # (x, y) itself if centre is True.
+    def spread(self, layer, x, y, delta, centre):
+        cell = y * self.width + x
+        if centre:
+            layer[cell] += delta
+        if y < self.maxY:
+            layer[cell + self.width] += delta
+        if y > 0:
+            layer[cell - self.width] += delta
+        if x < self.maxX:
+            layer[cell + 1] += delta
+        if x > 0:
+            layer[cell - 1] += delta
+
+    # Record that a Wumpus has arrived in, or left, the cell (x, y).
+    def addWumpus(self, x, y):
+        cell = self.cellIndex(x, y)
+        self.wumpusCount[cell] += 1
+        self.zobrist ^= zobrist.key(zobrist.WUMPUS, cell, self.wumpusCount[cell])
+        self.grid[cell] |= WUMPUS
+        self.spread(self.stench, x, y, 1, True)
+
+    def removeWumpus(self, x, y):
+        cell = self.cellIndex(x, y)
+        self.zobrist ^= zobrist.key(zobrist.WUMPUS, cell, self.wumpusCount[cell])
+        self.wumpusCount[cell] -= 1
+        if self.wumpusCount[cell] == 0:
+            self.grid[cell] &= ~WUMPUS
+        self.spread(self.stench, x, y, -1, True)
+
+    # Is (x, y) inside the world?
+    def inBounds(self, x, y):
+        return 0 <= x <= self.maxX and 0 <= y <= self.maxY
+
     #
     # Access Methods
     #
@@ -103,16 +241,8 @@ class World():
     
     # Does the location have a Wumpus or Pit?
     def isDangerous(self, x, y):
-        # Checks for Wumpus
-        for w in self.wLoc:
-            if (x, y) == (w.x, w.y):
-                return True
-
-        # Checks pits
-        for p in self.pLoc:
-            if (x, y) == (p.x, p.y):
-                return True
-
+        if self.inBounds(x, y):
+            return self.grid[y * self.width + x] & DANGER != 0
         return False  # Safe to move
  
     #
@@ -125,19 +255,18 @@ class World():
     def isEnded(self):
         dead = False
         won = False
+        here = self.grid[self.cellIndex(self.lLoc.x, self.lLoc.y)]
         # Has Link met the Wumpus?
-        for i in range(len(self.wLoc)):
-            if utils.sameLocation(self.lLoc, self.wLoc[i]):
-                print("Oops! Met the Wumpus at [", self.lLoc.x, ',', self.lLoc.y, "]")
-                dead = True
-                self.status = State.LOST
+        if here & WUMPUS:
+            events.info("world.wumpus", "Oops! Met the Wumpus at [ {} , {} ]", self.lLoc.x, self.lLoc.y)
+            dead = True
+            self.status = State.LOST
                 
         # Did Link fall in a Pit?
-        for i in range(len(self.pLoc)):
-            if utils.sameLocation(self.lLoc, self.pLoc[i]):
-                print("Arghhhhh! Fell in a pit at [", self.lLoc.x, ',', self.lLoc.y, "]")
-                dead = True
-                self.status = State.LOST
+        if here & PIT:
+            events.info("world.pit", "Arghhhhh! Fell in a pit at [ {} , {} ]", self.lLoc.x, self.lLoc.y)
+            dead = True
+            self.status = State.LOST
 
         # Did Link loot all the gold?
         if len(self.gLoc) == 0:
@@ -145,7 +274,7 @@ class World():
             self.status = State.WON
             
         if dead == True or won == True:
-            print("Game Over!")
+            events.info("world.over", "Game Over!")
             return True
             
     # Implements the move chosen by Link
@@ -154,42 +283,36 @@ class World():
         self.looted = False
         # Implement non-determinism if appropriate
         direction = self.probabilisticMotion(direction)
-        if direction == Directions.NORTH:
-            if self.lLoc.y < self.maxY:
-                self.lLoc.y = self.lLoc.y + 1
-            
-        if direction == Directions.SOUTH:
-            if self.lLoc.y > 0:
-                self.lLoc.y = self.lLoc.y - 1
-                
-        if direction == Directions.EAST:
-            if self.lLoc.x < self.maxX:
-                self.lLoc.x = self.lLoc.x + 1
-                
-        if direction == Directions.WEST:
-            if self.lLoc.x > 0:
-                self.lLoc.x = self.lLoc.x - 1
-
-        # Did Link just loot some gold?
-        match = False
-        index = 0
-        for i in range(len(self.gLoc)):
-            if utils.sameLocation(self.lLoc, self.gLoc[i]):
-                match = True
-                index = i
-                self.looted = True
-                print("Gold, yeah!")
-
-        # Assumes that golds have different locations. Or, that only
-        # one gold can be picked up in a given turn.
-        if match:
-            self.gLoc.pop(index)
+        cell = self.lLoc.cell(self.width)
+        self.grid[cell] &= ~LINK
+        self.zobrist ^= zobrist.key(zobrist.LINK, cell)
+        self.lLoc = self.lLoc.step(direction, self.maxX, self.maxY)
+
+        cell = self.lLoc.cell(self.width)
+        self.grid[cell] |= LINK
+        self.zobrist ^= zobrist.key(zobrist.LINK, cell)
+
+        # Did Link just loot some gold? The grid tells us whether there
+        # is any, so we only search the list when there is.
+        if self.grid[cell] & GOLD:
+            for i in range(len(self.gLoc)):
+                if self.lLoc == self.gLoc[i]:
+                    self.looted = True
+                    events.info("world.gold", "Gold, yeah!")
+                    # Assumes that golds have different locations. Or,
+                    # that only one gold can be picked up in a given
+                    # turn.
+                    self.gLoc.pop(i)
+                    self.grid[cell] &= ~GOLD
+                    self.zobrist ^= zobrist.key(zobrist.GOLD, cell)
+                    self.spread(self.glitter, self.lLoc.x, self.lLoc.y, -1, False)
+                    break
 
     # Implement nondeterministic motion, if appropriate. This is not
     # really used at the moment.
     def probabilisticMotion(self, direction):
         if config.nonDeterministic:
-            dice = random.random()
+            dice = self.rng.random()
             if dice < config.directionProbability:
                 return direction
             else:
@@ -200,7 +323,7 @@ class World():
     # Move at 90 degrees to the original direction.
     def sideMove(self, direction):
         # Do we head left or right of the intended direction?
-        dice =  random.random()
+        dice = self.rng.random()
         if dice > 0.5:
             left = True
         else:
@@ -236,29 +359,35 @@ class World():
     def updateWumpus(self):
         if config.dynamic:
             for i in range(len(self.wLoc)):
-                if utils.separation(self.wLoc[i], self.lLoc) < config.senseDistance:
+                old = self.wLoc[i]
+                if utils.separation(old, self.lLoc) < config.senseDistance:
                     self.moveToLink(i)
                 else:
                     self.makeRandomMove(i)
+                if self.wLoc[i] != old:
+                    self.removeWumpus(old.x, old.y)
+                    self.addWumpus(self.wLoc[i].x, self.wLoc[i].y)
 
     # Head towards Link 
     def moveToLink(self, i):
         target = self.lLoc
+        x, y = self.wLoc[i]
         # If same x-coordinate, move in the y direction
-        if self.wLoc[i].x == target.x:
-            self.wLoc[i].y = self.reduceDifference(self.wLoc[i].y, target.y)        
+        if x == target.x:
+            y = self.reduceDifference(y, target.y)
         # If same y-coordinate, move in the x direction
-        elif self.wLoc[i].y == target.y:
-            self.wLoc[i].x = self.reduceDifference(self.wLoc[i].x, target.x)        
+        elif y == target.y:
+            x = self.reduceDifference(x, target.x)
         # If x and y both differ, approximate a diagonal
         # approach by randomising between moving in the x and
         # y direction.
         else:
-            dice = random.random()
+            dice = self.rng.random()
             if dice > 0.5:
-                self.wLoc[i].y = self.reduceDifference(self.wLoc[i].y, target.y)        
+                y = self.reduceDifference(y, target.y)
             else:
-                self.wLoc[i].x = self.reduceDifference(self.wLoc[i].x, target.x)        
+                x = self.reduceDifference(x, target.x)
+        self.wLoc[i] = Pose(x, y)
 
     # Move value towards target.
     def reduceDifference(self, value, target):
@@ -272,13 +401,15 @@ class World():
     # Randomly pick to change either x or y coordinate, and then
     # randomly make a change in that coordinate.
     def makeRandomMove(self, i):
-        dice = random.random()
+        x, y = self.wLoc[i]
+        dice = self.rng.random()
         if dice > 0.5:
-            xChange = random.randint(0, 2) - 1
-            self.wLoc[i].x = utils.checkBounds(self.maxX, self.wLoc[i].x - xChange)
+            xChange = self.rng.randint(0, 2) - 1
+            x = utils.checkBounds(self.maxX, x - xChange)
         else:
-            yChange = random.randint(0, 2) - 1
-            self.wLoc[i].y = utils.checkBounds(self.maxY, self.wLoc[i].y - yChange)
+            yChange = self.rng.randint(0, 2) - 1
+            y = utils.checkBounds(self.maxY, y - yChange)
+        self.wLoc[i] = Pose(x, y)
 
 
     # Some additional information about the world which may be useful
@@ -286,25 +417,27 @@ class World():
     
     # Is the given location smelly?
     #
-    # A location is smelly if it is next to the Wumpus
+    # A location is smelly if it is on or next to a Wumpus
     def isSmelly(self, location):
-        for w in self.wLoc:
-            # Check if location is ON or NEXT TO a Wumpus
-            if (w.x == location.x and w.y == location.y) or self.isAdjacent(self.wLoc, location):
-                return True
-        return False
+        if not self.inBounds(location.x, location.y):
+            return False
+        return self.stench[self.cellIndex(location.x, location.y)] > 0
 
     # Is the given location windy? 
+    #
+    # A location is windy if it is on or next to a pit
     def isWindy(self, location):
-        for p in self.pLoc:
-            if (p.x == location.x and p.y == location.y) or self.isAdjacent(self.pLoc, location):
-                return True
-            # Check if location is ON or NEXT TO a Pit
-        return False
+        if not self.inBounds(location.x, location.y):
+            return False
+        return self.breeze[self.cellIndex(location.x, location.y)] > 0
 
-     # Does the given location glitter? 
+    # Does the given location glitter? 
+    #
+    # A location glitters if it is next to some gold
     def isGlitter(self, location):
-        return self.isAdjacent(self.gLoc, location)
+        if not self.inBounds(location.x, location.y):
+            return False
+        return self.glitter[self.cellIndex(location.x, location.y)] > 0
                 
     # Is the location loc next to any of the locations in locList.
     #
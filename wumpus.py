@@ -4,29 +4,47 @@
 # Last Modified: 06/01/24
 
 import getopt
-import random
 import config
-import game
-import puzzle
+import events
+import profiling
+import results
+import runner
+import scenario
 import sys
 
 def displayHelp():
     print("wumpus.py accepts the following arguments:")
     print("-h : generates this message")
     print("-g <number> : runs the game version. <number> specifies algorithm:")
-    print("\t1 - Depth First Search\n\t2 - Breadth First Search\n\t3 - Uniform Cost Search\n\t4 - Greedy Search")
+    print("\t1 - Depth First Search\n\t2 - Breadth First Search\n\t3 - Uniform Cost Search\n\t4 - Greedy Search\n\t5 - Held-Karp Gold Tour\n\t6 - A* Search (MST heuristic)\n\t7 - D* Lite (incremental replanning)\n\t8 - Bidirectional Search (nearest gold first)")
     print("-p <number> : runs the puzzle version. <number> specifies algorithm:")
-    print("\t1 - Depth First Search\n\t2 - A* Search")
+    print("\t1 - Depth First Search\n\t2 - A* Search\n\t3 - Jump Point Search\n\t4 - Bidirectional A* Search\n\t5 - Conflict-Based Search (all characters at once)\n\t6 - Manhattan Path (closed form, no search)")
     print("-d : run headless (no graphics)")
     print("-n <number> : runs -p or -g version <number> times (integer)")
+    print("--workers <number> : spread the -n runs over <number> processes (implies -d)")
+    print("--episode <number> : number the runs from <number>, to replay a given run")
+    print("-o <file> : write a record of each run to <file> (CSV if it ends .csv, else JSON Lines)")
+    print("-v : show every event, including each move, on the console")
+    print("-q : only show warnings on the console")
+    print("--trace <file> : write every event, with its level and name, to <file>")
+    print("--counts : report how many times each event happened")
+    print("--corpus <file> : start each run from its scenario in a corpus written by scenario.py")
+    print("--profile <file> : profile the runs, without pauses or workers, and write a report to <file>")
 
 def main():
-    random.seed(config.myId)
     wType = "none"
     count = 1
+    workers = 1
+    logPath = None
+    tracePath = None
+    counter = None
+    profilePath = None
+    corpusPath = None
+    first = 0
     argList = sys.argv[1:]
-    options = "hg:p:dn:"
-    long_options = ["Help", "Game", "Puzzle", "Headless", "Number"]
+    options = "hg:p:dn:o:vq"
+    long_options = ["Help", "Game=", "Puzzle=", "Headless", "Number=", "workers=", "Output=", "episode=",
+                    "Verbose", "Quiet", "trace=", "counts", "profile=", "corpus="]
     algorithm_type = 1
 
     try:
@@ -55,19 +73,83 @@ def main():
                 config.headless = True
             elif currentArgument in ("-n", "--Number"):
                 count = int(currentValue)
+            elif currentArgument == "--workers":
+                workers = int(currentValue)
+            elif currentArgument == "--episode":
+                first = int(currentValue)
+            elif currentArgument in ("-o", "--Output"):
+                logPath = currentValue
+            elif currentArgument in ("-v", "--Verbose"):
+                events.setConsoleLevel(events.DEBUG)
+            elif currentArgument in ("-q", "--Quiet"):
+                events.setConsoleLevel(events.WARNING)
+            elif currentArgument == "--trace":
+                tracePath = currentValue
+            elif currentArgument == "--counts":
+                counter = events.CounterSink()
+            elif currentArgument == "--profile":
+                profilePath = currentValue
+            elif currentArgument == "--corpus":
+                corpusPath = currentValue
 
     except getopt.GetoptError as err:
         print(str(err))
 
+    if wType != "none" and corpusPath:
+        # Check the corpus before starting, rather than failing part
+        # way through the run.
+        try:
+            corpus = scenario.Corpus(corpusPath)
+        except (OSError, ValueError) as err:
+            print(str(err))
+            return
+        kind = scenario.GAME if wType == "game" else scenario.PUZZLE
+        if corpus.kind != kind:
+            print(f"{corpusPath} does not hold {wType} scenarios")
+            return
+        if first + count > len(corpus):
+            print(f"{corpusPath} only has {len(corpus)} scenarios")
+            return
+        corpus.close()
+
     if wType != "none":
-        if wType == "game":
-            for i in range(count):
-                print(f"Running game with algorithm {algorithm_type}")
-                game.main(algorithm_type)
-        elif wType == "puzzle":
-            for i in range(count):
-                print(f"Running puzzle with algorithm {algorithm_type}")
-                puzzle.main(algorithm_type)
+        # Profile everything in this process, and don't let the pauses
+        # between steps swamp the profile.
+        if profilePath:
+            workers = 1
+            config.stepDelay = 0
+        if workers > 1 and not config.headless:
+            print("Running headless, since workers can't show graphics.")
+            config.headless = True
+        trace = events.subscribe(events.FileSink(tracePath)) if tracePath else None
+        if counter is not None:
+            events.subscribe(counter)
+        summary = results.Summary()
+        log = results.ResultsLog(logPath) if logPath else None
+        profiler = profiling.Profiler() if profilePath else None
+        if profiler is not None:
+            profiler.start()
+        for record in runner.runEpisodes(wType, algorithm_type, count, workers, first, corpusPath):
+            summary.add(record)
+            if log is not None:
+                log.write(record)
+            elif count > 1:
+                print(f"Episode {record['index']} (seed {record['seed']}): {record['outcome']}")
+        if profiler is not None:
+            profiler.stop()
+            profiler.save(profilePath, f"Profile of {count} {wType} runs with algorithm {algorithm_type}")
+            print(f"Profile written to {profilePath}")
+        if log is not None:
+            log.close()
+        if count > 1 or log is not None:
+            summary.report()
+        if trace is not None:
+            events.unsubscribe(trace)
+            trace.close()
+        if counter is not None:
+            events.unsubscribe(counter)
+            for name, number in sorted(counter.counts.items()):
+                print(f"{name:<20}{number:>10}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
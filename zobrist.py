@@ -0,0 +1,45 @@
+# zobrist.py
+#
+# Keys for Zobrist hashing of world states.
+#
+# The hash of a state is the XOR of a random 64-bit key for each thing
+# in it: Link in a cell, the nth Wumpus in a cell, a gold in a cell.
+# When something moves, its old key is XORed out and its new key XORed
+# in, so the hash is kept up to date in O(1) rather than recomputed.
+# Wumpus are keyed by how many share the cell rather than by which
+# Wumpus they are, so two Wumpus in one cell don't cancel out, and
+# states that only differ in which Wumpus is where hash the same.
+#
+# Keys are made from the thing, cell and count by splitmix64, so they
+# are the same in every run and every process, and are only worked out
+# for the cells that are used.
+#
+# The hash is for telling whole world states apart as the Wumpus move
+# during a game or puzzle. The planners in search.py don't use it:
+# while they plan, the world stands still and only Link's cell and the
+# gold collected change, which they pack into an exact int key
+# (collected * size + cell) that can't collide and costs nothing to
+# work out.
+
+LINK = 0
+WUMPUS = 1
+GOLD = 2
+
+MASK = (1 << 64) - 1
+
+def splitmix64(value):
+    value = (value + 0x9E3779B97F4A7C15) & MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+# Keys worked out so far, by (cell << 32 | count) << 2 | kind.
+keys = {}
+
+# The key for the count-th (from 1) thing of kind in cell.
+def key(kind, cell, count=1):
+    index = (cell << 32 | count) << 2 | kind
+    value = keys.get(index)
+    if value is None:
+        value = keys[index] = splitmix64(index)
+    return value